@@ -8,12 +8,29 @@ and engaging marketing materials based on user instructions.
 import os
 import argparse
 import asyncio
+import time
 from azure.ai.projects import AIProjectClient
 from azure.ai.projects.models import BingGroundingTool, FileSearchTool, CodeInterpreterTool
 from azure.identity import DefaultAzureCredential
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from datetime import datetime
 
+from agent_pool import create_agent_pool, pool_key
+
+# Tools requested for the agent; part of its pool key
+MARKETING_TOOLS = ("bing_grounding", "code_interpreter")
+
+# Once a thread's history passes this many characters it is compacted: a fresh
+# thread is started from a summary of the old one
+THREAD_COMPACT_CHARS = int(os.environ.get("THREAD_COMPACT_CHARS", "24000"))
+SUMMARY_PROMPT = (
+    "Summarize our conversation so far in under 200 words for use as context in a new conversation. "
+    "Keep the products, audiences, tones and any preferences or decisions. Reply with the summary only."
+)
+
+# Generations generate_many runs at once unless the caller says otherwise
+AGENT_MAX_CONCURRENCY = int(os.environ.get("AGENT_MAX_CONCURRENCY", "4"))
+
 class MarketingAgent:
     """Marketing Agent that uses Azure AI Agent Service to generate marketing content."""
 
@@ -33,30 +50,125 @@ class MarketingAgent:
         # Model deployment name - defaults to gpt-4o but can be overridden
         self.model_deployment_name = os.environ.get("MODEL_DEPLOYMENT_NAME", "gpt-4o")
         self.agent = None
-        self.thread = None
+        self.thread_id = None
+        
+        # Id of the last message seen on each thread; a reply is only taken if it is newer
+        self.thread_cursors: Dict[str, str] = {}
+        
+        # Summaries being carried from compacted threads, by the thread that receives them
+        self.compactions: Dict[str, asyncio.Task] = {}
+        
+        # Agents and threads are pooled across runs instead of created and deleted each time
+        self.pool = create_agent_pool(self.project_client.agents)
+        self.pool_key = None
 
     async def setup(self, instructions: str = "You are a marketing specialist who creates engaging content"):
-        """Setup the agent with the necessary tools and instructions."""
-        # Set up tools for the agent
-        toolset = self._create_toolset()
-        
-        # Create the agent with the specified tools and instructions
+        """Setup the agent with the necessary tools and instructions, reusing a pooled agent and thread."""
         print(f"Setting up marketing agent with model: {self.model_deployment_name}")
+        self.pool_key = pool_key(self.connection_string, self.model_deployment_name, instructions, MARKETING_TOOLS)
         
-        self.agent = await self.project_client.agents.create_agent(
-            model=self.model_deployment_name,
-            name="Marketing Content Generator",
-            instructions=instructions,
-            tools=toolset.tool_definitions,
-            tool_resources=toolset.tool_resources
-        )
-        print(f"Created agent with ID: {self.agent.id}")
+        async def create_agent():
+            # Set up tools for the agent
+            toolset = self._create_toolset()
+            
+            # Create the agent with the specified tools and instructions
+            agent = await self.project_client.agents.create_agent(
+                model=self.model_deployment_name,
+                name="Marketing Content Generator",
+                instructions=instructions,
+                tools=toolset.tool_definitions,
+                tool_resources=toolset.tool_resources
+            )
+            print(f"Created agent with ID: {agent.id}")
+            return agent
+        
+        self.agent = await self.pool.get_agent(self.pool_key, self.model_deployment_name, create_agent)
         
-        # Create a thread for the conversation
-        self.thread = await self.project_client.agents.create_thread()
-        print(f"Created thread with ID: {self.thread.id}")
+        # Lease a thread for the conversation
+        self.thread_id = await self.pool.lease_thread(self.pool_key)
+        print(f"Using agent {self.agent.id} with thread {self.thread_id}")
+        
+        return self.agent, self.thread_id
+
+    async def _lease_thread(self):
+        """Make sure a thread is leased, setting up the agent on first use."""
+        if not self.agent:
+            await self.setup()
+        elif not self.thread_id:
+            self.thread_id = await self.pool.lease_thread(self.pool_key)
+
+    async def _post_message(self, thread_id: str, content: str):
+        """Add a user message to a thread and move the thread's cursor to it."""
+        message = await self.project_client.agents.create_message(
+            thread_id=thread_id,
+            role="user",
+            content=content
+        )
+        self.thread_cursors[thread_id] = message.id
+        return message
+
+    async def _latest_reply(self, thread_id: str) -> Optional[str]:
+        """Fetch only the newest message on a thread and return its text if the agent wrote it since the cursor."""
+        messages = await self.project_client.agents.list_messages(
+            thread_id=thread_id,
+            order="desc",
+            limit=1
+        )
+        for message in messages.data:
+            if message.id == self.thread_cursors.get(thread_id):
+                break
+            self.thread_cursors[thread_id] = message.id
+            if message.role == "assistant":
+                for content_item in message.content:
+                    if hasattr(content_item, "text") and hasattr(content_item.text, "value"):
+                        return content_item.text.value
+        return None
+
+    async def _record_turn(self, thread_id: str, chars: int) -> str:
+        """
+        Count a request and its reply on a thread and return the thread to continue on.
+
+        A thread that is full or past THREAD_COMPACT_CHARS is swapped for a
+        fresh one straight away; its summary is written in the background and
+        the next generation on the new thread waits for it.
+        """
+        full = self.pool.record_messages(thread_id, 2, chars)
+        _, thread_chars = self.pool.thread_size(thread_id)
+        if not full and thread_chars < THREAD_COMPACT_CHARS:
+            return thread_id
         
-        return self.agent, self.thread
+        print(f"Compacting thread {thread_id}")
+        self.pool.retire_thread(thread_id)
+        new_thread_id = await self.pool.lease_thread(self.pool_key, fresh=True)
+        self.compactions[new_thread_id] = asyncio.ensure_future(self._carry_summary(thread_id, new_thread_id))
+        return new_thread_id
+
+    async def _await_compaction(self, thread_id: str):
+        """Wait for a compacted thread's summary to land on ``thread_id`` before it is used."""
+        task = self.compactions.pop(thread_id, None)
+        if task is not None:
+            await task
+
+    async def _carry_summary(self, old_thread_id: str, thread_id: str):
+        """Summarize a retired thread onto its replacement, then give the old thread back for reaping."""
+        summary = None
+        try:
+            await self._post_message(old_thread_id, SUMMARY_PROMPT)
+            run = await self.project_client.agents.create_and_process_run(
+                thread_id=old_thread_id,
+                agent_id=self.agent.id
+            )
+            if run.status == "completed":
+                summary = await self._latest_reply(old_thread_id)
+            if summary:
+                context = f"Summary of our earlier conversation, for context:\n\n{summary}"
+                await self._post_message(thread_id, context)
+                self.pool.record_messages(thread_id, 1, len(context))
+        except Exception as e:
+            print(f"Could not summarize thread {old_thread_id}: {str(e)}. Continuing without a summary.")
+        finally:
+            self.pool.release_thread(old_thread_id)
+            self.thread_cursors.pop(old_thread_id, None)
 
     def _create_toolset(self):
         """Create a toolset with the necessary tools for marketing content generation."""
@@ -93,52 +205,133 @@ class MarketingAgent:
                          tone: str = "professional",
                          length: str = "medium") -> str:
         """Generate marketing content based on the given parameters."""
-        if not self.agent or not self.thread:
-            await self.setup()
+        await self._lease_thread()
+        message_content = self._content_request(prompt, target_audience, content_type, tone, length)
+        run, content, self.thread_id = await self._generate_on_thread(self.thread_id, message_content)
         
-        # Create a structured message with content requirements
-        message_content = (
+        if run.status == "completed":
+            return content if content is not None else "No content was generated."
+        else:
+            return f"Run failed with status: {run.status}. Error: {run.last_error}"
+
+    async def generate_many(self,
+                            specs: List[Dict[str, Any]],
+                            max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Generate several independent pieces of content concurrently.
+
+        Each spec holds generate_content arguments (``prompt`` plus optional
+        ``target_audience``, ``content_type``, ``tone`` and ``length``) and runs
+        on its own pooled thread, so a campaign takes about as long as its
+        slowest asset rather than the sum of all of them.
+
+        Args:
+            specs: generate_content arguments for each piece of content
+            max_concurrency: Generations in flight at once (default AGENT_MAX_CONCURRENCY)
+
+        Returns:
+            One result per spec, in input order: ``index``, ``content``,
+            ``error`` (None on success) and ``seconds``.
+        """
+        semaphore = await self._start_many(max_concurrency)
+        return list(await asyncio.gather(
+            *(self._generate_item(index, spec, semaphore) for index, spec in enumerate(specs))
+        ))
+
+    async def generate_many_as_completed(self,
+                                         specs: List[Dict[str, Any]],
+                                         max_concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Like generate_many, but yield each result as soon as it finishes; ``index`` gives its spec."""
+        semaphore = await self._start_many(max_concurrency)
+        tasks = [asyncio.ensure_future(self._generate_item(index, spec, semaphore))
+                 for index, spec in enumerate(specs)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _start_many(self, max_concurrency: Optional[int]) -> asyncio.Semaphore:
+        """Set up the agent once before concurrent generations and return their semaphore."""
+        if not self.agent:
+            await self.setup()
+        return asyncio.Semaphore(max(1, max_concurrency or AGENT_MAX_CONCURRENCY))
+
+    async def _generate_item(self, index: int, spec: Dict[str, Any], semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """Generate one spec of generate_many on a thread leased just for it."""
+        async with semaphore:
+            start_time = time.perf_counter()
+            content = None
+            error = None
+            thread_id = None
+            try:
+                message_content = self._content_request(**spec)
+                thread_id = await self.pool.lease_thread(self.pool_key)
+                run, content, thread_id = await self._generate_on_thread(thread_id, message_content)
+                if run.status != "completed":
+                    error = f"Run failed with status: {run.status}. Error: {run.last_error}"
+                elif content is None:
+                    error = "No content was generated."
+            except Exception as e:
+                error = str(e)
+            finally:
+                if thread_id:
+                    self.pool.release_thread(thread_id)
+            return {
+                "index": index,
+                "content": content,
+                "error": error,
+                "seconds": round(time.perf_counter() - start_time, 3),
+            }
+
+    def _content_request(self,
+                         prompt: str,
+                         target_audience: str = "general",
+                         content_type: str = "blog post",
+                         tone: str = "professional",
+                         length: str = "medium") -> str:
+        """Create a structured message with content requirements."""
+        return (
             f"Please create a {tone} {content_type} about the following topic: {prompt}\n\n"
             f"Target audience: {target_audience}\n"
             f"Desired length: {length}\n"
             f"Current date: {datetime.now().strftime('%B %d, %Y')}\n\n"
             f"Include compelling headlines, engaging content, and a clear call to action."
         )
+
+    async def _generate_on_thread(self, thread_id: str, message_content: str):
+        """
+        Send a content request to a thread and run the agent on it.
+
+        Returns:
+            The finished run, the reply text (None if there is none) and the
+            thread to continue on, which differs from ``thread_id`` if it was
+            compacted.
+        """
+        await self._await_compaction(thread_id)
         
         # Send message to the thread
-        message = await self.project_client.agents.create_message(
-            thread_id=self.thread.id,
-            role="user",
-            content=message_content
-        )
+        message = await self._post_message(thread_id, message_content)
         print(f"Sent message with ID: {message.id}")
         
         # Run the agent to process the message
         print("Generating content...")
         run = await self.project_client.agents.create_and_process_run(
-            thread_id=self.thread.id,
+            thread_id=thread_id,
             agent_id=self.agent.id
         )
         
+        content = None
         if run.status == "completed":
-            # Get messages from the thread to retrieve the generated content
-            messages = await self.project_client.agents.list_messages(thread_id=self.thread.id)
-            
-            # Get the last message from the agent
-            for message in messages.data:
-                if message.role == "assistant":
-                    for content_item in message.content:
-                        if hasattr(content_item, "text") and hasattr(content_item.text, "value"):
-                            return content_item.text.value
-            
-            return "No content was generated."
-        else:
-            return f"Run failed with status: {run.status}. Error: {run.last_error}"
+            # Only the newest message is fetched, however long the thread is
+            content = await self._latest_reply(thread_id)
+        thread_id = await self._record_turn(thread_id, len(message_content) + len(content or ""))
+        return run, content, thread_id
 
     async def generate_content_with_streaming(self, prompt: str, **kwargs):
         """Generate marketing content with streaming response."""
-        if not self.agent or not self.thread:
-            await self.setup()
+        await self._lease_thread()
             
         # Create a structured message with content requirements
         message_content = (
@@ -149,25 +342,30 @@ class MarketingAgent:
             message_content += f"{key.replace('_', ' ').title()}: {value}\n"
             
         # Send message to the thread
-        await self.project_client.agents.create_message(
-            thread_id=self.thread.id,
-            role="user",
-            content=message_content
-        )
+        await self._await_compaction(self.thread_id)
+        await self._post_message(self.thread_id, message_content)
         
         # Create a stream for the agent's response
+        chars = len(message_content)
         async with self.project_client.agents.create_stream(
-            thread_id=self.thread.id, 
+            thread_id=self.thread_id, 
             agent_id=self.agent.id
         ) as stream:
             async for event_type, event_data, func_return in stream:
+                if func_return:
+                    chars += len(str(func_return))
                 yield func_return
+        self.thread_id = await self._record_turn(self.thread_id, chars)
 
     async def close(self):
-        """Clean up resources."""
-        if self.agent:
-            await self.project_client.agents.delete_agent(self.agent.id)
-            print(f"Deleted agent with ID: {self.agent.id}")
+        """Return the thread to the pool; the agent is kept for later runs and reaped once idle."""
+        # Let summaries still being carried over finish so their threads are released
+        await asyncio.gather(*self.compactions.values(), return_exceptions=True)
+        self.compactions.clear()
+        if self.thread_id:
+            self.pool.release_thread(self.thread_id)
+            self.thread_id = None
+        await self.pool.close()
             
 async def main():
     """Run the marketing agent as a standalone script."""
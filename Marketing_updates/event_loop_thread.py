@@ -0,0 +1,111 @@
+"""
+Event Loop Thread
+
+A long-lived asyncio event loop running in a background thread, for
+synchronous code (such as Flask views) that drives async agents. Coroutines
+submitted from any thread run on the same loop, so async clients created on it
+keep their connection pools across requests instead of being torn down with a
+fresh loop on every call.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+from typing import Any, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopThread:
+    """An event loop owned by a daemon thread that other threads submit coroutines to."""
+
+    def __init__(self, name: str = "event-loop"):
+        """
+        Create the runner; the loop starts on first use.
+
+        Args:
+            name: Name of the loop's thread
+        """
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread if it is not running and return the loop."""
+        with self._lock:
+            if self.running:
+                return self._loop
+            if sys.platform == "win32":
+                loop = asyncio.SelectorEventLoop()
+            else:
+                loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            self._loop = loop
+            self._thread = threading.Thread(target=run_loop, name=self.name, daemon=True)
+            self._thread.start()
+            started.wait()
+            logger.info(f"Started event loop thread {self.name}")
+            return loop
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop and wait for its result.
+
+        Args:
+            coro: Coroutine to run
+            timeout: Seconds to wait before the coroutine is cancelled
+
+        Returns:
+            The coroutine's result.
+
+        Raises:
+            RuntimeError: If called from the loop's own thread, which would deadlock
+            concurrent.futures.TimeoutError: If ``timeout`` passes first
+        """
+        loop = self.start()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("EventLoopThread.run() called from its own loop; await the coroutine instead")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stop(self, timeout: Optional[float] = 10) -> None:
+        """Cancel outstanding tasks, stop the loop and join its thread; the next run() starts a new loop."""
+        with self._lock:
+            if not self.running:
+                return
+            loop, thread = self._loop, self._thread
+
+            async def drain():
+                tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await loop.shutdown_asyncgens()
+
+            try:
+                asyncio.run_coroutine_threadsafe(drain(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Error draining event loop {self.name}: {str(e)}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
+            self._loop = None
+            self._thread = None
+            logger.info(f"Stopped event loop thread {self.name}")
@@ -11,7 +11,8 @@ import sys
 import asyncio
 import argparse
 import logging
-from typing import Dict, List, Optional, Union, Any
+import time
+from typing import AsyncIterator, Dict, List, Optional, Union, Any
 import json
 from pathlib import Path
 from datetime import datetime
@@ -29,6 +30,10 @@ parent_env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(parent_env_path)
 logger.info(f"Loaded environment from: {parent_env_path}")
 
+# The agent pool lives in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_pool import create_agent_pool, pool_key
+
 # Attempt to import Azure modules; if missing, fall back to sample content only
 try:
     from azure.identity import DefaultAzureCredential
@@ -40,6 +45,17 @@ except ImportError as e:
     AIProjectClient = None  # type: ignore
     ResourceNotFoundError = None  # type: ignore
 
+# Run completion: streamed run events when the SDK supports them, otherwise polling
+# that starts short and backs off exponentially up to a cap
+RUN_STREAMING_ENABLED = os.environ.get("RUN_STREAMING_ENABLED", "true").lower() == "true"
+RUN_POLL_INITIAL_INTERVAL = float(os.environ.get("RUN_POLL_INITIAL_INTERVAL", "0.25"))
+RUN_POLL_MAX_INTERVAL = float(os.environ.get("RUN_POLL_MAX_INTERVAL", "2.0"))
+RUN_POLL_BACKOFF = float(os.environ.get("RUN_POLL_BACKOFF", "1.6"))
+TERMINAL_RUN_STATUSES = ("completed", "failed", "cancelled", "expired")
+
+# Generations generate_many runs at once unless the caller says otherwise
+AGENT_MAX_CONCURRENCY = int(os.environ.get("AGENT_MAX_CONCURRENCY", "4"))
+
 class MarketingAgent:
     """Marketing content generation agent using Azure AI Foundry."""
     
@@ -66,9 +82,14 @@ class MarketingAgent:
         # Instance variables
         self.client = None
         self.agent = None
-        self.thread = None
+        self.thread_id = None
+        self.pool = None
+        self.pool_key = None
         self.initialized = False
         
+        # Run completion instrumentation
+        self.run_stats = {"runs": 0, "streamed": 0, "polled": 0, "polls": 0, "wait_seconds": 0.0}
+        
         # Marketing-specific configuration
         self.agent_name = "Marketing Content Generator"
         self.model_name = os.environ.get("AZURE_MODEL_NAME", "gpt-4o-mini")
@@ -120,12 +141,13 @@ class MarketingAgent:
             )
             logger.info("Azure AI Project client initialized successfully")
             
-            # Create or retrieve the agent
-            await self._create_or_get_agent()
-            
-            # Create a thread for conversation
-            self.thread = await self.client.agents.create_thread()
-            logger.info(f"Thread created with ID: {self.thread.id}")
+            # Reuse a pooled agent and thread rather than scanning and creating them
+            self.pool = create_agent_pool(self.client.agents)
+            project = f"{self.subscription_id}/{self.resource_group}/{self.project_name}"
+            self.pool_key = pool_key(project, self.model_name, self._get_marketing_instructions(), ())
+            self.agent = await self.pool.get_agent(self.pool_key, self.model_name, self._create_agent)
+            self.thread_id = await self.pool.lease_thread(self.pool_key)
+            logger.info(f"Using agent {self.agent.id} with thread {self.thread_id}")
             
             self.initialized = True
             return True
@@ -136,27 +158,19 @@ class MarketingAgent:
             traceback.print_exc()
             return False
     
-    async def _create_or_get_agent(self) -> None:
-        """Create a new agent or get an existing one with the same name."""
+    async def _create_agent(self) -> Any:
+        """Create a new agent with the marketing instructions."""
         try:
-            # First try to get existing agents
-            agents = await self.client.agents.list_agents()
-            existing_agent = next((a for a in agents if a.name == self.agent_name), None)
-            
-            if existing_agent:
-                logger.info(f"Using existing agent: {existing_agent.id}")
-                self.agent = existing_agent
-            else:
-                # Create a new agent with marketing instructions
-                logger.info(f"Creating new agent with model: {self.model_name}")
-                self.agent = await self.client.agents.create_agent(
-                    name=self.agent_name,
-                    instructions=self._get_marketing_instructions(),
-                    model=self.model_name
-                )
-                logger.info(f"Agent created with ID: {self.agent.id}")
+            logger.info(f"Creating new agent with model: {self.model_name}")
+            agent = await self.client.agents.create_agent(
+                name=self.agent_name,
+                instructions=self._get_marketing_instructions(),
+                model=self.model_name
+            )
+            logger.info(f"Agent created with ID: {agent.id}")
+            return agent
         except Exception as e:
-            logger.error(f"Error creating or getting agent: {str(e)}")
+            logger.error(f"Error creating agent: {str(e)}")
             raise
     
     def _get_marketing_instructions(self) -> str:
@@ -201,62 +215,17 @@ class MarketingAgent:
             return self._generate_sample_content(content_type, audience, tone)
         
         try:
-            # Format the message for the agent
-            message_content = f"{prompt}\n\nParameters:\n"
-            message_content += f"Target Audience: {audience}\n"
-            message_content += f"Content Type: {content_type}\n"
-            message_content += f"Tone: {tone}\n"
-            message_content += f"Length: {length}\n"
-            
-            # Send message to thread
-            logger.info("Sending content request to agent...")
-            message = await self.client.agents.create_message(
-                thread_id=self.thread.id,
-                role="user",
-                content=message_content
-            )
-            logger.info(f"Message sent with ID: {message.id}")
+            if not self.thread_id:
+                self.thread_id = await self.pool.lease_thread(self.pool_key)
             
-            # Run the agent
-            logger.info("Running agent to generate content...")
-            run = await self.client.agents.create_run(
-                thread_id=self.thread.id,
-                agent_id=self.agent.id
-            )
-            
-            # Poll for completion
-            logger.info("Waiting for content generation to complete...")
-            while run.status not in ["completed", "failed", "cancelled"]:
-                await asyncio.sleep(1)
-                run = await self.client.agents.get_run(
-                    thread_id=self.thread.id,
-                    run_id=run.id
-                )
-                logger.info(f"Run status: {run.status}")
+            message_content = self._content_request(prompt, audience, content_type, tone, length)
+            run, content_text = await self._generate_on_thread(self.thread_id, message_content)
+            self.thread_id = self._record_turn(self.thread_id)
             
             if run.status != "completed":
-                logger.error(f"Run failed with status: {run.status}")
                 return f"Failed to generate content: {run.status}"
-            
-            # Get the response
-            logger.info("Retrieving generated content...")
-            messages = await self.client.agents.list_messages(
-                thread_id=self.thread.id,
-                after=message.id
-            )
-            
-            # Extract content from assistant message
-            assistant_message = next((m for m in messages if m.role == "assistant"), None)
-            if not assistant_message:
-                logger.error("No response received from assistant")
+            if content_text is None:
                 return "No content could be generated."
-            
-            content_text = ""
-            if assistant_message.content and len(assistant_message.content) > 0:
-                for content_item in assistant_message.content:
-                    if hasattr(content_item, 'text'):
-                        content_text += content_item.text
-            
             return content_text
             
         except Exception as e:
@@ -265,6 +234,240 @@ class MarketingAgent:
             traceback.print_exc()
             return f"Error generating content: {str(e)}"
     
+    async def generate_many(self,
+                            specs: List[Dict[str, Any]],
+                            max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Generate several independent pieces of content concurrently.
+        
+        Each spec runs on its own pooled thread, so a campaign takes about as
+        long as its slowest asset rather than the sum of all of them.
+        
+        Args:
+            specs: generate_content arguments for each piece of content
+                (``prompt``, ``audience``, ``content_type``, ``tone`` and optional ``length``)
+            max_concurrency: Generations in flight at once (default AGENT_MAX_CONCURRENCY)
+            
+        Returns:
+            List[Dict[str, Any]]: One result per spec, in input order, with
+            ``index``, ``content``, ``error`` (None on success) and ``seconds``
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or AGENT_MAX_CONCURRENCY))
+        return list(await asyncio.gather(
+            *(self._generate_item(index, spec, semaphore) for index, spec in enumerate(specs))
+        ))
+    
+    async def generate_many_as_completed(self,
+                                         specs: List[Dict[str, Any]],
+                                         max_concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Like generate_many, but yield each result as soon as it finishes; ``index`` gives its spec."""
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or AGENT_MAX_CONCURRENCY))
+        tasks = [asyncio.ensure_future(self._generate_item(index, spec, semaphore))
+                 for index, spec in enumerate(specs)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _generate_item(self, index: int, spec: Dict[str, Any], semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """Generate one spec of generate_many on a thread leased just for it."""
+        async with semaphore:
+            start_time = time.perf_counter()
+            content = None
+            error = None
+            thread_id = None
+            try:
+                message_content = self._content_request(**spec)
+                if not self.initialized:
+                    content = self._generate_sample_content(spec["content_type"], spec["audience"], spec["tone"])
+                else:
+                    thread_id = await self.pool.lease_thread(self.pool_key)
+                    run, content = await self._generate_on_thread(thread_id, message_content)
+                    thread_id = self._record_turn(thread_id)
+                    if run.status != "completed":
+                        error = f"Failed to generate content: {run.status}"
+                    elif content is None:
+                        error = "No content could be generated."
+            except Exception as e:
+                logger.error(f"Error generating content for item {index}: {str(e)}")
+                error = str(e)
+            finally:
+                if thread_id:
+                    self.pool.release_thread(thread_id)
+            return {
+                "index": index,
+                "content": content,
+                "error": error,
+                "seconds": round(time.perf_counter() - start_time, 3),
+            }
+    
+    def _content_request(self,
+                         prompt: str,
+                         audience: str,
+                         content_type: str,
+                         tone: str,
+                         length: str = "medium") -> str:
+        """Format the message for the agent."""
+        message_content = f"{prompt}\n\nParameters:\n"
+        message_content += f"Target Audience: {audience}\n"
+        message_content += f"Content Type: {content_type}\n"
+        message_content += f"Tone: {tone}\n"
+        message_content += f"Length: {length}\n"
+        return message_content
+    
+    async def _generate_on_thread(self, thread_id: str, message_content: str) -> tuple:
+        """
+        Send a content request to a thread, run the agent and fetch its reply.
+        
+        Returns:
+            tuple: The finished run and the reply text (None if there is none)
+        """
+        # Send message to thread
+        logger.info("Sending content request to agent...")
+        message = await self.client.agents.create_message(
+            thread_id=thread_id,
+            role="user",
+            content=message_content
+        )
+        logger.info(f"Message sent with ID: {message.id}")
+        
+        # Run the agent and wait for it to finish
+        logger.info("Running agent to generate content...")
+        run = await self._run_to_completion(thread_id, message)
+        
+        if run.status != "completed":
+            logger.error(f"Run failed with status: {run.status}")
+            return run, None
+        
+        # Get the response
+        logger.info("Retrieving generated content...")
+        messages = await self.client.agents.list_messages(
+            thread_id=thread_id,
+            after=message.id
+        )
+        
+        # Extract content from assistant message
+        assistant_message = next((m for m in messages if m.role == "assistant"), None)
+        if not assistant_message:
+            logger.error("No response received from assistant")
+            return run, None
+        
+        content_text = ""
+        if assistant_message.content and len(assistant_message.content) > 0:
+            for content_item in assistant_message.content:
+                if hasattr(content_item, 'text'):
+                    content_text += content_item.text
+        
+        return run, content_text
+    
+    async def _run_to_completion(self, thread_id: str, message: Any) -> Any:
+        """
+        Run the agent on a thread and return the finished run.
+
+        Completion is taken from the run's streamed events when the client
+        supports streaming; otherwise, or if the stream ends before a terminal
+        event, the run is polled with exponential backoff.
+
+        Args:
+            thread_id: Leased thread to run on
+            message: The request message the run answers
+        """
+        start_time = time.monotonic()
+        seen = []
+        streaming = RUN_STREAMING_ENABLED and hasattr(self.client.agents, "create_stream")
+        if streaming:
+            try:
+                await self._stream_run(thread_id, seen)
+            except Exception as e:
+                logger.warning(f"Run stream failed ({str(e)}); falling back to polling")
+        # A run the stream already created is polled rather than started again
+        run = seen[-1] if seen else None
+        streamed = run is not None and run.status in TERMINAL_RUN_STATUSES
+        if run is None and streaming:
+            # The stream may have created the run before it failed or sent any run event
+            run = await self._find_started_run(thread_id, message)
+        if run is None:
+            run = await self.client.agents.create_run(
+                thread_id=thread_id,
+                agent_id=self.agent.id
+            )
+        polls = 0
+        if not streamed:
+            run, polls = await self._poll_run(thread_id, run)
+        
+        wait_time = time.monotonic() - start_time
+        self.run_stats["runs"] += 1
+        self.run_stats["streamed" if streamed else "polled"] += 1
+        self.run_stats["polls"] += polls
+        self.run_stats["wait_seconds"] += wait_time
+        logger.info(f"Run {run.id} {run.status} after {wait_time:.2f}s "
+                    f"({'streamed' if streamed else f'{polls} polls'})")
+        return run
+    
+    async def _stream_run(self, thread_id: str, seen: List[Any]) -> None:
+        """Create the run as a stream, appending each run object its events carry to ``seen``."""
+        async with self.client.agents.create_stream(
+            thread_id=thread_id,
+            agent_id=self.agent.id
+        ) as stream:
+            async for event_type, event_data, _ in stream:
+                # Only run events (thread.run.<status>) end the run; thread.run.step.* events carry RunSteps
+                event_name = str(getattr(event_type, "value", event_type))
+                if (event_name.startswith("thread.run.") and not event_name.startswith("thread.run.step.")
+                        and getattr(event_data, "object", "thread.run") == "thread.run"):
+                    seen.append(event_data)
+                    if event_data.status in TERMINAL_RUN_STATUSES:
+                        break
+    
+    async def _find_started_run(self, thread_id: str, message: Any) -> Optional[Any]:
+        """
+        Return the run a stream created without reporting it, if there is one.
+
+        The thread is leased, so an unfinished run on it, or one created after
+        the request message, can only be the stream's.
+        """
+        try:
+            runs = await self.client.agents.list_runs(thread_id=thread_id, limit=1, order="desc")
+        except Exception as e:
+            logger.warning(f"Could not list runs on thread {thread_id} ({str(e)})")
+            return None
+        latest = next(iter(getattr(runs, "data", runs)), None)
+        if latest is None:
+            return None
+        if latest.status not in TERMINAL_RUN_STATUSES or latest.created_at >= message.created_at:
+            logger.info(f"Resuming run {latest.id} started by the stream")
+            return latest
+        return None
+    
+    async def _poll_run(self, thread_id: str, run: Any) -> tuple:
+        """Poll a run until it finishes, backing off from RUN_POLL_INITIAL_INTERVAL to RUN_POLL_MAX_INTERVAL."""
+        interval = RUN_POLL_INITIAL_INTERVAL
+        polls = 0
+        while run.status not in TERMINAL_RUN_STATUSES:
+            await asyncio.sleep(interval)
+            interval = min(interval * RUN_POLL_BACKOFF, RUN_POLL_MAX_INTERVAL)
+            run = await self.client.agents.get_run(
+                thread_id=thread_id,
+                run_id=run.id
+            )
+            polls += 1
+            logger.debug(f"Run status: {run.status}")
+        return run, polls
+    
+    def _record_turn(self, thread_id: str) -> Optional[str]:
+        """
+        Count a request and its reply on a thread.
+        
+        Returns:
+            Optional[str]: The thread, or None if it was full and has been given back to the pool
+        """
+        if self.pool.record_messages(thread_id, 2):
+            self.pool.release_thread(thread_id)
+            return None
+        return thread_id
+    
     def _generate_sample_content(self, content_type: str, audience: str, tone: str) -> str:
         """Generate sample marketing content when Azure is not available."""
         if content_type.lower() in ["social media", "social media post", "tweet", "social"]:
@@ -337,14 +540,25 @@ This would be custom-generated marketing content that highlights the benefits of
 In a real implementation with Azure AI, this would be dynamically generated based on your specific requirements and brand guidelines."""
     
     async def cleanup(self) -> None:
-        """Clean up resources."""
-        if self.initialized and self.client and self.agent:
+        """Return the thread to the pool; the agent is kept for later runs and reaped once idle."""
+        if self.pool is not None:
+            if self.thread_id:
+                self.pool.release_thread(self.thread_id)
+                self.thread_id = None
+            await self.pool.close()
+    
+    async def close(self) -> None:
+        """Release pooled resources and close the client's HTTP connections."""
+        await self.cleanup()
+        if self.client is not None:
             try:
-                logger.info(f"Deleting agent {self.agent.id}...")
-                await self.client.agents.delete_agent(agent_id=self.agent.id)
-                logger.info("Agent deleted successfully")
+                result = self.client.close()
+                if asyncio.iscoroutine(result):
+                    await result
             except Exception as e:
-                logger.warning(f"Error cleaning up agent: {str(e)}")
+                logger.warning(f"Error closing client: {str(e)}")
+            self.client = None
+        self.initialized = False
 
 
 async def main():
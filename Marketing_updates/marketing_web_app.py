@@ -9,8 +9,8 @@ from https://github.com/Azure-Samples/get-started-with-ai-agents
 import os
 import sys
 import json
-import asyncio
 import logging
+import threading
 import time
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -20,6 +20,12 @@ import argparse
 from flask import Flask, render_template, request, jsonify, make_response, abort
 from dotenv import load_dotenv
 
+# The fallback content engine lives in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fallback_content import render_fallback_content
+
+from event_loop_thread import EventLoopThread
+
 # Import the marketing agent
 try:
     from marketing_ai_agent import MarketingAgent, setup_logging
@@ -43,102 +49,7 @@ except ImportError:
             
         async def generate_content(self, prompt, audience, content_type, tone, length, save_to_file=False):
             """Generate sample marketing content with length variations."""
-            # Base content templates by type and length
-            content_templates = {
-                "social": {
-                    "short": f"🚀 Attention {audience}! Try our innovative products. #Innovation",
-                    "medium": f"🚀 Attention {audience}! Our innovative products are transforming the industry with features you won't find anywhere else. Experience the difference today! #Innovation #LeadingEdge",
-                    "long": f"🚀 Attention {audience}! Our innovative products are transforming the industry with features you won't find anywhere else. Experience the difference today!\n\nOur cutting-edge solutions are designed specifically for {audience}, with careful attention to your unique needs. We've spent years perfecting our approach, and the results speak for themselves.\n\n#Innovation #LeadingEdge #CustomerSuccess #QualityMatters"
-                },
-                "email": {
-                    "short": f"Subject: Special Offer for {audience}\n\nHello,\n\nDon't miss our latest solutions designed for {audience}. Visit our website today!\n\nRegards,\nThe Marketing Team",
-                    "medium": f"Subject: Discover How Our Products Can Transform Your Experience\n\nHello {audience},\n\nAre you ready to experience our innovative solutions?\n\nOur latest products combine cutting-edge technology with intuitive design to create a seamless experience.\n\nReady to elevate your experience? Visit our website for an exclusive limited-time offer.\n\nWarm regards,\nThe Marketing Team",
-                    "long": f"""Subject: Discover How Our Products Can Transform Your Experience
-
-Hello {audience},
-
-Are you ready to experience our innovative solutions?
-
-Our latest products combine cutting-edge technology with intuitive design to create a seamless experience. From advanced features that truly understand your needs to efficiency improvements that save you time and money, our offerings adapt to your lifestyle.
-
-Key benefits include:
-• Innovative technology that anticipates your needs
-• Seamless integration with your existing systems
-• Cost savings of up to 30%
-• Enhanced performance with real-time monitoring
-
-Join thousands of satisfied customers who have already transformed their experience.
-
-Ready to elevate your experience? Visit our website for an exclusive limited-time offer.
-
-Warm regards,
-The Marketing Team"""
-                },
-                "blog": {
-                    "short": f"# Solutions for {audience}\n\nOur products help {audience} solve common problems efficiently. Learn how we can help you today.",
-                    "medium": f"# 3 Ways Our Solutions Help {audience}\n\nIn today's fast-paced world, {audience} need efficient solutions. Here's how our products can help:\n\n1. Save time with automation\n2. Reduce costs with smart technology\n3. Improve results with data-driven insights",
-                    "long": f"""# 5 Ways Our Solutions Are Transforming the Industry
-
-In today's fast-paced world, {audience} are seeking innovative solutions to everyday challenges. The good news? Our offerings have never been more exciting or accessible.
-
-## The Evolution of Excellence
-
-Recent studies show that over 70% of consumers are actively searching for solutions that provide meaningful improvements. This shift has driven us to rethink our approach from the ground up.
-
-## How Our Solutions Make a Difference
-
-### 1. Efficiency That Pays For Itself
-
-Our innovative products don't just improve your experience—they improve your bottom line. Our customers report saving 25% more time and resources compared to conventional solutions.
-
-### 2. Superior Materials, Superior Performance
-
-We use only the highest quality components that outperform conventional alternatives in durability and functionality. This commitment to quality ensures a longer lifespan and better performance.
-
-### 3. Intelligent Design Reduces Waste
-
-Our design philosophy emphasizes longevity, repairability, and sustainability. We proudly offer lifetime support on our products, with modular components that can be easily replaced.
-
-### 4. Enhanced User Experience
-
-Our products contain fewer complications and a more intuitive interface, leading to better user satisfaction and fewer support issues. This creates a better experience for everyone.
-
-### 5. Innovation and Practicality Join Forces
-
-Our technology works hand-in-hand with practical needs. From intelligent interfaces that learn your preferences to automated features that save time, our innovations help maximize your efficiency.
-
-## Making the Transition
-
-Transforming your experience doesn't require a complete overhaul overnight. Start by exploring our solutions that address your most pressing needs, where the impact will be greatest.
-
-Remember that every improvement contributes to a larger collective benefit. Your choice today helps create a better tomorrow."""
-                }
-            }
-            
-            # Get the appropriate template based on content type and length
-            content_type_key = "social"  # default
-            if content_type.lower() in ["social media", "social media post", "tweet", "social"]:
-                content_type_key = "social"
-            elif content_type.lower() in ["email", "email/newsletter", "newsletter"]:
-                content_type_key = "email" 
-            elif content_type.lower() in ["blog post", "article", "blog"]:
-                content_type_key = "blog"
-                
-            # Get the appropriate length (default to medium if not found)
-            length = length.lower() if length else "medium"
-            if length not in ["short", "medium", "long"]:
-                length = "medium"
-                
-            # Return the content based on type and length
-            if content_type_key in content_templates and length in content_templates[content_type_key]:
-                return content_templates[content_type_key][length]
-            
-            # Fallback for other content types
-            return f"""Here's a sample {content_type} for {audience} with a {tone} tone, {length} length.
-
-{prompt}
-
-This would be custom-generated marketing content that highlights the benefits of our product while appealing directly to {audience} using language and references that resonate with them."""
+            return render_fallback_content(content_type, audience, tone, length, hashtag="Innovation")
         
         async def close(self):
             """Clean up resources."""
@@ -159,8 +70,12 @@ app = Flask(__name__,
            static_folder='static',
            template_folder='templates')
 
-# Initialize the marketing agent as a global variable
+# The marketing agent is shared by all requests and lives on one background event loop,
+# so its async client and connection pool survive between requests
 marketing_agent = None
+agent_lock = threading.Lock()
+agent_loop = EventLoopThread("marketing-agent-loop")
+AGENT_REQUEST_TIMEOUT = float(os.getenv("AGENT_REQUEST_TIMEOUT", "120"))
 
 # Template mapping
 TEMPLATES = {
@@ -173,11 +88,25 @@ TEMPLATES = {
 }
 
 def initialize_agent():
-    """Initialize the marketing agent."""
+    """Return the shared marketing agent, initializing it on the agent loop on first use."""
     global marketing_agent
-    if marketing_agent is None:
-        marketing_agent = MarketingAgent()
-        # Note: We'll initialize it asynchronously when needed
+    with agent_lock:
+        if marketing_agent is None:
+            logger.info("Initializing marketing agent")
+            agent = MarketingAgent()
+            agent_loop.run(agent.initialize(), timeout=AGENT_REQUEST_TIMEOUT)
+            marketing_agent = agent
+        return marketing_agent
+
+def shutdown_agent():
+    """Close the shared marketing agent and stop the agent loop; both are recreated on the next request."""
+    global marketing_agent
+    with agent_lock:
+        if marketing_agent is not None:
+            agent_loop.run(marketing_agent.close(), timeout=AGENT_REQUEST_TIMEOUT)
+            marketing_agent = None
+            logger.info("Cleaned up marketing agent")
+        agent_loop.stop()
 
 @app.route('/')
 def index():
@@ -188,8 +117,6 @@ def index():
 @app.route('/generate', methods=['POST'])
 def generate_content():
     """Generate marketing content based on form input."""
-    global marketing_agent
-    
     try:
         # Get form data
         content_type = request.form.get('content_type', 'social media post')
@@ -201,22 +128,18 @@ def generate_content():
         
         logger.info(f"Generating content: {content_type} for {audience} with {tone} tone")
         
-        # Initialize agent if not already done
-        if marketing_agent is None:
-            logger.info("Initializing marketing agent")
-            marketing_agent = MarketingAgent()
-            asyncio.run(marketing_agent.initialize())
+        agent = initialize_agent()
         
-        # Generate content
+        # Generate content on the agent loop
         start_time = time.time()
-        content = asyncio.run(marketing_agent.generate_content(
+        content = agent_loop.run(agent.generate_content(
             prompt=prompt,
             audience=audience,
             content_type=content_type,
             tone=tone,
             length=length,
             save_to_file=save_to_file
-        ))
+        ), timeout=AGENT_REQUEST_TIMEOUT)
         elapsed_time = time.time() - start_time
         
         logger.info(f"Content generated in {elapsed_time:.2f} seconds")
@@ -288,30 +211,18 @@ def health_check():
 @app.route('/cleanup', methods=['POST'])
 def cleanup():
     """Clean up resources."""
-    global marketing_agent
-    
     try:
-        if marketing_agent:
-            asyncio.run(marketing_agent.close())
-            marketing_agent = None
-            logger.info("Cleaned up marketing agent")
-        
+        shutdown_agent()
         return jsonify({"status": "success", "message": "Resources cleaned up"})
     
     except Exception as e:
         logger.error(f"Error cleaning up: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 500
 
-async def shutdown_app():
+def shutdown_app():
     """Shut down the application gracefully."""
-    global marketing_agent
-    
     try:
-        if marketing_agent:
-            asyncio.run(marketing_agent.close())
-            marketing_agent = None
-            logger.info("Cleaned up marketing agent on shutdown")
-    
+        shutdown_agent()
     except Exception as e:
         logger.error(f"Error during shutdown: {str(e)}", exc_info=True)
 
@@ -333,9 +244,7 @@ def main():
         logger.info("Server shutdown requested")
         
     finally:
-        # Run cleanup in asyncio event loop
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(shutdown_app())
+        shutdown_app()
         logger.info("Application shutdown complete")
 
 # Initialize the agent when the app starts
@@ -0,0 +1,102 @@
+"""
+Tests for the event loop thread
+
+Covers running coroutines from other threads on one long-lived loop,
+timeouts, the own-thread deadlock guard, and restarting after stop.
+
+Usage:
+    python -m pytest Marketing_updates/test_event_loop_thread.py
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from event_loop_thread import EventLoopThread
+
+
+@pytest.fixture
+def runner():
+    event_loop_thread = EventLoopThread("test-loop")
+    yield event_loop_thread
+    event_loop_thread.stop()
+
+
+async def current_loop():
+    return asyncio.get_running_loop()
+
+
+def test_coroutines_share_one_loop(runner):
+    assert not runner.running
+    first = runner.run(current_loop())
+    assert runner.running
+    assert runner.run(current_loop()) is first
+
+
+def test_runs_from_many_threads(runner):
+    async def double(value):
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    with concurrent.futures.ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda value: runner.run(double(value)), range(16)))
+    assert results == [value * 2 for value in range(16)]
+
+
+def test_exceptions_propagate(runner):
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        runner.run(fail())
+
+
+def test_timeout_cancels_the_coroutine(runner):
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        runner.run(hang(), timeout=0.05)
+    assert cancelled.wait(1)
+
+
+def test_run_from_the_loop_thread_is_refused(runner):
+    async def nested():
+        coro = current_loop()
+        try:
+            runner.run(coro)
+        finally:
+            coro.close()
+
+    with pytest.raises(RuntimeError):
+        runner.run(nested())
+
+
+def test_stop_cancels_pending_tasks_and_allows_restart(runner):
+    cancelled = threading.Event()
+
+    async def background():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def spawn():
+        asyncio.get_running_loop().create_task(background())
+
+    first = runner.run(current_loop())
+    runner.run(spawn())
+    runner.stop()
+    assert cancelled.is_set()
+    assert not runner.running
+    assert first.is_closed()
+    assert runner.run(current_loop()) is not first
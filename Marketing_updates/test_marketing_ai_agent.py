@@ -0,0 +1,231 @@
+"""
+Tests for run completion and concurrent generation in the marketing AI agent
+
+Covers completion from streamed run events, ignoring run step events,
+falling back to polling, resuming (rather than starting again) a run that a
+failed stream had already created, and generate_many.
+
+Usage:
+    python -m pytest Marketing_updates/test_marketing_ai_agent.py
+"""
+
+import asyncio
+import itertools
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import marketing_ai_agent
+from agent_pool import AgentPool
+from marketing_ai_agent import MarketingAgent
+
+MESSAGE = SimpleNamespace(id="msg-1", created_at=datetime(2026, 1, 1, 12, 0))
+
+
+def run(status, run_id="run-1", created_at=MESSAGE.created_at):
+    return SimpleNamespace(id=run_id, status=status, created_at=created_at, object="thread.run")
+
+
+class Stream:
+    """An async context manager yielding (event, data, raw) tuples, optionally failing after them."""
+
+    def __init__(self, events, error=None):
+        self.events = events
+        self.error = error
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        for event_type, data in self.events:
+            yield event_type, data, None
+        if self.error is not None:
+            raise self.error
+
+
+class AgentsClient:
+    """An agents client without streaming, whose runs are listed by ``runs`` and advanced by ``statuses``."""
+
+    def __init__(self, runs=(), statuses=("completed",)):
+        self.runs = list(runs)
+        self.statuses = list(statuses)
+        self.created = []
+
+    async def create_run(self, thread_id, agent_id):
+        created = run("queued", run_id=f"run-{len(self.runs) + 1}")
+        self.created.append(created)
+        self.runs.append(created)
+        return created
+
+    async def get_run(self, thread_id, run_id):
+        return run(self.statuses.pop(0) if self.statuses else "completed", run_id=run_id)
+
+    async def list_runs(self, thread_id, limit, order):
+        return SimpleNamespace(data=list(reversed(self.runs))[:limit])
+
+
+class StreamingAgentsClient(AgentsClient):
+    """An agents client whose create_stream returns ``stream``."""
+
+    def __init__(self, stream, **kwargs):
+        super().__init__(**kwargs)
+        self.stream = stream
+
+    def create_stream(self, thread_id, agent_id):
+        return self.stream
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(marketing_ai_agent, "RUN_POLL_INITIAL_INTERVAL", 0)
+    monkeypatch.setattr(marketing_ai_agent, "RUN_POLL_MAX_INTERVAL", 0)
+
+
+def make_agent(agents_client):
+    agent = MarketingAgent("endpoint", "subscription", "group", "project")
+    agent.client = SimpleNamespace(agents=agents_client)
+    agent.agent = SimpleNamespace(id="agent-1")
+    return agent
+
+
+def test_streamed_run_completes_without_polling():
+    events = [("thread.run.created", run("queued")),
+              ("thread.run.step.created", SimpleNamespace(status="in_progress", object="thread.run.step")),
+              ("thread.run.in_progress", run("in_progress")),
+              ("thread.message.delta", SimpleNamespace(object="thread.message.delta")),
+              ("thread.run.completed", run("completed"))]
+    client = StreamingAgentsClient(Stream(events))
+    agent = make_agent(client)
+    finished = asyncio.run(agent._run_to_completion("thread-1", MESSAGE))
+    assert finished.status == "completed"
+    assert client.created == []
+    assert agent.run_stats["streamed"] == 1
+    assert agent.run_stats["polls"] == 0
+
+
+def test_run_step_completion_does_not_end_the_run():
+    events = [("thread.run.created", run("queued")),
+              ("thread.run.step.completed", SimpleNamespace(status="completed", object="thread.run.step"))]
+    client = StreamingAgentsClient(Stream(events), statuses=["in_progress", "completed"])
+    agent = make_agent(client)
+    finished = asyncio.run(agent._run_to_completion("thread-1", MESSAGE))
+    assert finished.status == "completed"
+    assert client.created == []
+    assert agent.run_stats["polled"] == 1
+    assert agent.run_stats["polls"] == 2
+
+
+def test_stream_failing_after_creating_the_run_is_not_started_again():
+    client = StreamingAgentsClient(Stream([], error=ConnectionError("reset")), runs=[run("in_progress", run_id="run-7")])
+    agent = make_agent(client)
+    finished = asyncio.run(agent._run_to_completion("thread-1", MESSAGE))
+    assert (finished.id, finished.status) == ("run-7", "completed")
+    assert client.created == []
+
+
+def test_stream_failing_before_creating_the_run_starts_one():
+    earlier = run("completed", run_id="run-0", created_at=MESSAGE.created_at - timedelta(minutes=5))
+    client = StreamingAgentsClient(Stream([], error=ConnectionError("refused")), runs=[earlier])
+    agent = make_agent(client)
+    finished = asyncio.run(agent._run_to_completion("thread-1", MESSAGE))
+    assert finished.status == "completed"
+    assert [created.id for created in client.created] == ["run-2"]
+
+
+def test_clients_without_streaming_are_polled():
+    client = AgentsClient(statuses=["in_progress", "completed"])
+    agent = make_agent(client)
+    finished = asyncio.run(agent._run_to_completion("thread-1", MESSAGE))
+    assert finished.status == "completed"
+    assert len(client.created) == 1
+    assert agent.run_stats["polls"] == 2
+
+
+class ThreadAgentsClient(AgentsClient):
+    """An agents client with threads and messages, whose runs take ``run_seconds`` and reply with the request."""
+
+    def __init__(self, run_seconds=0.02, fail_prompts=()):
+        super().__init__()
+        self.ids = itertools.count(1)
+        self.messages = {}
+        self.run_seconds = run_seconds
+        self.fail_prompts = fail_prompts
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create_thread(self):
+        return SimpleNamespace(id=f"thread-{next(self.ids)}")
+
+    async def create_message(self, thread_id, role, content):
+        created = SimpleNamespace(id=f"msg-{next(self.ids)}", created_at=MESSAGE.created_at, content=content)
+        self.messages.setdefault(thread_id, []).append(created)
+        return created
+
+    async def create_run(self, thread_id, agent_id):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.run_seconds)
+        finally:
+            self.in_flight -= 1
+        prompt = self.messages[thread_id][-1].content.split("\n")[0]
+        status = "failed" if prompt in self.fail_prompts else "completed"
+        return run(status, run_id=f"run-{next(self.ids)}")
+
+    async def list_messages(self, thread_id, after):
+        prompt = self.messages[thread_id][-1].content.split("\n")[0]
+        return [SimpleNamespace(role="assistant", content=[SimpleNamespace(text=f"reply: {prompt}")])]
+
+
+def spec(prompt):
+    return {"prompt": prompt, "audience": "developers", "content_type": "blog", "tone": "friendly"}
+
+
+def make_pooled_agent(agents_client, tmp_path):
+    agent = make_agent(agents_client)
+    agent.pool = AgentPool(agents_client, db_path=str(tmp_path / "pool.db"), reap_interval=0)
+    agent.pool_key = "key"
+    agent.initialized = True
+    return agent
+
+
+def test_generate_many_without_azure_returns_sample_content_in_order():
+    agent = MarketingAgent("endpoint", "subscription", "group", "project")
+    results = asyncio.run(agent.generate_many([
+        {"prompt": "a", "audience": "developers", "content_type": "email", "tone": "friendly"},
+        {"prompt": "b", "audience": "founders", "content_type": "blog", "tone": "bold"},
+    ]))
+    assert [result["index"] for result in results] == [0, 1]
+    assert all(result["error"] is None for result in results)
+    assert "developers" in results[0]["content"]
+    assert "founders" in results[1]["content"]
+
+
+def test_generate_many_runs_concurrently_on_separate_threads(tmp_path):
+    client = ThreadAgentsClient(fail_prompts=("broken",))
+    agent = make_pooled_agent(client, tmp_path)
+    prompts = ["one", "two", "broken", "four", "five"]
+    results = asyncio.run(agent.generate_many([spec(prompt) for prompt in prompts], max_concurrency=2))
+    assert [result["index"] for result in results] == list(range(5))
+    assert [result["content"] for result in results if result["error"] is None] == \
+        ["reply: one", "reply: two", "reply: four", "reply: five"]
+    assert results[2]["error"] == "Failed to generate content: failed"
+    assert client.max_in_flight == 2
+    assert len(client.messages) == 2
+    assert agent.pool.stats()["leased_threads"] == 0
+
+
+def test_generate_many_as_completed_yields_every_result(tmp_path):
+    client = ThreadAgentsClient()
+    agent = make_pooled_agent(client, tmp_path)
+
+    async def main():
+        return [result async for result in agent.generate_many_as_completed([spec(str(i)) for i in range(4)])]
+
+    results = asyncio.run(main())
+    assert sorted(result["index"] for result in results) == [0, 1, 2, 3]
+    assert all(result["content"] == f"reply: {result['index']}" for result in results)
@@ -0,0 +1,74 @@
+"""
+Tests for the marketing web app's shared agent
+
+Covers generating on one long-lived agent and event loop across requests, and
+recreating both after /cleanup.
+
+Usage:
+    python -m pytest Marketing_updates/test_marketing_web_app.py
+"""
+
+import asyncio
+
+import pytest
+
+import marketing_web_app
+
+
+class RecordingAgent:
+    """A marketing agent that records the loop each call runs on."""
+
+    instances = []
+
+    def __init__(self):
+        self.loops = []
+        self.closed = False
+        RecordingAgent.instances.append(self)
+
+    async def initialize(self):
+        self.loops.append(asyncio.get_running_loop())
+        return True
+
+    async def generate_content(self, prompt, audience, content_type, tone, length, save_to_file=False):
+        self.loops.append(asyncio.get_running_loop())
+        return f"{content_type} for {audience}: {prompt}"
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def client(monkeypatch):
+    RecordingAgent.instances = []
+    monkeypatch.setattr(marketing_web_app, "MarketingAgent", RecordingAgent)
+    monkeypatch.setattr(marketing_web_app, "marketing_agent", None)
+    yield marketing_web_app.app.test_client()
+    marketing_web_app.shutdown_agent()
+
+
+def generate(client, prompt):
+    response = client.post("/generate", data={"prompt": prompt, "audience": "developers", "content_type": "blog"})
+    assert response.status_code == 200
+    return response.get_json()["content"]
+
+
+def test_requests_share_one_agent_and_loop(client):
+    assert generate(client, "first") == "blog for developers: first"
+    assert generate(client, "second") == "blog for developers: second"
+    agent, = RecordingAgent.instances
+    assert len(agent.loops) == 3
+    assert len(set(agent.loops)) == 1
+    assert marketing_web_app.agent_loop.running
+
+
+def test_cleanup_closes_the_agent_and_the_next_request_starts_over(client):
+    generate(client, "first")
+    assert client.post("/cleanup").get_json()["status"] == "success"
+    first = RecordingAgent.instances[0]
+    assert first.closed
+    assert not marketing_web_app.agent_loop.running
+
+    generate(client, "second")
+    second = RecordingAgent.instances[1]
+    assert second is not first
+    assert second.loops[0] is not first.loops[0]
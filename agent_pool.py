@@ -0,0 +1,298 @@
+"""
+Agent Pool
+
+Reuses Azure AI Agent Service agents and threads across runs instead of
+creating (and deleting) them every time. Agents are keyed by scope (the
+project), model, a hash of their instructions and their toolset, and recorded
+in SQLite so a later process reuses them with a single lookup. Threads are
+leased per generation from a cache of thread ids, rotated once they hold
+``max_thread_messages`` messages (or retired early by the caller), and a background reaper deletes retired
+threads and resources that have been idle too long.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".marketing_agent_pool.db")
+
+
+def pool_key(scope: str, model: str, instructions: str, toolset: Iterable[str]) -> str:
+    """Build the key shared by agents with the same project, model, instructions and tools."""
+    payload = {
+        "scope": scope or "",
+        "model": model,
+        "instructions": hashlib.sha256((instructions or "").strip().encode("utf-8")).hexdigest(),
+        "toolset": sorted(toolset),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def create_agent_pool(agents_client: Any) -> "AgentPool":
+    """Create a pool for ``agents_client`` configured from AGENT_POOL_* environment variables."""
+    return AgentPool(
+        agents_client,
+        db_path=os.getenv("AGENT_POOL_DB", DEFAULT_DB_PATH),
+        max_thread_messages=int(os.getenv("AGENT_POOL_MAX_THREAD_MESSAGES", "40")),
+        lease_seconds=float(os.getenv("AGENT_POOL_LEASE_SECONDS", "900")),
+        thread_idle_seconds=float(os.getenv("AGENT_POOL_THREAD_IDLE_SECONDS", "3600")),
+        agent_idle_seconds=float(os.getenv("AGENT_POOL_AGENT_IDLE_SECONDS", str(7 * 24 * 3600))),
+        reap_interval=float(os.getenv("AGENT_POOL_REAP_INTERVAL", "300")),
+    )
+
+
+class AgentPool:
+    """Persistent pool of agents and leased threads for one agents client."""
+
+    def __init__(self,
+                 agents_client: Any,
+                 db_path: Optional[str] = None,
+                 max_thread_messages: int = 40,
+                 lease_seconds: float = 900,
+                 thread_idle_seconds: float = 3600,
+                 agent_idle_seconds: float = 7 * 24 * 3600,
+                 reap_interval: float = 300):
+        """
+        Open (or create) the pool registry.
+
+        Args:
+            agents_client: The project client's ``agents`` operations
+            db_path: SQLite registry shared by every process using the pool
+            max_thread_messages: Messages after which a thread is retired
+            lease_seconds: Time after which a lease from a crashed process lapses
+            thread_idle_seconds: Unused threads older than this are deleted
+            agent_idle_seconds: Unused agents older than this are deleted
+            reap_interval: Seconds between background reaper passes
+        """
+        self.agents_client = agents_client
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.max_thread_messages = max_thread_messages
+        self.lease_seconds = lease_seconds
+        self.thread_idle_seconds = thread_idle_seconds
+        self.agent_idle_seconds = agent_idle_seconds
+        self.reap_interval = reap_interval
+
+        self._agents: Dict[str, Any] = {}
+        self._agent_locks: Dict[str, asyncio.Lock] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+
+        self.agents_reused = 0
+        self.agents_created = 0
+        self.threads_reused = 0
+        self.threads_created = 0
+        self.threads_rotated = 0
+
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS agents ("
+            "key TEXT PRIMARY KEY, agent_id TEXT NOT NULL, model TEXT, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS threads ("
+            "thread_id TEXT PRIMARY KEY, key TEXT NOT NULL, messages INTEGER NOT NULL DEFAULT 0, "
+            "chars INTEGER NOT NULL DEFAULT 0, leased_until REAL NOT NULL DEFAULT 0, "
+            "retired INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL)"
+        )
+        try:
+            self._db.execute("ALTER TABLE threads ADD COLUMN chars INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass  # registry already has the column
+        self._db.execute("CREATE INDEX IF NOT EXISTS threads_key ON threads (key, retired, leased_until)")
+
+    async def get_agent(self, key: str, model: str, create: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the pooled agent for ``key``, creating it with ``create()`` if there is none.
+
+        An agent already used by this process costs no round trip; one recorded
+        by an earlier run costs one ``get_agent`` lookup. Concurrent first
+        calls for a key share a single lookup or creation.
+        """
+        agent = self._agents.get(key)
+        if agent is None:
+            lock = self._agent_locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                agent = self._agents.get(key)
+                if agent is None:
+                    agent = await self._load_agent(key, model, create)
+                    self._agents[key] = agent
+        self._execute("UPDATE agents SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.start_reaper()
+        return agent
+
+    async def _load_agent(self, key: str, model: str, create: Callable[[], Awaitable[Any]]) -> Any:
+        """Look up the agent recorded for ``key``, or create and record one."""
+        rows = self._execute("SELECT agent_id FROM agents WHERE key = ?", (key,))
+        if rows:
+            agent_id = rows[0][0]
+            try:
+                agent = await self.agents_client.get_agent(agent_id)
+                self.agents_reused += 1
+                logger.info(f"Reusing pooled agent {agent.id}")
+                return agent
+            except Exception as e:
+                logger.warning(f"Pooled agent {agent_id} is no longer available ({str(e)}); creating a new one")
+                self._execute("DELETE FROM agents WHERE key = ?", (key,))
+        agent = await create()
+        self.agents_created += 1
+        now = time.time()
+        self._execute("INSERT OR REPLACE INTO agents (key, agent_id, model, created_at, last_used) "
+                      "VALUES (?, ?, ?, ?, ?)", (key, agent.id, model, now, now))
+        return agent
+
+    async def lease_thread(self, key: str, fresh: bool = False) -> str:
+        """
+        Lease a thread for ``key``; no other caller gets it until it is released.
+
+        A cached thread is reused unless ``fresh`` is set or none is free, in
+        which case a new thread is created.
+        """
+        now = time.time()
+        row = None
+        if not fresh:
+            with self._lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._db.execute(
+                        "SELECT thread_id FROM threads WHERE key = ? AND retired = 0 AND leased_until < ? "
+                        "ORDER BY last_used DESC LIMIT 1", (key, now)
+                    ).fetchone()
+                    if row is not None:
+                        self._db.execute("UPDATE threads SET leased_until = ?, last_used = ? WHERE thread_id = ?",
+                                         (now + self.lease_seconds, now, row[0]))
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+        if row is not None:
+            self.threads_reused += 1
+            return row[0]
+
+        thread = await self.agents_client.create_thread()
+        self.threads_created += 1
+        self._execute("INSERT INTO threads (thread_id, key, leased_until, last_used) VALUES (?, ?, ?, ?)",
+                      (thread.id, key, now + self.lease_seconds, now))
+        logger.info(f"Created pooled thread {thread.id}")
+        return thread.id
+
+    def record_messages(self, thread_id: str, count: int, chars: int = 0) -> bool:
+        """
+        Count messages (and their total characters) added to a leased thread.
+
+        Returns:
+            True if the thread is now full and has been retired; the caller
+            should release it and lease another.
+        """
+        self._execute("UPDATE threads SET messages = messages + ?, chars = chars + ?, last_used = ? "
+                      "WHERE thread_id = ?", (count, chars, time.time(), thread_id))
+        rows = self._execute("SELECT messages FROM threads WHERE thread_id = ?", (thread_id,))
+        if not rows or rows[0][0] < self.max_thread_messages:
+            return False
+        logger.info(f"Rotating thread {thread_id} after {rows[0][0]} messages")
+        self.retire_thread(thread_id)
+        return True
+
+    def thread_size(self, thread_id: str) -> Tuple[int, int]:
+        """Return the (messages, characters) recorded for a thread."""
+        rows = self._execute("SELECT messages, chars FROM threads WHERE thread_id = ?", (thread_id,))
+        return rows[0] if rows else (0, 0)
+
+    def retire_thread(self, thread_id: str) -> None:
+        """Stop handing out a thread; the reaper deletes it once it is released. Retiring twice is a no-op."""
+        with self._lock:
+            retired = self._db.execute("UPDATE threads SET retired = 1 WHERE thread_id = ? AND retired = 0",
+                                       (thread_id,)).rowcount
+        self.threads_rotated += retired
+
+    def release_thread(self, thread_id: str) -> None:
+        """Return a leased thread to the pool."""
+        self._execute("UPDATE threads SET leased_until = 0, last_used = ? WHERE thread_id = ?",
+                      (time.time(), thread_id))
+
+    async def reap(self) -> Dict[str, int]:
+        """Delete retired threads, unused threads and agents past their idle time, and return the counts."""
+        now = time.time()
+        threads = self._execute(
+            "SELECT thread_id FROM threads WHERE leased_until < ? AND (retired = 1 OR last_used < ?)",
+            (now, now - self.thread_idle_seconds)
+        )
+        agents = self._execute("SELECT key, agent_id FROM agents WHERE last_used < ?",
+                               (now - self.agent_idle_seconds,))
+        deleted = {"threads": 0, "agents": 0}
+        for thread_id, in threads:
+            if await self._delete("thread", self.agents_client.delete_thread, thread_id):
+                self._execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+                deleted["threads"] += 1
+        for key, agent_id in agents:
+            if await self._delete("agent", self.agents_client.delete_agent, agent_id):
+                self._execute("DELETE FROM agents WHERE key = ?", (key,))
+                self._agents.pop(key, None)
+                deleted["agents"] += 1
+        if deleted["threads"] or deleted["agents"]:
+            logger.info(f"Reaped {deleted['threads']} thread(s) and {deleted['agents']} agent(s)")
+        return deleted
+
+    def start_reaper(self) -> None:
+        """Start the background reaper on the running event loop if it is not already running."""
+        if self.reap_interval <= 0 or (self._reaper is not None and not self._reaper.done()):
+            return
+        self._reaper = asyncio.get_running_loop().create_task(self._reap_loop())
+
+    async def close(self) -> None:
+        """Stop the reaper; pooled agents and threads are kept for later runs."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool sizes and reuse counters."""
+        (agents,), = self._execute("SELECT COUNT(*) FROM agents")
+        (threads, leased), = self._execute(
+            "SELECT COUNT(*), COALESCE(SUM(leased_until >= ?), 0) FROM threads WHERE retired = 0", (time.time(),)
+        )
+        return {
+            "agents": agents,
+            "threads": threads,
+            "leased_threads": leased,
+            "agents_reused": self.agents_reused,
+            "agents_created": self.agents_created,
+            "threads_reused": self.threads_reused,
+            "threads_created": self.threads_created,
+            "threads_rotated": self.threads_rotated,
+        }
+
+    async def _delete(self, kind: str, delete: Callable[[str], Awaitable[Any]], resource_id: str) -> bool:
+        try:
+            await delete(resource_id)
+            return True
+        except Exception as e:
+            # Already gone counts as deleted; anything else is retried on the next pass
+            if type(e).__name__ == "ResourceNotFoundError":
+                return True
+            logger.warning(f"Error deleting pooled {kind} {resource_id}: {str(e)}")
+            return False
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error(f"Error reaping agent pool: {str(e)}")
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
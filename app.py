@@ -10,264 +10,305 @@ import time
 import asyncio
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, make_response, send_from_directory, abort
-from openai import AzureOpenAI
+from flask import Flask, Response, g, render_template, request, jsonify, make_response, send_from_directory, abort, stream_with_context
+from openai import APITimeoutError, AzureOpenAI, RateLimitError
 from dotenv import load_dotenv
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from content_delivery import build_content_response
+from content_library import create_content_library
+from generation_service import (
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_API_VERSION,
+    AZURE_OPENAI_DEPLOYMENT,
+    AZURE_OPENAI_ENDPOINT,
+    AZURE_OPENAI_SMALL_DEPLOYMENT,
+    COALESCING_ENABLED,
+    COALESCING_WAIT_TIMEOUT,
+    CONTENT_TYPES,
+    FAST_START,
+    GENERATION_CACHE_ENABLED,
+    PROBE_MESSAGES,
+    STARTUP_PROBE_ENABLED,
+    STARTUP_PROBE_TIMEOUT,
+    TEMPLATES,
+    TONES,
+    UPSTREAM_QUEUE_TIMEOUT,
+    UPSTREAM_TIMEOUT,
+    ConnectivityProbe,
+    Generation,
+    StreamGeneration,
+    VariantsGeneration,
+    batch_messages,
+    batch_response,
+    build_enhanced_prompt,
+    cache_metadata,
+    cached_events,
+    circuit_breaker,
+    collect_generation_metrics,
+    component_gauge,
+    conversation_history,
+    format_sse,
+    generate_sample_content,
+    generation_cache,
+    generation_cache_key,
+    generation_status,
+    generations_total,
+    http_request_duration,
+    http_requests_in_flight,
+    http_requests_total,
+    metrics_registry,
+    parse_batch_request,
+    parse_variants,
+    rate_limiter,
+    read_batch_item,
+    read_generation_form,
+    record_call_error,
+    record_call_success,
+    record_rate_limited,
+    request_key,
+    sample_events,
+    upstream_admission_wait,
+    upstream_request,
+)
+from job_manager import JobCancelled, JobManager, JobQueueFull
+from logging_config import setup_logging_from_env
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from single_flight import SingleFlight
 
 # Force UTF-8 encoding for all IO operations
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
-    
+
 # Load environment variables
 load_dotenv()
 
-# Configure logging
+# Configure logging - in async mode records are queued and written by a background
+# listener thread, so request latency does not depend on log disk throughput
 log_dir = Path("logs")
-log_dir.mkdir(exist_ok=True)
-logging.basicConfig(
-    level=logging.DEBUG, 
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_dir / f"app_{datetime.now().strftime('%Y%m%d')}.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+log_listener = setup_logging_from_env(log_dir)
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
-app = Flask(__name__, 
+app = Flask(__name__,
             static_folder="static",
             template_folder="Marketing_updates/templates")
 
 # Set the Flask JSON encoder to handle UTF-8 properly
 app.json.ensure_ascii = False  # Allows UTF-8 characters in JSON responses
 
-# Get environment variables for configuration - hardcode API version to known working version
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT", "https://unocode4377087879.openai.azure.com/")
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY", "8QRutvmpeSE3H2eQRt6DpvymhfzLVPX2VqDZuVMIOWe1fNQS52bIJQQJ99BDACYeBjFXJ3w3AAAAACOGjWih")
-# Hardcode the API version to the known working version instead of using environment variable
-AZURE_OPENAI_API_VERSION = "2023-05-15"  # Hardcoded working version
-AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
-
 # Log configuration values (masking API key for security)
 masked_key = AZURE_OPENAI_API_KEY[:5] + "..." + AZURE_OPENAI_API_KEY[-5:] if AZURE_OPENAI_API_KEY else None
 logger.info(f"Configuration:")
 logger.info(f"- Endpoint: {AZURE_OPENAI_ENDPOINT}")
 logger.info(f"- API Version: {AZURE_OPENAI_API_VERSION}")
 logger.info(f"- Deployment: {AZURE_OPENAI_DEPLOYMENT}")
+logger.info(f"- Small deployment: {AZURE_OPENAI_SMALL_DEPLOYMENT or 'not configured'}")
 logger.info(f"- API Key (masked): {masked_key}")
 logger.info(f"- Python Version: {sys.version}")
+logger.info(f"- Generation cache enabled: {GENERATION_CACHE_ENABLED}")
+
+# Concurrent identical requests share one upstream call
+request_coalescer = SingleFlight()
+
+# Saved, exported and shared content and its full-text index for /search
+content_library = create_content_library()
+
+# Background generation jobs (/generate?async=1) - generation concurrency is bounded separately from HTTP
+job_manager = JobManager(
+    max_workers=int(os.getenv("JOB_MAX_WORKERS", "4")),
+    max_jobs=int(os.getenv("JOB_MAX_QUEUED", "100")),
+    ttl_seconds=float(os.getenv("JOB_TTL_SECONDS", "3600"))
+)
 
 # Initialize Azure OpenAI client - make it a global variable with a lock for thread safety
 client = None
 client_lock = threading.Lock()
 
-# Template mapping
-TEMPLATES = {
-    "social": "Create a {tone} social media post for {audience} about {topic}. Highlight the key features and benefits.",
-    "email": "Write a {tone} email newsletter for {audience} about {topic}. Include an engaging subject line and call to action.",
-    "blog": "Create a {tone} blog post titled '{title}' for {audience} discussing {topic}. Include an introduction, key points, and conclusion.",
-    "press": "Write a {tone} press release announcing {topic} for {audience}. Include quotes, key facts, and contact information.",
-    "ad": "Create a {tone} advertisement for {audience} promoting {product/service}. Highlight the unique selling points and include a call to action.",
-    "product": "Write a {tone} product description for {product_name} targeting {audience}. Emphasize the features, benefits, and use cases."
-}
-
-# Marketing content options
-CONTENT_TYPES = [
-    {"id": "social", "name": "Social Media Post"},
-    {"id": "email", "name": "Email Campaign"},
-    {"id": "blog", "name": "Blog Post"},
-    {"id": "press", "name": "Press Release"},
-    {"id": "ad", "name": "Advertisement"},
-    {"id": "product", "name": "Product Description"}
-]
-
-TONES = [
-    {"id": "professional", "name": "Professional"},
-    {"id": "conversational", "name": "Conversational"},
-    {"id": "enthusiastic", "name": "Enthusiastic"},
-    {"id": "formal", "name": "Formal"},
-    {"id": "informal", "name": "Informal"},
-    {"id": "humorous", "name": "Humorous"},
-    {"id": "authoritative", "name": "Authoritative"},
-    {"id": "inspirational", "name": "Inspirational"},
-    {"id": "educational", "name": "Educational"}
-]
-
-# Initialize the single global instance of AzureOpenAI
-try:
-    logger.info("Creating global AzureOpenAI client instance")
-    # Create the client outside of any function to ensure it's available to all threads
-    client = AzureOpenAI(
-        api_key=AZURE_OPENAI_API_KEY,
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        api_version=AZURE_OPENAI_API_VERSION
-    )
-    logger.info("Global AzureOpenAI client created successfully")
-except Exception as e:
-    logger.error(f"Failed to create global AzureOpenAI client: {str(e)}")
-    logger.error(traceback.format_exc())
+# In fast-start mode the client is created lazily and the connectivity probe
+# runs in a background thread so worker boot never waits on the LLM
+logger.info(f"- Fast start: {FAST_START}, startup probe: {STARTUP_PROBE_ENABLED}")
+connectivity_probe = ConnectivityProbe(STARTUP_PROBE_ENABLED)
 
 def init_openai_client():
     """Initialize the OpenAI client if it's not already initialized"""
     global client
-    
+
     # Use a lock to prevent multiple threads from initializing simultaneously
     with client_lock:
         if client is not None:
             logger.debug("Client already initialized, using existing client")
             return True
-            
+
         try:
+            # Constructing the client is local; connectivity is checked by the startup probe
             logger.info("Initializing Azure OpenAI client")
             client = AzureOpenAI(
                 api_key=AZURE_OPENAI_API_KEY,
                 azure_endpoint=AZURE_OPENAI_ENDPOINT,
                 api_version=AZURE_OPENAI_API_VERSION
             )
-            
-            # Test connection with a simple completion
-            logger.info("Testing Azure OpenAI connection...")
-            test_response = client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": "Hello, are you working correctly?"}
-                ],
-                max_tokens=50
-            )
-            logger.info(f"Test response successful: {test_response.choices[0].message.content[:50]}...")
             logger.info("Azure OpenAI client initialized successfully")
-            
-            # Store client globally
-            logger.debug(f"Client object created and stored: {client is not None}")
             return True
         except Exception as e:
             logger.error(f"Error initializing Azure OpenAI client: {str(e)}")
             logger.error(f"Full error: {traceback.format_exc()}")
             return False
 
-# Test the client immediately to ensure it's working
-if client is not None:
+def get_probe_state():
+    """Return a copy of the connectivity probe state."""
+    return connectivity_probe.state()
+
+def run_connectivity_probe():
+    """Send a one-token completion to verify Azure OpenAI connectivity and record the result."""
+    connectivity_probe.begin()
     try:
-        logger.info("Testing global client with a simple request...")
-        test_response = client.chat.completions.create(
+        if not init_openai_client():
+            raise RuntimeError("Azure OpenAI client could not be created")
+        logger.info("Testing Azure OpenAI connection...")
+        probe_client = client.with_options(timeout=STARTUP_PROBE_TIMEOUT, max_retries=0)
+        probe_client.chat.completions.create(
             model=AZURE_OPENAI_DEPLOYMENT,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": "Hello, are you working correctly?"}
-            ],
-            max_tokens=50
+            messages=PROBE_MESSAGES,
+            max_tokens=1
         )
-        logger.info(f"Global client test successful: {test_response.choices[0].message.content[:50]}...")
     except Exception as e:
-        logger.error(f"Global client test failed: {str(e)}")
-        logger.error(traceback.format_exc())
-        client = None  # Clear the client so init_openai_client() will recreate it later
-
-# Conversation history store
-conversation_history = {}
-
-def generate_sample_content(content_type, audience, tone, length, prompt):
-    """Generate sample marketing content if the Azure client fails."""
-    # Base content templates by type and length
-    content_templates = {
-        "social": {
-            "short": f"🚀 Attention {audience}! Try our innovative products. #{tone.capitalize()}",
-            "medium": f"🚀 Attention {audience}! Our innovative products are transforming the industry with features you won't find anywhere else. Experience the difference today! #{tone.capitalize()} #LeadingEdge",
-            "long": f"🚀 Attention {audience}! Our innovative products are transforming the industry with features you won't find anywhere else. Experience the difference today!\n\nOur cutting-edge solutions are designed specifically for {audience}, with careful attention to your unique needs. We've spent years perfecting our approach, and the results speak for themselves.\n\n#{tone.capitalize()} #LeadingEdge #CustomerSuccess #QualityMatters"
-        },
-        "email": {
-            "short": f"Subject: Special Offer for {audience}\n\nHello,\n\nDon't miss our latest solutions designed for {audience}. Visit our website today!\n\nRegards,\nThe Marketing Team",
-            "medium": f"Subject: Discover How Our Products Can Transform Your Experience\n\nHello {audience},\n\nAre you ready to experience our innovative solutions?\n\nOur latest products combine cutting-edge technology with intuitive design to create a seamless experience.\n\nReady to elevate your experience? Visit our website for an exclusive limited-time offer.\n\nWarm regards,\nThe Marketing Team",
-            "long": f"""Subject: Discover How Our Products Can Transform Your Experience
-
-Hello {audience},
-
-Are you ready to experience our innovative solutions?
-
-Our latest products combine cutting-edge technology with intuitive design to create a seamless experience. From advanced features that truly understand your needs to efficiency improvements that save you time and money, our offerings adapt to your lifestyle.
-
-Key benefits include:
-• Innovative technology that anticipates your needs
-• Seamless integration with your existing systems
-• Cost savings of up to 30%
-• Enhanced performance with real-time monitoring
-
-Join thousands of satisfied customers who have already transformed their experience.
-
-Ready to elevate your experience? Visit our website for an exclusive limited-time offer.
-
-Warm regards,
-The Marketing Team"""
-        },
-        "blog": {
-            "short": f"# Solutions for {audience}\n\nOur products help {audience} solve common problems efficiently. Learn how we can help you today.",
-            "medium": f"# 3 Ways Our Solutions Help {audience}\n\nIn today's fast-paced world, {audience} need efficient solutions. Here's how our products can help:\n\n1. Save time with automation\n2. Reduce costs with smart technology\n3. Improve results with data-driven insights",
-            "long": f"""# 5 Ways Our Solutions Are Transforming the Industry
+        logger.error(f"Azure OpenAI connectivity probe failed: {str(e)}")
+        return connectivity_probe.finish(e, timed_out=isinstance(e, APITimeoutError))
+    connectivity_probe.finish()
+    logger.info(f"Azure OpenAI connectivity probe succeeded in {get_probe_state()['latency']:.2f} seconds")
+    return True
 
-In today's fast-paced world, {audience} are seeking innovative solutions to everyday challenges. The good news? Our offerings have never been more exciting or accessible.
+def start_connectivity_probe():
+    """Run the connectivity probe in a daemon thread so callers never block on it."""
+    thread = threading.Thread(target=run_connectivity_probe, name="azure-openai-probe", daemon=True)
+    thread.start()
+    return thread
 
-## The Evolution of Excellence
+if STARTUP_PROBE_ENABLED:
+    if FAST_START:
+        start_connectivity_probe()
+    else:
+        run_connectivity_probe()
 
-Recent studies show that over 70% of consumers are actively searching for solutions that provide meaningful improvements. This shift has driven us to rethink our approach from the ground up.
+def call_azure_openai(messages, deployment=None, deadline=None, check_cancelled=None, **kwargs):
+    """
+    Send a chat completion request to an Azure OpenAI deployment (the default one if not given).
 
-## How Our Solutions Make a Difference
+    Every call passes the circuit breaker (failing fast while it is open) and
+    is admitted through the shared rate limiter. A 429 pauses admissions for
+    the Retry-After period and the call is queued again, so it only fails once
+    ``deadline`` (a ``time.monotonic()`` value) has passed. ``check_cancelled``
+    is called while the call waits for admission and before each retry, and
+    raises to abandon it (background jobs pass ``Job.check_cancelled``).
+    """
+    if client is None and not init_openai_client():
+        raise RuntimeError("Azure OpenAI client is not initialized")
+    deployment, params, estimated_tokens = upstream_request(messages, deployment, kwargs)
+    if deadline is None:
+        deadline = time.monotonic() + UPSTREAM_QUEUE_TIMEOUT
 
-### 1. Efficiency That Pays For Itself
+    # 429s are retried here after Retry-After, so the SDK must not retry them as well,
+    # and the per-call timeout replaces the SDK's long default
+    upstream = client.with_options(max_retries=0, timeout=UPSTREAM_TIMEOUT)
+    while True:
+        if check_cancelled is not None:
+            check_cancelled()
+        circuit_breaker.before_call()
+        try:
+            upstream_admission_wait.observe(rate_limiter.acquire(estimated_tokens, deadline, check_cancelled))
+        except Exception:
+            circuit_breaker.release()
+            raise
+        call_start = time.perf_counter()
+        try:
+            response = upstream.chat.completions.create(
+                model=deployment,
+                messages=messages,
+                **params
+            )
+        except RateLimitError as e:
+            record_rate_limited(e, deployment, call_start)
+            continue
+        except Exception as e:
+            record_call_error(e, deployment, call_start)
+            raise
+        record_call_success(response, deployment, call_start, estimated_tokens)
+        return response
 
-Our innovative products don't just improve your experience—they improve your bottom line. Our customers report saving 25% more time and resources compared to conventional solutions.
+def generate_upstream(messages, content_type, length, cache_key=None, coalesce_key=None):
+    """
+    Generate content upstream and cache it, coalescing concurrent identical requests.
 
-### 2. Superior Materials, Superior Performance
+    Returns a tuple of (result, coalesced) where result is a dict with
+    ``content``, ``usage``, ``generation_time``, ``budget`` and ``routing`` and
+    coalesced is True if the result was shared from another request's in-flight call.
+    """
+    def produce():
+        generation = Generation(messages, content_type, length, cache_key)
+        while True:
+            call_start = time.time()
+            response = call_azure_openai(messages, **generation.call_params())
+            if not generation.record_response(response, time.time() - call_start):
+                return generation.result()
 
-We use only the highest quality components that outperform conventional alternatives in durability and functionality. This commitment to quality ensures a longer lifespan and better performance.
+    if not COALESCING_ENABLED or not coalesce_key:
+        return produce(), False
+    return request_coalescer.do(coalesce_key, produce, timeout=COALESCING_WAIT_TIMEOUT)
 
-### 3. Intelligent Design Reduces Waste
+def generate_variants_upstream(messages, content_type, length, count, cache_key=None, coalesce_key=None):
+    """
+    Generate ``count`` alternatives in one upstream call, reusing cached ones.
 
-Our design philosophy emphasizes longevity, repairability, and sustainability. We proudly offer lifetime support on our products, with modular components that can be easily replaced.
+    Returns a tuple of (result, coalesced) where result is a dict with
+    ``variants`` (ordered by index), ``usage``, ``generation_time``,
+    ``budget`` and ``routing``.
+    """
+    def produce():
+        generation = VariantsGeneration(messages, content_type, length, count, cache_key)
+        if generation.missing:
+            call_start = time.time()
+            response = call_azure_openai(messages, **generation.call_params())
+            generation.record_response(response, time.time() - call_start)
+        return generation.result()
 
-### 4. Enhanced User Experience
+    if not COALESCING_ENABLED or not coalesce_key:
+        return produce(), False
+    return request_coalescer.do(coalesce_key, produce, timeout=COALESCING_WAIT_TIMEOUT)
 
-Our products contain fewer complications and a more intuitive interface, leading to better user satisfaction and fewer support issues. This creates a better experience for everyone.
+@app.before_request
+def start_request_timer():
+    """Record the request start time for latency metrics."""
+    g.request_start_time = time.perf_counter()
+    http_requests_in_flight.inc()
 
-### 5. Innovation and Practicality Join Forces
+@app.after_request
+def record_request_metrics(response):
+    """Record per-route request count and latency."""
+    start_time = g.pop('request_start_time', None)
+    if start_time is not None:
+        http_requests_in_flight.dec()
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_requests_total.inc(route=route, method=request.method, status=str(response.status_code))
+        http_request_duration.observe(time.perf_counter() - start_time, route=route, method=request.method)
+    return response
 
-Our technology works hand-in-hand with practical needs. From intelligent interfaces that learn your preferences to automated features that save time, our innovations help maximize your efficiency.
+def collect_component_metrics():
+    """Refresh component gauges from the stats of the shared components, content library and jobs."""
+    collect_generation_metrics(request_coalescer)
+    content_library.collect_metrics(component_gauge)
+    job_stats = job_manager.stats()
+    for state, count in job_stats['by_status'].items():
+        component_gauge.set(count, component='jobs', stat=state)
 
-## Making the Transition
+metrics_registry.add_collector(collect_component_metrics)
 
-Transforming your experience doesn't require a complete overhaul overnight. Start by exploring our solutions that address your most pressing needs, where the impact will be greatest.
-
-Remember that every improvement contributes to a larger collective benefit. Your choice today helps create a better tomorrow."""
-        }
-    }
-    
-    # Get the appropriate template based on content type and length
-    content_type_key = "social"  # default
-    if content_type.lower() in ["social media", "social media post", "tweet", "social"]:
-        content_type_key = "social"
-    elif content_type.lower() in ["email", "email/newsletter", "newsletter", "email campaign"]:
-        content_type_key = "email" 
-    elif content_type.lower() in ["blog post", "article", "blog"]:
-        content_type_key = "blog"
-        
-    # Get the appropriate length (default to medium if not found)
-    length = length.lower() if length else "medium"
-    if length not in ["short", "medium", "long"]:
-        length = "medium"
-        
-    # Return the content based on type and length
-    if content_type_key in content_templates and length in content_templates[content_type_key]:
-        return content_templates[content_type_key][length]
-    
-    # Fallback for other content types
-    return f"""Here's a sample {content_type} for {audience} with a {tone} tone, {length} length.
-
-{prompt}
-
-This would be custom-generated marketing content that highlights the benefits of our product while appealing directly to {audience} using language and references that resonate with them."""
+@app.route('/metrics')
+def metrics():
+    """Expose metrics in the Prometheus text format."""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
 
 @app.route('/')
 def index():
@@ -286,7 +327,13 @@ def status():
         'client_initialized': client is not None,
         'client_exists': client is not None,
         'api_version': AZURE_OPENAI_API_VERSION,
-        'deployment': AZURE_OPENAI_DEPLOYMENT
+        'deployment': AZURE_OPENAI_DEPLOYMENT,
+        'fast_start': FAST_START,
+        'startup_probe': get_probe_state(),
+        **generation_status(request_coalescer),
+        'jobs': job_manager.stats(),
+        'content_store': content_library.content_store.stats(),
+        'search_index': content_library.search_index.stats()
     }
     
     return jsonify(status_info)
@@ -310,16 +357,168 @@ def get_template(template_type):
     else:
         return jsonify({"template": "Please provide details for your content."})
 
+def generate_variants_response(variants):
+    """Handle a /generate request for several variants, returned as an array alongside ``content``."""
+    content_type = request.form.get('content_type', '')
+    prompt = request.form.get('prompt', '')
+    audience = request.form.get('audience', 'general audience')
+    tone = request.form.get('tone', 'professional')
+    length = request.form.get('length', 'medium')
+    save = request.form.get('save', 'false') == 'true'
+    user_id = request.cookies.get('user_id') or datetime.now().strftime("%Y%m%d%H%M%S")
+    metadata = {
+        'content_type': content_type,
+        'audience': audience,
+        'tone': tone,
+        'length': length,
+        'variants_requested': variants
+    }
+    user_message = {"role": "user", "content": build_enhanced_prompt(content_type, audience, tone, length, prompt)}
+
+    try:
+        start_time = time.time()
+        logger.info(f"Generating {variants} variants for '{content_type}' with prompt: '{prompt[:50]}...'")
+        messages = conversation_history.build_messages(user_id, user_message)
+        result, coalesced = generate_variants_upstream(
+            messages,
+            content_type,
+            length,
+            variants,
+            cache_key=generation_cache_key(request.form, content_type, audience, tone, length, prompt),
+            coalesce_key=f"{request_key(content_type, audience, tone, length, prompt)}:variants:{variants}"
+        )
+        generated_variants = result['variants']
+        generated_content = generated_variants[0]['content']
+        conversation_history.append_turn(user_id, user_message, {"role": "assistant", "content": generated_content})
+        elapsed_time = time.time() - start_time
+        logger.info(f"{len(generated_variants)} variants generated in {elapsed_time:.2f} seconds (coalesced: {coalesced})")
+
+        if save:
+            content_library.save_generated(content_type, generated_content, audience, tone)
+
+        all_cached = all(variant['cached'] for variant in generated_variants)
+        resp = make_response(jsonify({
+            'status': 'success',
+            'content': generated_content,
+            'variants': generated_variants,
+            'metadata': dict(metadata,
+                             timestamp=datetime.now().isoformat(),
+                             generation_time=f"{elapsed_time:.2f}s",
+                             generation_mode='cache' if all_cached else 'azure_openai',
+                             coalesced=coalesced,
+                             usage=result['usage'],
+                             budget=result['budget'],
+                             routing=result['routing'],
+                             cache=cache_metadata())
+        }))
+    except Exception as e:
+        logger.error(f"Error generating variants: {str(e)}")
+        logger.error(traceback.format_exc())
+        try:
+            # Sample content is deterministic, so a single variant is returned
+            logger.info("Falling back to sample content generation due to API error")
+            generated_content = generate_sample_content(
+                content_type=content_type,
+                audience=audience,
+                tone=tone,
+                length=length,
+                prompt=prompt
+            )
+            resp = make_response(jsonify({
+                'status': 'success',
+                'content': generated_content,
+                'variants': [{'index': 0, 'content': generated_content, 'finish_reason': None,
+                              'completion_tokens': None, 'cached': False}],
+                'metadata': dict(metadata,
+                                 timestamp=datetime.now().isoformat(),
+                                 generation_mode='sample',
+                                 fallback_reason=str(e))
+            }))
+        except Exception as fallback_error:
+            logger.error(f"Error generating fallback content: {str(fallback_error)}")
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'fallback_error': str(fallback_error)
+            }), 500
+
+    resp.set_cookie('user_id', user_id)
+    return resp
+
 @app.route('/generate', methods=['POST'])
 def generate_content():
     """Generate content based on the template and user inputs"""
-    # Debug entry into generate endpoint
-    logger.debug(f"Generate endpoint called: method={request.method}")
-    logger.debug(f"Form data: {dict(request.form)}")
-    # Log environment API_VERSION vs hardcoded version
-    env_api_version = os.getenv("AZURE_OPENAI_API_VERSION")
-    logger.debug(f"Environment AZURE_OPENAI_API_VERSION: {env_api_version}")
-    logger.debug(f"Using AZURE_OPENAI_API_VERSION: {AZURE_OPENAI_API_VERSION}")
+    # Debug entry into generate endpoint; skip building these messages when DEBUG is off
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Generate endpoint called: method={request.method}")
+        logger.debug(f"Form data: {dict(request.form)}")
+        # Log environment API_VERSION vs hardcoded version
+        env_api_version = os.getenv("AZURE_OPENAI_API_VERSION")
+        logger.debug(f"Environment AZURE_OPENAI_API_VERSION: {env_api_version}")
+        logger.debug(f"Using AZURE_OPENAI_API_VERSION: {AZURE_OPENAI_API_VERSION}")
+
+    # Long generations can run as background jobs polled through /jobs/<id>
+    if request.args.get('async', '').lower() in ('1', 'true'):
+        return submit_generation_job()
+
+    # Several alternatives are generated in one upstream call
+    try:
+        variants = parse_variants(request.form)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    if variants > 1:
+        return generate_variants_response(variants)
+
+    # Serve repeated requests from the generation cache before touching the client
+    try:
+        content_type = request.form.get('content_type', '')
+        prompt = request.form.get('prompt', '')
+        audience = request.form.get('audience', 'general audience')
+        tone = request.form.get('tone', 'professional')
+        length = request.form.get('length', 'medium')
+        save = request.form.get('save', 'false') == 'true'
+        
+        cache_key = generation_cache_key(request.form, content_type, audience, tone, length, prompt)
+        cached = generation_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            logger.info(f"Serving '{content_type}' from generation cache")
+            generations_total.inc(mode='cache')
+            generated_content = cached['content']
+            
+            user_id = request.cookies.get('user_id') or datetime.now().strftime("%Y%m%d%H%M%S")
+            conversation_history.append_turn(
+                user_id,
+                {"role": "user", "content": build_enhanced_prompt(content_type, audience, tone, length, prompt)},
+                {"role": "assistant", "content": generated_content}
+            )
+            
+            if save:
+                content_library.save_generated(content_type, generated_content, audience, tone)
+            
+            resp = make_response(jsonify({
+                'status': 'success',
+                'content': generated_content,
+                'metadata': {
+                    'content_type': content_type,
+                    'audience': audience,
+                    'tone': tone,
+                    'length': length,
+                    'timestamp': datetime.now().isoformat(),
+                    'generation_time': "0.00s",
+                    'generation_mode': 'cache',
+                    'cached_at': datetime.fromtimestamp(cached['created_at']).isoformat(),
+                    'usage': cached['usage'],
+                    'cache': cache_metadata()
+                }
+            }))
+            resp.set_cookie('user_id', user_id)
+            return resp
+    except Exception as e:
+        logger.error(f"Error reading generation cache: {str(e)}")
+        logger.error(traceback.format_exc())
 
     # Always ensure client is initialized
     if client is None:
@@ -389,50 +588,37 @@ def generate_content():
         
         logger.info(f"Generating content for '{content_type}' with prompt: '{prompt[:50]}...'")
         
-        # Build conversation history
-        user_id = request.cookies.get('user_id') or datetime.now().strftime("%Y%m%d%H%M%S")
-        conversation = conversation_history.setdefault(user_id, [])
-        if not conversation:
-            conversation.append({"role": "system", "content": "You are a marketing expert specialized in creating compelling and effective marketing content. You are excellent at adapting your writing style to different audiences and tones."})
-        
         # Enhance the prompt with specific details
-        enhanced_prompt = f"""Content Type: {content_type}
-Target Audience: {audience}
-Tone: {tone}
-Length: {length}
-
-Instructions: {prompt}
-
-Create a {tone} {content_type} for {audience}. The content should be {length} in length and follow marketing best practices. Ensure the content is engaging, on-brand, and includes a clear call-to-action.
-"""
+        enhanced_prompt = build_enhanced_prompt(content_type, audience, tone, length, prompt)
+        user_message = {"role": "user", "content": enhanced_prompt}
         
-        conversation.append({"role": "user", "content": enhanced_prompt})
+        # Build conversation history within the session token budget
+        user_id = request.cookies.get('user_id') or datetime.now().strftime("%Y%m%d%H%M%S")
+        messages = conversation_history.build_messages(user_id, user_message)
         
-        # Call OpenAI API
-        logger.debug(f"Client object before API call: {client}")
-        response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT,
-            messages=conversation,
-            max_tokens=4096,
-            temperature=0.7,
+        # Call OpenAI API, sharing the call with concurrent identical requests;
+        # the result is cached so repeated requests skip the upstream call
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Client object before API call: {client}")
+        result, coalesced = generate_upstream(
+            messages,
+            content_type,
+            length,
+            cache_key=generation_cache_key(request.form, content_type, audience, tone, length, prompt),
+            coalesce_key=request_key(content_type, audience, tone, length, prompt)
         )
-        generated_content = response.choices[0].message.content
+        generated_content = result['content']
+        usage = result['usage']
         logger.info(f"Received response: '{generated_content[:50]}...'")
-        conversation.append({"role": "assistant", "content": generated_content})
+        conversation_history.append_turn(user_id, user_message, {"role": "assistant", "content": generated_content})
         
         # Calculate generation time
         elapsed_time = time.time() - start_time
-        logger.info(f"Content generated in {elapsed_time:.2f} seconds")
+        logger.info(f"Content generated in {elapsed_time:.2f} seconds (coalesced: {coalesced})")
         
         # Handle save
         if save:
-            content_dir = Path('content')
-            content_dir.mkdir(exist_ok=True)
-            filename = f"{content_type.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d%H%M%S')}.txt"
-            file_path = content_dir / filename
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(generated_content)
-            logger.info(f"Saved content to file: {file_path}")
+            content_library.save_generated(content_type, generated_content, audience, tone)
         
         # Return response
         resp = make_response(jsonify({
@@ -445,7 +631,12 @@ Create a {tone} {content_type} for {audience}. The content should be {length} in
                 'length': length,
                 'timestamp': datetime.now().isoformat(),
                 'generation_time': f"{elapsed_time:.2f}s",
-                'generation_mode': 'azure_openai'
+                'generation_mode': 'azure_openai',
+                'coalesced': coalesced,
+                'usage': usage,
+                'budget': result['budget'],
+                'routing': result['routing'],
+                'cache': cache_metadata()
             }
         }))
         resp.set_cookie('user_id', user_id)
@@ -501,11 +692,329 @@ Create a {tone} {content_type} for {audience}. The content should be {length} in
                 'fallback_error': str(fallback_error)
             }), 500
 
+@app.route('/generate/stream', methods=['POST'])
+def generate_content_stream():
+    """Stream generated content to the client as Server-Sent Events.
+
+    Emits ``delta`` events as tokens arrive and a final ``done`` event carrying
+    the full content and metadata. If the upstream call fails before the first
+    token, the sample content is sent instead so the client always gets a result.
+    """
+    logger.debug(f"Generate stream endpoint called: method={request.method}")
+    
+    # Get form data
+    content_type = request.form.get('content_type', '')
+    prompt = request.form.get('prompt', '')
+    audience = request.form.get('audience', 'general audience')
+    tone = request.form.get('tone', 'professional')
+    length = request.form.get('length', 'medium')
+    save = request.form.get('save', 'false') == 'true'
+    user_id = request.cookies.get('user_id') or datetime.now().strftime("%Y%m%d%H%M%S")
+    
+    metadata = {
+        'content_type': content_type,
+        'audience': audience,
+        'tone': tone,
+        'length': length
+    }
+    
+    def fallback_events(reason):
+        return sample_events(metadata, reason, content_type, audience, tone, length, prompt)
+    
+    cache_key = generation_cache_key(request.form, content_type, audience, tone, length, prompt)
+    
+    def event_stream():
+        cached = generation_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            logger.info(f"Streaming '{content_type}' from generation cache")
+            generations_total.inc(mode='cache')
+            generated_content = cached['content']
+            conversation_history.append_turn(
+                user_id,
+                {"role": "user", "content": build_enhanced_prompt(content_type, audience, tone, length, prompt)},
+                {"role": "assistant", "content": generated_content}
+            )
+            if save:
+                content_library.save_generated(content_type, generated_content, audience, tone)
+            yield from cached_events(metadata, generated_content)
+            return
+        
+        if client is None and not init_openai_client():
+            logger.error("Failed to initialize Azure OpenAI client in generate stream endpoint")
+            yield from fallback_events("Azure OpenAI client is not initialized")
+            return
+        
+        user_message = {"role": "user", "content": build_enhanced_prompt(content_type, audience, tone, length, prompt)}
+        
+        generation = None
+        stream = None
+        try:
+            logger.info(f"Streaming content for '{content_type}' with prompt: '{prompt[:50]}...'")
+            messages = conversation_history.build_messages(user_id, user_message)
+            generation = StreamGeneration(messages, content_type, length)
+            stream = call_azure_openai(messages, **generation.call_params())
+            for chunk in stream:
+                delta = generation.add_chunk(chunk)
+                if delta:
+                    yield format_sse('delta', {'content': delta})
+        except Exception as e:
+            logger.error(f"Error in generate stream endpoint: {str(e)}")
+            logger.error(traceback.format_exc())
+            if generation is None or not generation.parts:
+                yield from fallback_events(str(e))
+            else:
+                # The stream opened successfully and then broke off
+                generation.record_error(e)
+                # Tokens were already sent, so the client keeps the partial text
+                yield format_sse('error', {
+                    'status': 'error',
+                    'message': str(e),
+                    'content': generation.content
+                })
+            return
+        finally:
+            # Also runs on GeneratorExit when the client disconnects, releasing the upstream connection
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+        
+        generated_content = generation.content
+        conversation_history.append_turn(user_id, user_message, {"role": "assistant", "content": generated_content})
+        stream_metadata = generation.finish('azure_openai_stream', cache_key)
+        
+        if save:
+            content_library.save_generated(content_type, generated_content, audience, tone)
+        
+        yield format_sse('done', {
+            'status': 'success',
+            'content': generated_content,
+            'metadata': dict(metadata,
+                             timestamp=datetime.now().isoformat(),
+                             **stream_metadata,
+                             cache=cache_metadata())
+        })
+    
+    resp = Response(stream_with_context(event_stream()), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    resp.headers['X-Accel-Buffering'] = 'no'
+    resp.set_cookie('user_id', user_id)
+    return resp
+
+def run_generation_job(job, fields, cache_key, user_id):
+    """Generate content for a background job, streaming tokens into its partial output.
+
+    Returns the same payload /generate responds with. Cancellation is checked
+    while the call waits for admission or a 429 retry and between streamed
+    chunks, and the upstream stream is closed when it happens.
+    """
+    content_type, prompt, audience, tone, length, save = (
+        fields['content_type'], fields['prompt'], fields['audience'], fields['tone'], fields['length'], fields['save']
+    )
+    metadata = {
+        'content_type': content_type,
+        'audience': audience,
+        'tone': tone,
+        'length': length
+    }
+    user_message = {"role": "user", "content": build_enhanced_prompt(content_type, audience, tone, length, prompt)}
+    
+    cached = generation_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        generations_total.inc(mode='cache')
+        generated_content = cached['content']
+        job.append_output(generated_content)
+        metadata.update(generation_time="0.00s", generation_mode='cache',
+                        cached_at=datetime.fromtimestamp(cached['created_at']).isoformat(),
+                        usage=cached['usage'])
+    else:
+        stream = None
+        try:
+            if client is None and not init_openai_client():
+                raise RuntimeError("Azure OpenAI client is not initialized")
+            messages = conversation_history.build_messages(user_id, user_message)
+            generation = StreamGeneration(messages, content_type, length)
+            stream = call_azure_openai(messages, check_cancelled=job.check_cancelled, **generation.call_params())
+            for chunk in stream:
+                job.check_cancelled()
+                delta = generation.add_chunk(chunk)
+                if delta:
+                    job.append_output(delta)
+        except JobCancelled:
+            logger.info(f"Job {job.id} cancelled after {len(job.partial_output)} characters")
+            raise
+        except Exception as e:
+            if job.partial_output:
+                # Tokens were already produced, so keep them as the job's partial output
+                generation.record_error(e)
+                raise
+            logger.error(f"Error in generation job {job.id}: {str(e)}")
+            generated_content = generate_sample_content(
+                content_type=content_type,
+                audience=audience,
+                tone=tone,
+                length=length,
+                prompt=prompt
+            )
+            job.append_output(generated_content)
+            metadata.update(timestamp=datetime.now().isoformat(), generation_mode='sample', fallback_reason=str(e))
+            return {'status': 'success', 'content': generated_content, 'metadata': metadata}
+        finally:
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+        
+        generated_content = generation.content
+        metadata.update(generation.finish('azure_openai_job', cache_key))
+    
+    conversation_history.append_turn(user_id, user_message, {"role": "assistant", "content": generated_content})
+    if save:
+        content_library.save_generated(content_type, generated_content, audience, tone)
+    metadata.update(timestamp=datetime.now().isoformat(), cache=cache_metadata())
+    return {'status': 'success', 'content': generated_content, 'metadata': metadata}
+
+def submit_generation_job():
+    """Queue the current /generate request as a background job and return its id."""
+    fields = dict(zip(('content_type', 'prompt', 'audience', 'tone', 'length', 'save'),
+                      read_generation_form(request.form)))
+    cache_key = generation_cache_key(request.form, fields['content_type'], fields['audience'],
+                                     fields['tone'], fields['length'], fields['prompt'])
+    user_id = request.cookies.get('user_id') or datetime.now().strftime("%Y%m%d%H%M%S")
+    try:
+        job = job_manager.submit('generate', run_generation_job, fields, cache_key, user_id)
+    except JobQueueFull as e:
+        logger.warning(f"Rejected generation job: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 503
+    
+    logger.info(f"Queued generation job {job.id} for '{fields['content_type']}'")
+    resp = make_response(jsonify({
+        'status': 'accepted',
+        'job_id': job.id,
+        'job_status': job.status,
+        'status_url': f"/jobs/{job.id}"
+    }), 202)
+    resp.set_cookie('user_id', user_id)
+    return resp
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Return a background job's status, partial output and result."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'Unknown or expired job: {job_id}'}), 404
+    return jsonify(dict(job.to_dict(), status='success'))
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running background job."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'Unknown or expired job: {job_id}'}), 404
+    return jsonify({'status': 'success', 'job_id': job.id, 'job_status': job.status, 'cancel_requested': True})
+
+def generate_batch_item(index, spec):
+    """Generate one item of a batch request, falling back to sample content on failure."""
+    start_time = time.time()
+    content_type, prompt, audience, tone, length, save = read_batch_item(spec)
+    
+    metadata = {
+        'content_type': content_type,
+        'audience': audience,
+        'tone': tone,
+        'length': length
+    }
+    
+    try:
+        cache_key = generation_cache_key(spec, content_type, audience, tone, length, prompt)
+        cached = generation_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            generated_content = cached['content']
+            generations_total.inc(mode='cache')
+            metadata.update(generation_mode='cache', usage=cached['usage'])
+        else:
+            result, coalesced = generate_upstream(
+                batch_messages(content_type, audience, tone, length, prompt),
+                content_type,
+                length,
+                cache_key=cache_key,
+                coalesce_key=request_key(content_type, audience, tone, length, prompt)
+            )
+            generated_content = result['content']
+            metadata.update(generation_mode='azure_openai', coalesced=coalesced, usage=result['usage'],
+                            budget=result['budget'], routing=result['routing'])
+    except Exception as e:
+        logger.error(f"Error generating batch item {index}: {str(e)}")
+        try:
+            generated_content = generate_sample_content(
+                content_type=content_type,
+                audience=audience,
+                tone=tone,
+                length=length,
+                prompt=prompt
+            )
+            metadata.update(generation_mode='sample', fallback_reason=str(e))
+        except Exception as fallback_error:
+            logger.error(f"Error generating fallback content for batch item {index}: {str(fallback_error)}")
+            return {
+                'index': index,
+                'status': 'error',
+                'message': str(e),
+                'fallback_error': str(fallback_error)
+            }
+    
+    if save:
+        content_library.save_generated(content_type, generated_content, audience, tone)
+    
+    elapsed_time = time.time() - start_time
+    metadata.update(timestamp=datetime.now().isoformat(), generation_time=f"{elapsed_time:.2f}s")
+    return {
+        'index': index,
+        'status': 'success',
+        'content': generated_content,
+        'metadata': metadata
+    }
+
+@app.route('/generate/batch', methods=['POST'])
+def generate_content_batch():
+    """Generate several pieces of content concurrently.
+
+    Accepts a JSON body ``{"items": [...], "max_concurrency": n}`` (or a bare
+    list of items) where each item has the same fields as the /generate form.
+    Items run concurrently up to the concurrency limit and results are returned
+    in input order; failed items fall back to sample content individually.
+    """
+    try:
+        items, max_concurrency = parse_batch_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    logger.info(f"Generating batch of {len(items)} items with concurrency {max_concurrency}")
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch-generate") as executor:
+        results = list(executor.map(generate_batch_item, range(len(items)), items))
+    elapsed_time = time.time() - start_time
+    logger.info(f"Batch of {len(items)} items generated in {elapsed_time:.2f} seconds")
+    
+    return jsonify(batch_response(results, max_concurrency, elapsed_time))
+
 @app.route('/content/<path:filename>')
 def download_content(filename):
     """Serve content files for download."""
     logger.debug(f"Download requested for {filename}")
-    return send_from_directory('content', filename)
+    content_store = content_library.content_store
+    record = content_store.lookup(filename)
+    if record is None and content_store.write_error(filename) is not None:
+        logger.error(f"Download of {filename} failed: its write was dropped")
+        return jsonify({
+            'status': 'error',
+            'message': 'Content could not be saved'
+        }), 500
+    if record is None:
+        # Files written before the content store existed are still served from the flat directory
+        if '/' in filename or filename.startswith('.'):
+            abort(404)
+        return send_from_directory(content_store.root, filename)
+    status_code, headers, body = build_content_response(record, request.headers, content_store)
+    return Response(body, status=status_code, headers=headers)
 
 @app.route('/export/<format_type>', methods=['POST'])
 def export_content(format_type):
@@ -513,69 +1022,9 @@ def export_content(format_type):
     try:
         content = request.json.get('content', '')
         content_type = request.json.get('content_type', 'Content')
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        filename = f"{content_type.replace(' ', '_')}_{timestamp}"
-        
-        content_dir = Path('content')
-        content_dir.mkdir(exist_ok=True)
-        
-        if format_type == 'md':
-            file_path = content_dir / f"{filename}.md"
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            return jsonify({
-                'status': 'success',
-                'message': 'Content exported as Markdown',
-                'filename': file_path.name,
-                'download_url': f"/content/{file_path.name}"
-            })
-            
-        elif format_type == 'txt':
-            file_path = content_dir / f"{filename}.txt"
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            return jsonify({
-                'status': 'success',
-                'message': 'Content exported as text',
-                'filename': file_path.name,
-                'download_url': f"/content/{file_path.name}"
-            })
-            
-        elif format_type == 'pdf':
-            # For PDF, we'll create a simple HTML file and return it
-            # The actual PDF conversion should happen on the client side using a library like html2pdf
-            file_path = content_dir / f"{filename}.html"
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>{content_type}</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; }}
-                    h1 {{ color: #333; }}
-                    pre {{ white-space: pre-wrap; }}
-                </style>
-            </head>
-            <body>
-                <h1>{content_type}</h1>
-                <pre>{content}</pre>
-            </body>
-            </html>
-            """
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(html_content)
-            return jsonify({
-                'status': 'success',
-                'message': 'Content prepared for PDF export',
-                'filename': file_path.name,
-                'download_url': f"/content/{file_path.name}",
-                'html_content': html_content
-            })
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': f'Unsupported export format: {format_type}'
-            }), 400
+        payload, status_code = content_library.export(format_type, content, content_type,
+                                                      request.json.get('audience'), request.json.get('tone'))
+        return jsonify(payload), status_code
     except Exception as e:
         logger.error(f"Error exporting content: {str(e)}")
         logger.error(traceback.format_exc())
@@ -590,75 +1039,9 @@ def share_content(platform):
     try:
         content = request.json.get('content', '')
         content_type = request.json.get('content_type', 'Content')
-        
-        # Store the content for sharing
-        content_dir = Path('content')
-        content_dir.mkdir(exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        filename = f"{platform}_{content_type.replace(' ', '_')}_{timestamp}.txt"
-        file_path = content_dir / filename
-        
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
-            
-        share_url = None
-        share_message = None
-        
-        if platform == 'social':
-            # Simulate social media sharing
-            share_url = f"/content/{filename}"
-            share_message = "Content prepared for social media sharing"
-            logger.info(f"Social media content prepared: {file_path}")
-            
-        elif platform == 'email':
-            # Simulate email campaign creation
-            email_template = f"""
-Subject: {content_type}
-
-{content}
-
----
-This email was generated using the Marketing AI System.
-"""
-            email_file = content_dir / f"email_{content_type.replace(' ', '_')}_{timestamp}.eml"
-            with open(email_file, "w", encoding="utf-8") as f:
-                f.write(email_template)
-                
-            share_url = f"/content/{email_file.name}"
-            share_message = "Content prepared for email campaigns"
-            logger.info(f"Email content prepared: {email_file}")
-            
-        elif platform == 'blog':
-            # Simulate blog post creation
-            blog_template = f"""
-# {content_type}
-
-{content}
-
----
-*This blog post was generated using the Marketing AI System.*
-"""
-            blog_file = content_dir / f"blog_{content_type.replace(' ', '_')}_{timestamp}.md"
-            with open(blog_file, "w", encoding="utf-8") as f:
-                f.write(blog_template)
-                
-            share_url = f"/content/{blog_file.name}"
-            share_message = "Content prepared for blog publishing"
-            logger.info(f"Blog content prepared: {blog_file}")
-            
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': f'Unsupported sharing platform: {platform}'
-            }), 400
-            
-        return jsonify({
-            'status': 'success',
-            'message': share_message,
-            'platform': platform,
-            'filename': file_path.name,
-            'download_url': share_url
-        })
+        payload, status_code = content_library.share(platform, content, content_type,
+                                                     request.json.get('audience'), request.json.get('tone'))
+        return jsonify(payload), status_code
         
     except Exception as e:
         logger.error(f"Error sharing content: {str(e)}")
@@ -668,6 +1051,20 @@ This email was generated using the Marketing AI System.
             'message': f"Failed to share content: {str(e)}"
         }), 500
 
+@app.route('/search', methods=['GET'])
+def search_content():
+    """Full-text search over saved, exported and shared content."""
+    try:
+        payload, status_code = content_library.search(request.args)
+        return jsonify(payload), status_code
+    except Exception as e:
+        logger.error(f"Error searching content: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to search content: {str(e)}"
+        }), 500
+
 @app.route('/static/<path:path>')
 def serve_static(path):
     """Serve static files"""
@@ -676,7 +1073,12 @@ def serve_static(path):
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for monitoring."""
-    return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "client_initialized": client is not None,
+        "azure_openai": get_probe_state()['status']
+    })
 
 @app.errorhandler(404)
 def page_not_found(e):
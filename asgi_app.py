@@ -0,0 +1,750 @@
+"""
+ASGI Serving Mode
+
+Serves the marketing app's routes on an ASGI server with ``AsyncAzureOpenAI``,
+so a single worker can hold many slow upstream calls open without a thread per
+request. Routes, JSON shapes and fallbacks match the Flask app in ``app.py``;
+both apps build on ``generation_service`` and ``content_library``, so the
+generation cache, budget, router, rate limiter, circuit breaker, conversation
+store and metrics behave the same. This module never imports the Flask app.
+
+Requires ``quart`` and an ASGI server (see Marketing_updates/requirements.txt), e.g.::
+
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+"""
+
+import asyncio
+import logging
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+
+from openai import APITimeoutError, AsyncAzureOpenAI, RateLimitError
+from quart import Quart, Response, abort, g, jsonify, make_response, render_template, request, send_from_directory
+
+from content_delivery import build_content_response
+from content_library import create_content_library
+from generation_service import (
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_API_VERSION,
+    AZURE_OPENAI_DEPLOYMENT,
+    AZURE_OPENAI_ENDPOINT,
+    COALESCING_ENABLED,
+    COALESCING_WAIT_TIMEOUT,
+    CONTENT_TYPES,
+    FAST_START,
+    PROBE_MESSAGES,
+    STARTUP_PROBE_ENABLED,
+    STARTUP_PROBE_TIMEOUT,
+    TEMPLATES,
+    TONES,
+    UPSTREAM_QUEUE_TIMEOUT,
+    UPSTREAM_TIMEOUT,
+    ConnectivityProbe,
+    Generation,
+    StreamGeneration,
+    VariantsGeneration,
+    batch_messages,
+    batch_response,
+    build_enhanced_prompt,
+    cache_metadata,
+    cached_events,
+    circuit_breaker,
+    collect_generation_metrics,
+    component_gauge,
+    conversation_history,
+    format_sse,
+    generate_sample_content,
+    generation_cache,
+    generation_cache_key,
+    generation_status,
+    generations_total,
+    http_request_duration,
+    http_requests_in_flight,
+    http_requests_total,
+    metrics_registry,
+    parse_batch_request,
+    parse_variants,
+    rate_limiter,
+    read_batch_item,
+    read_generation_form,
+    record_call_error,
+    record_call_success,
+    record_rate_limited,
+    request_key,
+    sample_events,
+    upstream_admission_wait,
+    upstream_request,
+)
+from logging_config import setup_logging_from_env
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from single_flight import AsyncSingleFlight
+
+log_listener = setup_logging_from_env(Path("logs"))
+logger = logging.getLogger(__name__)
+
+app = Quart(__name__,
+            static_folder="static",
+            template_folder="Marketing_updates/templates")
+app.json.ensure_ascii = False
+
+# Created on first use inside the event loop that serves requests
+async_client = None
+async_client_lock = asyncio.Lock()
+
+request_coalescer = AsyncSingleFlight()
+
+# Saved, exported and shared content and its full-text index for /search
+content_library = create_content_library()
+
+# Connectivity probe state reported by /status and /health; the probe runs once serving starts
+connectivity_probe = ConnectivityProbe(STARTUP_PROBE_ENABLED)
+probe_task = None
+
+async def init_async_openai_client():
+    """Initialize the async OpenAI client if it's not already initialized"""
+    global async_client
+
+    async with async_client_lock:
+        if async_client is not None:
+            return True
+        try:
+            logger.info("Initializing async Azure OpenAI client")
+            async_client = AsyncAzureOpenAI(
+                api_key=AZURE_OPENAI_API_KEY,
+                azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                api_version=AZURE_OPENAI_API_VERSION
+            )
+            logger.info("Async Azure OpenAI client initialized successfully")
+            return True
+        except Exception as e:
+            logger.error(f"Error initializing async Azure OpenAI client: {str(e)}")
+            logger.error(f"Full error: {traceback.format_exc()}")
+            return False
+
+async def run_connectivity_probe():
+    """Send a one-token completion to verify Azure OpenAI connectivity and record the result."""
+    connectivity_probe.begin()
+    try:
+        if not await init_async_openai_client():
+            raise RuntimeError("Azure OpenAI client could not be created")
+        probe_client = async_client.with_options(timeout=STARTUP_PROBE_TIMEOUT, max_retries=0)
+        await probe_client.chat.completions.create(
+            model=AZURE_OPENAI_DEPLOYMENT,
+            messages=PROBE_MESSAGES,
+            max_tokens=1
+        )
+    except Exception as e:
+        logger.error(f"Azure OpenAI connectivity probe failed: {str(e)}")
+        return connectivity_probe.finish(e, timed_out=isinstance(e, APITimeoutError))
+    connectivity_probe.finish()
+    logger.info(f"Azure OpenAI connectivity probe succeeded in {connectivity_probe.state()['latency']:.2f} seconds")
+    return True
+
+async def call_azure_openai(messages, deployment=None, deadline=None, **kwargs):
+    """
+    Async counterpart of ``app.call_azure_openai``.
+
+    Calls pass the shared circuit breaker and rate limiter the same way, and
+    429s pause admissions for the Retry-After period before the call is queued
+    again.
+    """
+    if async_client is None and not await init_async_openai_client():
+        raise RuntimeError("Azure OpenAI client is not initialized")
+    deployment, params, estimated_tokens = upstream_request(messages, deployment, kwargs)
+    if deadline is None:
+        deadline = time.monotonic() + UPSTREAM_QUEUE_TIMEOUT
+
+    upstream = async_client.with_options(max_retries=0, timeout=UPSTREAM_TIMEOUT)
+    while True:
+        circuit_breaker.before_call()
+        try:
+            upstream_admission_wait.observe(await rate_limiter.acquire_async(estimated_tokens, deadline))
+        except BaseException:
+            circuit_breaker.release()
+            raise
+        call_start = time.perf_counter()
+        try:
+            response = await upstream.chat.completions.create(
+                model=deployment,
+                messages=messages,
+                **params
+            )
+        except RateLimitError as e:
+            record_rate_limited(e, deployment, call_start)
+            continue
+        except asyncio.CancelledError:
+            # The client went away; that says nothing about upstream health
+            circuit_breaker.release()
+            raise
+        except Exception as e:
+            record_call_error(e, deployment, call_start)
+            raise
+        record_call_success(response, deployment, call_start, estimated_tokens)
+        return response
+
+async def generate_upstream(messages, content_type, length, cache_key=None, coalesce_key=None):
+    """
+    Async counterpart of ``app.generate_upstream``.
+
+    Returns a tuple of (result, coalesced) with the same result dict.
+    """
+    async def produce():
+        generation = Generation(messages, content_type, length, cache_key)
+        while True:
+            call_start = time.time()
+            response = await call_azure_openai(messages, **generation.call_params())
+            if not generation.record_response(response, time.time() - call_start):
+                return generation.result()
+
+    if not COALESCING_ENABLED or not coalesce_key:
+        return await produce(), False
+    return await request_coalescer.do(coalesce_key, produce, timeout=COALESCING_WAIT_TIMEOUT)
+
+async def generate_variants_upstream(messages, content_type, length, count, cache_key=None, coalesce_key=None):
+    """
+    Async counterpart of ``app.generate_variants_upstream``.
+
+    Returns a tuple of (result, coalesced) with the same result dict.
+    """
+    async def produce():
+        generation = VariantsGeneration(messages, content_type, length, count, cache_key)
+        if generation.missing:
+            call_start = time.time()
+            response = await call_azure_openai(messages, **generation.call_params())
+            generation.record_response(response, time.time() - call_start)
+        return generation.result()
+
+    if not COALESCING_ENABLED or not coalesce_key:
+        return await produce(), False
+    return await request_coalescer.do(coalesce_key, produce, timeout=COALESCING_WAIT_TIMEOUT)
+
+def collect_component_metrics():
+    """Refresh component gauges from the stats of the shared components and content library."""
+    collect_generation_metrics(request_coalescer)
+    content_library.collect_metrics(component_gauge)
+
+metrics_registry.add_collector(collect_component_metrics)
+
+@app.before_serving
+async def start_connectivity_probe():
+    """Run the connectivity probe, in the background in fast-start mode so serving never waits on the LLM."""
+    global probe_task
+    if not STARTUP_PROBE_ENABLED:
+        return
+    if FAST_START:
+        probe_task = asyncio.ensure_future(run_connectivity_probe())
+    else:
+        await run_connectivity_probe()
+
+@app.before_request
+async def start_request_timer():
+    """Record the request start time for latency metrics."""
+    g.request_start_time = time.perf_counter()
+    http_requests_in_flight.inc()
+
+@app.after_request
+async def record_request_metrics(response):
+    """Record per-route request count and latency."""
+    start_time = g.pop('request_start_time', None)
+    if start_time is not None:
+        http_requests_in_flight.dec()
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_requests_total.inc(route=route, method=request.method, status=str(response.status_code))
+        http_request_duration.observe(time.perf_counter() - start_time, route=route, method=request.method)
+    return response
+
+@app.route('/metrics')
+async def metrics():
+    """Expose metrics in the Prometheus text format."""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/')
+async def index():
+    """Render the home page"""
+    return await render_template('index.html')
+
+@app.route('/status')
+async def status():
+    """Return API status"""
+    return jsonify({
+        'server': 'online',
+        'client_initialized': async_client is not None,
+        'client_exists': async_client is not None,
+        'api_version': AZURE_OPENAI_API_VERSION,
+        'deployment': AZURE_OPENAI_DEPLOYMENT,
+        'fast_start': FAST_START,
+        'startup_probe': connectivity_probe.state(),
+        **generation_status(request_coalescer),
+        'content_store': content_library.content_store.stats(),
+        'search_index': content_library.search_index.stats()
+    })
+
+@app.route('/content-types', methods=['GET'])
+async def get_content_types():
+    """Get list of available content types."""
+    return jsonify(CONTENT_TYPES)
+
+@app.route('/tones', methods=['GET'])
+async def get_tones():
+    """Get list of available tones."""
+    return jsonify(TONES)
+
+@app.route('/templates/<template_type>')
+async def get_template(template_type):
+    """Get template configuration"""
+    return jsonify({"template": TEMPLATES.get(template_type, "Please provide details for your content.")})
+
+@app.route('/generate', methods=['POST'])
+async def generate_content():
+    """Generate content based on the template and user inputs"""
+    form = await request.form
+    content_type, prompt, audience, tone, length, save = read_generation_form(form)
+    user_id = request.cookies.get('user_id') or datetime.now().strftime("%Y%m%d%H%M%S")
+    metadata = {
+        'content_type': content_type,
+        'audience': audience,
+        'tone': tone,
+        'length': length
+    }
+    try:
+        variants = parse_variants(form)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    if variants > 1:
+        return await generate_variants_response(form, variants)
+
+    try:
+        start_time = time.time()
+        cache_key = generation_cache_key(form, content_type, audience, tone, length, prompt)
+        cached = generation_cache.get(cache_key) if cache_key else None
+        user_message = {"role": "user", "content": build_enhanced_prompt(content_type, audience, tone, length, prompt)}
+        if cached is not None:
+            logger.info(f"Serving '{content_type}' from generation cache")
+            generations_total.inc(mode='cache')
+            generated_content = cached['content']
+            metadata.update(timestamp=datetime.now().isoformat(),
+                            generation_time="0.00s",
+                            generation_mode='cache',
+                            cached_at=datetime.fromtimestamp(cached['created_at']).isoformat(),
+                            usage=cached['usage'])
+        elif async_client is None and not await init_async_openai_client():
+            logger.info("Falling back to sample content generation")
+            generated_content = generate_sample_content(
+                content_type=content_type,
+                audience=audience,
+                tone=tone,
+                length=length,
+                prompt=prompt
+            )
+            metadata.update(timestamp=datetime.now().isoformat(), generation_mode='sample')
+            resp = await make_response(jsonify({'status': 'success', 'content': generated_content, 'metadata': metadata}))
+            resp.set_cookie('user_id', user_id)
+            return resp
+        else:
+            logger.info(f"Generating content for '{content_type}' with prompt: '{prompt[:50]}...'")
+            messages = conversation_history.build_messages(user_id, user_message)
+            result, coalesced = await generate_upstream(
+                messages,
+                content_type,
+                length,
+                cache_key=cache_key,
+                coalesce_key=request_key(content_type, audience, tone, length, prompt)
+            )
+            generated_content = result['content']
+            elapsed_time = time.time() - start_time
+            logger.info(f"Content generated in {elapsed_time:.2f} seconds (coalesced: {coalesced})")
+            metadata.update(timestamp=datetime.now().isoformat(),
+                            generation_time=f"{elapsed_time:.2f}s",
+                            generation_mode='azure_openai',
+                            coalesced=coalesced,
+                            usage=result['usage'],
+                            budget=result['budget'],
+                            routing=result['routing'])
+        metadata['cache'] = cache_metadata()
+        conversation_history.append_turn(user_id, user_message, {"role": "assistant", "content": generated_content})
+    except Exception as e:
+        logger.error(f"Error in generate endpoint: {str(e)}")
+        logger.error(traceback.format_exc())
+        logger.info("Falling back to sample content generation due to API error")
+        try:
+            generated_content = generate_sample_content(
+                content_type=content_type,
+                audience=audience,
+                tone=tone,
+                length=length,
+                prompt=prompt
+            )
+        except Exception as fallback_error:
+            logger.error(f"Error generating fallback content: {str(fallback_error)}")
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'fallback_error': str(fallback_error)
+            }), 500
+        metadata.update(timestamp=datetime.now().isoformat(),
+                        generation_mode='sample',
+                        fallback_reason=str(e))
+        save = False
+
+    if save:
+        await asyncio.to_thread(content_library.save_generated, content_type, generated_content, audience, tone)
+
+    resp = await make_response(jsonify({
+        'status': 'success',
+        'content': generated_content,
+        'metadata': metadata
+    }))
+    resp.set_cookie('user_id', user_id)
+    return resp
+
+async def generate_variants_response(form, variants):
+    """Handle a /generate request for several variants, returned as an array alongside ``content``."""
+    content_type, prompt, audience, tone, length, save = read_generation_form(form)
+    user_id = request.cookies.get('user_id') or datetime.now().strftime("%Y%m%d%H%M%S")
+    metadata = {
+        'content_type': content_type,
+        'audience': audience,
+        'tone': tone,
+        'length': length,
+        'variants_requested': variants
+    }
+    user_message = {"role": "user", "content": build_enhanced_prompt(content_type, audience, tone, length, prompt)}
+
+    try:
+        start_time = time.time()
+        logger.info(f"Generating {variants} variants for '{content_type}' with prompt: '{prompt[:50]}...'")
+        messages = conversation_history.build_messages(user_id, user_message)
+        result, coalesced = await generate_variants_upstream(
+            messages,
+            content_type,
+            length,
+            variants,
+            cache_key=generation_cache_key(form, content_type, audience, tone, length, prompt),
+            coalesce_key=f"{request_key(content_type, audience, tone, length, prompt)}:variants:{variants}"
+        )
+        generated_variants = result['variants']
+        generated_content = generated_variants[0]['content']
+        conversation_history.append_turn(user_id, user_message, {"role": "assistant", "content": generated_content})
+        elapsed_time = time.time() - start_time
+        logger.info(f"{len(generated_variants)} variants generated in {elapsed_time:.2f} seconds (coalesced: {coalesced})")
+        all_cached = all(variant['cached'] for variant in generated_variants)
+        metadata.update(timestamp=datetime.now().isoformat(),
+                        generation_time=f"{elapsed_time:.2f}s",
+                        generation_mode='cache' if all_cached else 'azure_openai',
+                        coalesced=coalesced,
+                        usage=result['usage'],
+                        budget=result['budget'],
+                        routing=result['routing'],
+                        cache=cache_metadata())
+    except Exception as e:
+        logger.error(f"Error generating variants: {str(e)}")
+        logger.error(traceback.format_exc())
+        logger.info("Falling back to sample content generation due to API error")
+        try:
+            # Sample content is deterministic, so a single variant is returned
+            generated_content = generate_sample_content(
+                content_type=content_type,
+                audience=audience,
+                tone=tone,
+                length=length,
+                prompt=prompt
+            )
+        except Exception as fallback_error:
+            logger.error(f"Error generating fallback content: {str(fallback_error)}")
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'fallback_error': str(fallback_error)
+            }), 500
+        generated_variants = [{'index': 0, 'content': generated_content, 'finish_reason': None,
+                               'completion_tokens': None, 'cached': False}]
+        metadata.update(timestamp=datetime.now().isoformat(),
+                        generation_mode='sample',
+                        fallback_reason=str(e))
+        save = False
+
+    if save:
+        await asyncio.to_thread(content_library.save_generated, content_type, generated_content, audience, tone)
+
+    resp = await make_response(jsonify({
+        'status': 'success',
+        'content': generated_content,
+        'variants': generated_variants,
+        'metadata': metadata
+    }))
+    resp.set_cookie('user_id', user_id)
+    return resp
+
+@app.route('/generate/stream', methods=['POST'])
+async def generate_content_stream():
+    """Stream generated content to the client as Server-Sent Events.
+
+    Emits the same ``delta``, ``done`` and ``error`` events as the Flask route.
+    """
+    form = await request.form
+    content_type, prompt, audience, tone, length, save = read_generation_form(form)
+    user_id = request.cookies.get('user_id') or datetime.now().strftime("%Y%m%d%H%M%S")
+    cache_key = generation_cache_key(form, content_type, audience, tone, length, prompt)
+    metadata = {
+        'content_type': content_type,
+        'audience': audience,
+        'tone': tone,
+        'length': length
+    }
+
+    def fallback_events(reason):
+        return sample_events(metadata, reason, content_type, audience, tone, length, prompt)
+
+    async def event_stream():
+        user_message = {"role": "user", "content": build_enhanced_prompt(content_type, audience, tone, length, prompt)}
+
+        cached = generation_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            logger.info(f"Streaming '{content_type}' from generation cache")
+            generations_total.inc(mode='cache')
+            generated_content = cached['content']
+            conversation_history.append_turn(user_id, user_message, {"role": "assistant", "content": generated_content})
+            if save:
+                await asyncio.to_thread(content_library.save_generated, content_type, generated_content, audience, tone)
+            for event in cached_events(metadata, generated_content):
+                yield event
+            return
+
+        generation = None
+        stream = None
+        try:
+            logger.info(f"Streaming content for '{content_type}' with prompt: '{prompt[:50]}...'")
+            messages = conversation_history.build_messages(user_id, user_message)
+            generation = StreamGeneration(messages, content_type, length)
+            stream = await call_azure_openai(messages, **generation.call_params())
+            async for chunk in stream:
+                delta = generation.add_chunk(chunk)
+                if delta:
+                    yield format_sse('delta', {'content': delta})
+        except Exception as e:
+            logger.error(f"Error in generate stream endpoint: {str(e)}")
+            logger.error(traceback.format_exc())
+            if generation is None or not generation.parts:
+                for event in fallback_events(str(e)):
+                    yield event
+            else:
+                generation.record_error(e)
+                yield format_sse('error', {
+                    'status': 'error',
+                    'message': str(e),
+                    'content': generation.content
+                })
+            return
+        finally:
+            # Also runs when the client disconnects and the generator is closed or cancelled,
+            # releasing the upstream connection
+            if stream is not None and hasattr(stream, 'close'):
+                await stream.close()
+
+        generated_content = generation.content
+        conversation_history.append_turn(user_id, user_message, {"role": "assistant", "content": generated_content})
+        stream_metadata = generation.finish('azure_openai_stream', cache_key)
+
+        if save:
+            await asyncio.to_thread(content_library.save_generated, content_type, generated_content, audience, tone)
+
+        yield format_sse('done', {
+            'status': 'success',
+            'content': generated_content,
+            'metadata': dict(metadata,
+                             timestamp=datetime.now().isoformat(),
+                             **stream_metadata,
+                             cache=cache_metadata())
+        })
+
+    resp = Response(event_stream(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    resp.timeout = None
+    resp.set_cookie('user_id', user_id)
+    return resp
+
+async def generate_batch_item(index, spec):
+    """Generate one item of a batch request, falling back to sample content on failure."""
+    start_time = time.time()
+    content_type, prompt, audience, tone, length, save = read_batch_item(spec)
+
+    metadata = {
+        'content_type': content_type,
+        'audience': audience,
+        'tone': tone,
+        'length': length
+    }
+
+    try:
+        cache_key = generation_cache_key(spec, content_type, audience, tone, length, prompt)
+        cached = generation_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            generated_content = cached['content']
+            generations_total.inc(mode='cache')
+            metadata.update(generation_mode='cache', usage=cached['usage'])
+        else:
+            result, coalesced = await generate_upstream(
+                batch_messages(content_type, audience, tone, length, prompt),
+                content_type,
+                length,
+                cache_key=cache_key,
+                coalesce_key=request_key(content_type, audience, tone, length, prompt)
+            )
+            generated_content = result['content']
+            metadata.update(generation_mode='azure_openai', coalesced=coalesced, usage=result['usage'],
+                            budget=result['budget'], routing=result['routing'])
+    except Exception as e:
+        logger.error(f"Error generating batch item {index}: {str(e)}")
+        try:
+            generated_content = generate_sample_content(
+                content_type=content_type,
+                audience=audience,
+                tone=tone,
+                length=length,
+                prompt=prompt
+            )
+            metadata.update(generation_mode='sample', fallback_reason=str(e))
+        except Exception as fallback_error:
+            logger.error(f"Error generating fallback content for batch item {index}: {str(fallback_error)}")
+            return {
+                'index': index,
+                'status': 'error',
+                'message': str(e),
+                'fallback_error': str(fallback_error)
+            }
+
+    if save:
+        await asyncio.to_thread(content_library.save_generated, content_type, generated_content, audience, tone)
+
+    elapsed_time = time.time() - start_time
+    metadata.update(timestamp=datetime.now().isoformat(), generation_time=f"{elapsed_time:.2f}s")
+    return {
+        'index': index,
+        'status': 'success',
+        'content': generated_content,
+        'metadata': metadata
+    }
+
+@app.route('/generate/batch', methods=['POST'])
+async def generate_content_batch():
+    """Generate several pieces of content concurrently, with the same request and response shape as the Flask route."""
+    try:
+        items, max_concurrency = parse_batch_request(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    logger.info(f"Generating batch of {len(items)} items with concurrency {max_concurrency}")
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_item(index, spec):
+        async with semaphore:
+            return await generate_batch_item(index, spec)
+
+    results = await asyncio.gather(*(run_item(index, spec) for index, spec in enumerate(items)))
+    elapsed_time = time.time() - start_time
+    logger.info(f"Batch of {len(items)} items generated in {elapsed_time:.2f} seconds")
+
+    return jsonify(batch_response(results, max_concurrency, elapsed_time))
+
+@app.route('/content/<path:filename>')
+async def download_content(filename):
+    """Serve content files for download."""
+    content_store = content_library.content_store
+    record = content_store.lookup(filename)
+    if record is None and content_store.write_error(filename) is not None:
+        logger.error(f"Download of {filename} failed: its write was dropped")
+        return jsonify({
+            'status': 'error',
+            'message': 'Content could not be saved'
+        }), 500
+    if record is None:
+        if '/' in filename or filename.startswith('.'):
+            abort(404)
+        return await send_from_directory(content_store.root, filename)
+    status_code, headers, body = await asyncio.to_thread(build_content_response, record, request.headers, content_store)
+    return Response(body, status=status_code, headers=headers)
+
+@app.route('/export/<format_type>', methods=['POST'])
+async def export_content(format_type):
+    """Export content in various formats (markdown, txt, pdf)"""
+    try:
+        data = await request.get_json(force=True)
+        payload, status_code = await asyncio.to_thread(
+            content_library.export, format_type, data.get('content', ''), data.get('content_type', 'Content'),
+            data.get('audience'), data.get('tone')
+        )
+        return jsonify(payload), status_code
+    except Exception as e:
+        logger.error(f"Error exporting content: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to export content: {str(e)}"
+        }), 500
+
+@app.route('/share/<platform>', methods=['POST'])
+async def share_content(platform):
+    """Handle sharing content to various platforms (social, email, blog)"""
+    try:
+        data = await request.get_json(force=True)
+        payload, status_code = await asyncio.to_thread(
+            content_library.share, platform, data.get('content', ''), data.get('content_type', 'Content'),
+            data.get('audience'), data.get('tone')
+        )
+        return jsonify(payload), status_code
+    except Exception as e:
+        logger.error(f"Error sharing content: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to share content: {str(e)}"
+        }), 500
+
+@app.route('/search', methods=['GET'])
+async def search_content():
+    """Full-text search over saved, exported and shared content."""
+    try:
+        payload, status_code = await asyncio.to_thread(content_library.search, request.args)
+        return jsonify(payload), status_code
+    except Exception as e:
+        logger.error(f"Error searching content: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to search content: {str(e)}"
+        }), 500
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint for monitoring."""
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "client_initialized": async_client is not None,
+        "azure_openai": connectivity_probe.state()['status']
+    })
+
+@app.errorhandler(404)
+async def page_not_found(e):
+    """Handle 404 errors"""
+    return jsonify({"status": "error", "message": "Resource not found"}), 404
+
+@app.errorhandler(500)
+async def server_error(e):
+    """Handle 500 errors"""
+    return jsonify({"status": "error", "message": "Internal server error"}), 500
+
+@app.after_serving
+async def close_async_client():
+    """Stop the connectivity probe and close the async client's connection pool when the server stops."""
+    if probe_task is not None and not probe_task.done():
+        probe_task.cancel()
+    if async_client is not None:
+        await async_client.close()
@@ -0,0 +1,157 @@
+"""
+Circuit Breaker
+
+Stops sending requests to a failing upstream. After a run of consecutive
+failures the circuit opens and calls are rejected immediately, so callers can
+fall back in milliseconds instead of waiting on timeouts. Once the recovery
+timeout passes, a limited number of half-open probe calls decide whether the
+circuit closes again or re-opens.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the circuit is open."""
+
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure circuit breaker with half-open probing."""
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = 5,
+                 recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        """
+        Initialize the breaker.
+
+        Args:
+            name: Name used in logs and errors
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_timeout: Seconds the circuit stays open before allowing probe calls
+            half_open_max_calls: Concurrent probe calls allowed while half-open
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._last_error: Optional[str] = None
+        self._last_state_change: Optional[str] = None
+
+        self.rejected = 0
+        self.successes = 0
+        self.failures = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def before_call(self) -> None:
+        """
+        Admit a call or reject it immediately.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with all probe slots taken
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+        raise CircuitOpenError(f"Circuit '{self.name}' is open; retry in {retry_in:.1f}s")
+
+    def record_success(self) -> None:
+        """Record a successful call, closing the circuit if it was probing."""
+        with self._lock:
+            self.successes += 1
+            self._consecutive_failures = 0
+            if self._state == HALF_OPEN:
+                self._half_open_calls = max(0, self._half_open_calls - 1)
+                self._set_state(CLOSED)
+
+    def release(self) -> None:
+        """Give back an admitted call that ended without a verdict on upstream health."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_calls = max(0, self._half_open_calls - 1)
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        """Record a failed call, opening the circuit past the threshold or on a failed probe."""
+        with self._lock:
+            self.failures += 1
+            self._consecutive_failures += 1
+            self._last_error = str(error) if error is not None else None
+            if self._state == HALF_OPEN:
+                self._half_open_calls = max(0, self._half_open_calls - 1)
+                self._open()
+            elif self._state == CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def reset(self) -> None:
+        """Force the circuit closed."""
+        with self._lock:
+            self._consecutive_failures = 0
+            self._half_open_calls = 0
+            self._set_state(CLOSED)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return breaker state and counters."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout": self.recovery_timeout,
+                "retry_in": round(max(0.0, self._opened_at + self.recovery_timeout - now), 2) if state == OPEN else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "successes": self.successes,
+                "failures": self.failures,
+                "last_error": self._last_error,
+                "last_state_change": self._last_state_change,
+            }
+
+    def _current_state(self, now: float) -> str:
+        """Move an open circuit to half-open once the recovery timeout has passed. Caller holds the lock."""
+        if self._state == OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._half_open_calls = 0
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def _open(self) -> None:
+        """Open the circuit. Caller holds the lock."""
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str) -> None:
+        """Change state and log the transition. Caller holds the lock."""
+        if state != self._state:
+            logger.warning(f"Circuit '{self.name}' {self._state} -> {state}")
+            self._state = state
+            self._last_state_change = datetime.now().isoformat()
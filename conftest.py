@@ -0,0 +1,19 @@
+"""
+Shared pytest setup
+
+Runs the tests from a scratch directory with the startup probe disabled, so
+importing ``app`` or ``asgi_app`` neither calls Azure OpenAI nor leaves logs,
+content or search databases in the working tree.
+"""
+
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="marketing-tests-")
+
+os.environ.setdefault("STARTUP_PROBE_ENABLED", "false")
+os.environ.setdefault("CONTENT_DIR", os.path.join(TEST_DIR, "content"))
+os.environ.setdefault("AGENT_POOL_DB", os.path.join(TEST_DIR, "agent_pool.db"))
+
+# logs/ is created relative to the working directory
+os.chdir(TEST_DIR)
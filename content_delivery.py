@@ -0,0 +1,163 @@
+"""
+Content Delivery
+
+HTTP semantics for downloading stored content, shared by the Flask and ASGI
+apps. Responses carry a strong ETag derived from the content hash and a
+Last-Modified date, answer conditional requests with 304, serve single byte
+ranges, and pick a precompressed gzip or brotli sidecar when the client
+accepts one, so repeat downloads cost a few headers instead of the full body.
+"""
+
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip")
+
+# Range units are case-insensitive (RFC 9110, section 14.1)
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$", re.IGNORECASE)
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> List[str]:
+    """Return the content codings a client accepts (with a non-zero q-value)."""
+    accepted = []
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.append(coding)
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def not_modified_since(if_modified_since: str, last_modified: float) -> bool:
+    """Whether content last modified at ``last_modified`` is unchanged since the header's date."""
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have one-second resolution
+    return int(last_modified) <= since
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range.
+
+    Returns:
+        Inclusive (start, end) offsets, (size, size) if the range is well formed
+        but cannot be satisfied, or None if the header is malformed or not a
+        single byte range (the full body is then served).
+    """
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            return size, size
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # A last position before the first is invalid, not unsatisfiable
+        return None
+    if start >= size:
+        return size, size
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def build_content_response(record: Dict[str, Any],
+                           request_headers: Mapping[str, str],
+                           store: Any) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Build the response to a download of a stored content record.
+
+    Args:
+        record: Record from ``ContentStore.lookup``
+        request_headers: Request headers (case-insensitive mapping)
+        store: The ContentStore, used to read bodies and find precompressed sidecars
+
+    Returns:
+        Tuple of (status, headers, body).
+    """
+    sha256 = record["sha256"]
+    last_modified = record["created_at"]
+    range_header = request_headers.get("Range")
+
+    # Byte ranges refer to the identity body, so sidecars are only used for full responses
+    encoding = None
+    if not range_header and "path" in record:
+        accepted = accepted_encodings(request_headers.get("Accept-Encoding"))
+        for candidate in ENCODINGS:
+            if candidate in accepted and store.sidecar_path(record, candidate) is not None:
+                encoding = candidate
+                break
+
+    etag = f'"{sha256}-{encoding}"' if encoding else f'"{sha256}"'
+    headers = {
+        "Content-Type": record["mime"],
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+    }
+
+    if_none_match = request_headers.get("If-None-Match")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, etag):
+            return 304, headers, b""
+    elif request_headers.get("If-Modified-Since") and \
+            not_modified_since(request_headers["If-Modified-Since"], last_modified):
+        return 304, headers, b""
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return 200, headers, store.sidecar_path(record, encoding).read_bytes()
+
+    size = record["size"]
+    byte_range = parse_range(range_header, size) if range_header else None
+    if_range = request_headers.get("If-Range")
+    if byte_range is not None and if_range:
+        # Serve the full body if the client's copy is from a different version
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            fresh = if_range == etag
+        else:
+            fresh = not_modified_since(if_range, last_modified)
+        if not fresh:
+            byte_range = None
+
+    if byte_range is None:
+        return 200, headers, store.read_record(record)
+    start, end = byte_range
+    if start >= size:
+        headers["Content-Range"] = f"bytes */{size}"
+        return 416, headers, b""
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return 206, headers, store.read_record(record, start, end - start + 1)
+
@@ -0,0 +1,272 @@
+"""
+Content Library
+
+Saved, exported and shared content for the web apps: the content store that
+holds it and the search index over it, plus the export, share and search
+operations behind ``/export``, ``/share`` and ``/search``. Importing this
+module has no side effects; each app creates its library with
+``create_content_library()``, which starts the store's and index's
+background threads.
+"""
+
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from content_store import ContentStore
+from search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+def create_content_library() -> "ContentLibrary":
+    """Create the content store and search index configured from CONTENT_* and SEARCH_INDEX_DB."""
+    # Deduplicated by hash and written in the background; a periodic sweep migrates
+    # old flat files, compresses old content and applies retention
+    content_store = ContentStore(
+        os.getenv("CONTENT_DIR", "content"),
+        retention_days=float(os.getenv("CONTENT_RETENTION_DAYS", "0")),
+        max_total_bytes=int(os.getenv("CONTENT_MAX_BYTES", "0")),
+        compress_after_days=float(os.getenv("CONTENT_COMPRESS_AFTER_DAYS", "7")),
+        sweep_interval=float(os.getenv("CONTENT_SWEEP_INTERVAL", "3600"))
+    )
+    search_index = SearchIndex(os.getenv("SEARCH_INDEX_DB", str(content_store.store_dir / "search.db")))
+    return ContentLibrary(content_store, search_index)
+
+
+def parse_search_date(value: Optional[str], end_of_day: bool = False) -> Optional[float]:
+    """Parse an ISO date or datetime query parameter to a timestamp; a bare end date covers its whole day."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.timestamp()
+
+
+class ContentLibrary:
+    """Persisted content and its full-text index."""
+
+    def __init__(self, content_store: ContentStore, search_index: SearchIndex):
+        """
+        Wrap an existing store and index.
+
+        Args:
+            content_store: Store that persisted content is written to
+            search_index: Index that persisted content is added to
+        """
+        self.content_store = content_store
+        self.search_index = search_index
+
+    def persist(self,
+                filename: str,
+                data: str,
+                kind: str,
+                content_type: str,
+                text: Optional[str] = None,
+                audience: Optional[str] = None,
+                tone: Optional[str] = None) -> Dict[str, Any]:
+        """Write content to the content store and add it to the search index.
+
+        ``text`` is the searchable text when ``data`` wraps it (e.g. in HTML or an
+        email template); identical text is indexed once however it was persisted.
+        """
+        record = self.content_store.put(filename, data, kind=kind, content_type=content_type)
+        text = data if text is None else text
+        self.search_index.add(hashlib.sha256(text.encode('utf-8')).hexdigest(), filename, text, kind=kind,
+                              content_type=content_type, tone=tone, audience=audience,
+                              created_at=record['created_at'])
+        return record
+
+    def save_generated(self,
+                       content_type: str,
+                       generated_content: str,
+                       audience: Optional[str] = None,
+                       tone: Optional[str] = None) -> Dict[str, Any]:
+        """Save generated content to the content store and return its index record."""
+        filename = f"{content_type.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d%H%M%S')}.txt"
+        record = self.persist(filename, generated_content, 'generated', content_type, audience=audience, tone=tone)
+        logger.info(f"Saved content as {filename} ({record['sha256'][:12]})")
+        return record
+
+    def export(self,
+               format_type: str,
+               content: str,
+               content_type: str,
+               audience: Optional[str] = None,
+               tone: Optional[str] = None) -> Tuple[Dict[str, Any], int]:
+        """Write content in an export format and return the (payload, status_code) for the response."""
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        filename = f"{content_type.replace(' ', '_')}_{timestamp}"
+
+        if format_type == 'md':
+            record = self.persist(f"{filename}.md", content, 'export', content_type,
+                                  audience=audience, tone=tone)
+            return {
+                'status': 'success',
+                'message': 'Content exported as Markdown',
+                'filename': record['filename'],
+                'download_url': record['download_url']
+            }, 200
+
+        elif format_type == 'txt':
+            record = self.persist(f"{filename}.txt", content, 'export', content_type,
+                                  audience=audience, tone=tone)
+            return {
+                'status': 'success',
+                'message': 'Content exported as text',
+                'filename': record['filename'],
+                'download_url': record['download_url']
+            }, 200
+
+        elif format_type == 'pdf':
+            # For PDF, we'll create a simple HTML file and return it
+            # The actual PDF conversion should happen on the client side using a library like html2pdf
+            html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>{content_type}</title>
+            <style>
+                body {{ font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; }}
+                h1 {{ color: #333; }}
+                pre {{ white-space: pre-wrap; }}
+            </style>
+        </head>
+        <body>
+            <h1>{content_type}</h1>
+            <pre>{content}</pre>
+        </body>
+        </html>
+        """
+            record = self.persist(f"{filename}.html", html_content, 'export', content_type, text=content,
+                                  audience=audience, tone=tone)
+            return {
+                'status': 'success',
+                'message': 'Content prepared for PDF export',
+                'filename': record['filename'],
+                'download_url': record['download_url'],
+                'html_content': html_content
+            }, 200
+        else:
+            return {
+                'status': 'error',
+                'message': f'Unsupported export format: {format_type}'
+            }, 400
+
+    def share(self,
+              platform: str,
+              content: str,
+              content_type: str,
+              audience: Optional[str] = None,
+              tone: Optional[str] = None) -> Tuple[Dict[str, Any], int]:
+        """Prepare content for a sharing platform and return the (payload, status_code) for the response."""
+        # Store the content for sharing
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        filename = f"{platform}_{content_type.replace(' ', '_')}_{timestamp}.txt"
+        record = self.persist(filename, content, 'share', content_type, audience=audience, tone=tone)
+
+        share_url = None
+        share_message = None
+
+        if platform == 'social':
+            # Simulate social media sharing
+            share_url = record['download_url']
+            share_message = "Content prepared for social media sharing"
+            logger.info(f"Social media content prepared: {filename}")
+
+        elif platform == 'email':
+            # Simulate email campaign creation
+            email_template = f"""
+Subject: {content_type}
+
+{content}
+
+---
+This email was generated using the Marketing AI System.
+"""
+            email_record = self.persist(f"email_{content_type.replace(' ', '_')}_{timestamp}.eml", email_template,
+                                        'share', content_type, text=content, audience=audience, tone=tone)
+            share_url = email_record['download_url']
+            share_message = "Content prepared for email campaigns"
+            logger.info(f"Email content prepared: {email_record['filename']}")
+
+        elif platform == 'blog':
+            # Simulate blog post creation
+            blog_template = f"""
+# {content_type}
+
+{content}
+
+---
+*This blog post was generated using the Marketing AI System.*
+"""
+            blog_record = self.persist(f"blog_{content_type.replace(' ', '_')}_{timestamp}.md", blog_template,
+                                       'share', content_type, text=content, audience=audience, tone=tone)
+            share_url = blog_record['download_url']
+            share_message = "Content prepared for blog publishing"
+            logger.info(f"Blog content prepared: {blog_record['filename']}")
+
+        else:
+            return {
+                'status': 'error',
+                'message': f'Unsupported sharing platform: {platform}'
+            }, 400
+
+        return {
+            'status': 'success',
+            'message': share_message,
+            'platform': platform,
+            'filename': record['filename'],
+            'download_url': share_url
+        }, 200
+
+    def search(self, args: Mapping[str, str]) -> Tuple[Dict[str, Any], int]:
+        """Search persisted content with /search query parameters and return a (payload, status_code) pair."""
+        try:
+            date_from = parse_search_date(args.get('date_from'))
+            date_to = parse_search_date(args.get('date_to'), end_of_day=True)
+            limit = int(args.get('limit', 20))
+            offset = int(args.get('offset', 0))
+        except ValueError as e:
+            return {
+                'status': 'error',
+                'message': f"Invalid search parameter: {str(e)}"
+            }, 400
+
+        query = args.get('q', '')
+        start_time = time.time()
+        found = self.search_index.search(query, content_type=args.get('content_type'), tone=args.get('tone'),
+                                         audience=args.get('audience'), date_from=date_from, date_to=date_to,
+                                         limit=limit, offset=offset)
+        results = []
+        for result in found['results']:
+            # Retention may have removed the file since it was indexed
+            stored = self.content_store.lookup(result['filename']) is not None
+            results.append(dict(result,
+                                created_at=datetime.fromtimestamp(result['created_at']).isoformat(),
+                                download_url=f"/content/{result['filename']}" if stored else None))
+        return {
+            'status': 'success',
+            'query': query,
+            'total': found['total'],
+            'results': results,
+            'metadata': {
+                'took': round(time.time() - start_time, 4),
+                'limit': limit,
+                'offset': offset
+            }
+        }, 200
+
+    def collect_metrics(self, gauge: Any) -> None:
+        """Set ``gauge`` (labelled by component and stat) from the store's and index's stats."""
+        store_stats = self.content_store.stats()
+        for stat in ('files', 'blobs', 'cold_blobs', 'stored_bytes', 'pending_writes', 'deduplicated', 'write_errors',
+                     'writes_failed', 'expired', 'evicted'):
+            gauge.set(store_stats[stat], component='content_store', stat=stat)
+        index_stats = self.search_index.stats()
+        for stat in ('documents', 'pending', 'indexed', 'duplicates', 'dropped', 'searches'):
+            gauge.set(index_stats[stat], component='search_index', stat=stat)
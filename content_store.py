@@ -0,0 +1,579 @@
+"""
+Content Store
+
+Stores saved, exported and shared content by SHA-256 so identical bytes are
+kept on disk once, however many files refer to them. A small SQLite index maps
+each public filename (the name used in ``/content/<filename>`` URLs) to its
+blob. Writes are queued to a background writer thread, so request latency
+does not include disk writes or fsyncs; until a write lands, the content is
+served from memory. New blobs get precompressed gzip (and brotli, when the
+``brotli`` package is installed) sidecars written next to them.
+
+Blobs are laid out by date and kind (``.store/blobs/YYYY/MM/DD/<kind>/``).
+A periodic sweep, run on the writer thread, moves files from the old flat
+directory into the store, compresses blobs past an age into a cold tier that
+keeps only the gzip copy, and enforces retention by age and total size.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # type: ignore
+
+# Bodies smaller than this are not worth a precompressed copy
+SIDECAR_MIN_BYTES = 1024
+
+SIDECAR_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+HOT = "hot"
+COLD = "cold"
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Failed filenames remembered for lookups; older failures are forgotten first
+MAX_FAILED_WRITES = 1000
+
+
+class ContentStore:
+    """Content-addressed blob store with a filename index, a background writer and a retention sweeper."""
+
+    def __init__(self,
+                 root: Union[str, Path] = "content",
+                 db_path: Optional[Union[str, Path]] = None,
+                 queue_size: int = 10000,
+                 batch_size: int = 100,
+                 retention_days: float = 0,
+                 max_total_bytes: int = 0,
+                 compress_after_days: float = 0,
+                 sweep_interval: float = 0,
+                 sweep_batch: int = 500,
+                 write_retries: int = 3,
+                 retry_delay: float = 0.5):
+        """
+        Initialize the store and start its writer thread.
+
+        Args:
+            root: Content directory; blobs and the index live in its ``.store`` subdirectory
+            db_path: SQLite index file (defaults to ``<root>/.store/index.db``)
+            queue_size: Maximum writes waiting for the writer before callers block
+            batch_size: Writes committed to the index in one transaction
+            retention_days: Files older than this are deleted (0 keeps them forever)
+            max_total_bytes: Oldest files are deleted while stored content exceeds this (0 for no limit)
+            compress_after_days: Blobs older than this keep only their gzip copy (0 never compresses)
+            sweep_interval: Seconds between background sweeps (0 disables the sweeper thread)
+            sweep_batch: Maximum files migrated, compressed or deleted per step of one sweep
+            write_retries: Extra attempts at a failed batch before its files are dropped
+            retry_delay: Seconds before the first retry, doubled for each further attempt
+        """
+        self.root = Path(root).absolute()
+        self.store_dir = self.root / ".store"
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+        self.compress_after_days = compress_after_days
+        self.sweep_interval = sweep_interval
+        self.sweep_batch = sweep_batch
+        self.write_retries = write_retries
+        self.retry_delay = retry_delay
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path or self.store_dir / "index.db"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "sha256 TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL, "
+            "tier TEXT NOT NULL DEFAULT 'hot')"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "filename TEXT PRIMARY KEY, sha256 TEXT NOT NULL, size INTEGER NOT NULL, mime TEXT NOT NULL, "
+            "kind TEXT NOT NULL, content_type TEXT, created_at REAL NOT NULL)"
+        )
+        try:
+            # Indexes created before tiering have no tier column
+            self._db.execute("ALTER TABLE blobs ADD COLUMN tier TEXT NOT NULL DEFAULT 'hot'")
+        except sqlite3.OperationalError:
+            pass
+        self._db.execute("CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS files_created_at ON files (created_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS blobs_tier_created_at ON blobs (tier, created_at)")
+        self._db.commit()
+
+        # Files accepted but not yet written, served from memory until the writer catches up
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # Filenames whose write was given up on, with the error, so lookups can tell them from unknown names
+        self._failed: Dict[str, str] = {}
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+
+        self.files_written = 0
+        self.blobs_written = 0
+        self.deduplicated = 0
+        self.bytes_written = 0
+        self.bytes_deduplicated = 0
+        self.write_errors = 0
+        self.write_retried = 0
+        self.writes_failed = 0
+        self.sidecars_written = 0
+        self.sweeps = 0
+        self.migrated = 0
+        # Legacy files that could not be read or removed, skipped by later sweeps
+        self._legacy_skipped: Set[str] = set()
+        self.compressed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.blobs_deleted = 0
+        self.last_sweep: Optional[str] = None
+
+        self._writer = threading.Thread(target=self._write_loop, name="content-writer", daemon=True)
+        self._writer.start()
+        if sweep_interval > 0:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="content-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def put(self,
+            filename: str,
+            data: Union[str, bytes],
+            kind: str = "content",
+            content_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store content under a public filename; the disk write happens in the background.
+
+        Args:
+            filename: Name the content is downloaded by
+            data: Text (stored as UTF-8) or bytes
+            kind: What produced the file, e.g. "generated", "export" or "share"
+            content_type: Marketing content type the file belongs to
+
+        Returns:
+            The index record, including ``sha256`` and ``download_url``.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        record = {
+            "filename": filename,
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "size": len(data),
+            "mime": mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            "kind": kind,
+            "content_type": content_type,
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._pending[filename] = dict(record, data=data)
+            self._failed.pop(filename, None)
+        self._queue.put(dict(record, op="put", data=data))
+        return dict(record, download_url=f"/content/{filename}")
+
+    def lookup(self, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a public filename.
+
+        Returns:
+            The index record with either ``path`` (blob on disk) and ``tier``,
+            or ``data`` (write still pending), or None if the filename is unknown.
+        """
+        with self._lock:
+            pending = self._pending.get(filename)
+            if pending is not None:
+                return dict(pending)
+            row = self._db.execute(
+                "SELECT f.filename, f.sha256, f.size, f.mime, f.kind, f.content_type, f.created_at, b.path, b.tier "
+                "FROM files f JOIN blobs b ON b.sha256 = f.sha256 WHERE f.filename = ?",
+                (filename,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("filename", "sha256", "size", "mime", "kind", "content_type", "created_at", "path", "tier")
+        record = dict(zip(keys, row))
+        record["path"] = self.root / record["path"]
+        return record
+
+    def write_error(self, filename: str) -> Optional[str]:
+        """Return why the last write of a filename was dropped, or None if it was not."""
+        with self._lock:
+            return self._failed.get(filename)
+
+    def read(self, filename: str) -> Optional[bytes]:
+        """Return the bytes stored under a filename, or None if it is unknown."""
+        record = self.lookup(filename)
+        if record is None:
+            return None
+        return self.read_record(record)
+
+    def read_record(self, record: Dict[str, Any], offset: int = 0, length: Optional[int] = None) -> bytes:
+        """Read a record's body, or a slice of it, from memory, its blob or its cold-tier gzip copy."""
+        if "data" in record:
+            data = record["data"]
+        elif record.get("tier") == COLD:
+            data = gzip.decompress(self._sidecar(record["path"], "gzip").read_bytes())
+        else:
+            try:
+                with open(record["path"], "rb") as f:
+                    f.seek(offset)
+                    return f.read() if length is None else f.read(length)
+            except FileNotFoundError:
+                # Moved to the cold tier since the record was looked up
+                data = gzip.decompress(self._sidecar(record["path"], "gzip").read_bytes())
+        return data[offset:] if length is None else data[offset:offset + length]
+
+    def sidecar_path(self, record: Dict[str, Any], encoding: str) -> Optional[Path]:
+        """Return the precompressed copy of a record's blob for an encoding, or None if there is none."""
+        if encoding not in SIDECAR_SUFFIXES or "path" not in record:
+            return None
+        path = self._sidecar(record["path"], encoding)
+        return path if path.exists() else None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued writes have been written; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def sweep(self, wait: bool = False, timeout: Optional[float] = None) -> bool:
+        """
+        Queue a sweep (legacy migration, compression and retention) on the writer thread.
+
+        Args:
+            wait: Block until the sweep and everything queued before it has finished
+            timeout: Maximum seconds to wait
+
+        Returns:
+            False if ``wait`` was set and the timeout expired.
+        """
+        self._queue.put({"op": "sweep"})
+        return self.flush(timeout) if wait else True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write out pending content and stop the writer and sweeper threads."""
+        self._stop.set()
+        self.flush(timeout)
+        self._queue.put(None)
+        self._writer.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size, pending writes, dedupe and retention counters."""
+        with self._lock:
+            files, = self._db.execute("SELECT COUNT(*) FROM files").fetchone()
+            blobs, stored_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            cold_blobs, = self._db.execute("SELECT COUNT(*) FROM blobs WHERE tier = ?", (COLD,)).fetchone()
+            pending = len(self._pending)
+        return {
+            "files": files,
+            "blobs": blobs,
+            "cold_blobs": cold_blobs,
+            "stored_bytes": stored_bytes,
+            "pending_writes": pending,
+            "files_written": self.files_written,
+            "blobs_written": self.blobs_written,
+            "deduplicated": self.deduplicated,
+            "bytes_written": self.bytes_written,
+            "bytes_deduplicated": self.bytes_deduplicated,
+            "write_errors": self.write_errors,
+            "write_retried": self.write_retried,
+            "writes_failed": self.writes_failed,
+            "sidecars_written": self.sidecars_written,
+            "brotli": brotli is not None,
+            "retention_days": self.retention_days,
+            "max_total_bytes": self.max_total_bytes,
+            "compress_after_days": self.compress_after_days,
+            "sweeps": self.sweeps,
+            "last_sweep": self.last_sweep,
+            "migrated": self.migrated,
+            "legacy_skipped": len(self._legacy_skipped),
+            "compressed": self.compressed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "blobs_deleted": self.blobs_deleted,
+        }
+
+    def _blob_path(self, sha256: str, created_at: float, kind: str) -> Path:
+        """Relative path of a new blob, sharded by creation date and the kind of its first file."""
+        day = datetime.fromtimestamp(created_at).strftime("%Y/%m/%d")
+        return Path(".store") / "blobs" / day / kind / sha256
+
+    @staticmethod
+    def _sidecar(path: Path, encoding: str) -> Path:
+        return path.with_name(path.name + SIDECAR_SUFFIXES[encoding])
+
+    def _write_sidecars(self, path: Path, data: bytes) -> None:
+        """Write precompressed copies of a blob that are smaller than the original."""
+        if len(data) < SIDECAR_MIN_BYTES:
+            return
+        compressors = {"gzip": lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressors["br"] = lambda raw: brotli.compress(raw, quality=11)
+        for encoding, compress in compressors.items():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            self._atomic_write(self._sidecar(path, encoding), compressed)
+            self.sidecars_written += 1
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _write_loop(self) -> None:
+        deferred = None
+        while True:
+            item = deferred if deferred is not None else self._queue.get()
+            deferred = None
+            if item is None:
+                self._queue.task_done()
+                return
+            if item["op"] == "sweep":
+                try:
+                    self._sweep()
+                except Exception as e:
+                    logger.error(f"Error sweeping content store: {str(e)}")
+                finally:
+                    self._queue.task_done()
+                continue
+            batch = [item]
+            # Drain what is already queued so one index transaction covers the batch
+            while len(batch) < self.batch_size:
+                try:
+                    next_item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if next_item is None or next_item["op"] != "put":
+                    deferred = next_item
+                    break
+                batch.append(next_item)
+            try:
+                self._write_with_retries(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_with_retries(self, batch: List[Dict[str, Any]]) -> None:
+        """Write a batch, retrying with backoff; files still unwritten after the last retry are dropped."""
+        for attempt in range(self.write_retries + 1):
+            try:
+                self._write_batch(batch)
+                return
+            except Exception as e:
+                self.write_errors += len(batch)
+                error = str(e)
+                if attempt < self.write_retries:
+                    logger.warning(f"Error writing {len(batch)} content file(s), retrying: {error}")
+                    self.write_retried += len(batch)
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        logger.error(f"Giving up on {len(batch)} content file(s) after {self.write_retries + 1} attempts: {error}")
+        with self._lock:
+            for item in batch:
+                if self._is_pending(item):
+                    del self._pending[item["filename"]]
+                    self._failed[item["filename"]] = error
+                    self.writes_failed += 1
+            while len(self._failed) > MAX_FAILED_WRITES:
+                del self._failed[next(iter(self._failed))]
+
+    def _is_pending(self, item: Dict[str, Any]) -> bool:
+        """Whether the pending entry for an item's filename is this put, not a newer one. Call with the lock held."""
+        pending = self._pending.get(item["filename"])
+        return pending is not None and pending["created_at"] == item["created_at"] and pending["sha256"] == item["sha256"]
+
+    def _write_batch(self, batch: List[Dict[str, Any]], replace: bool = True) -> int:
+        """Write new blobs and index rows for a batch of puts and return the number of files indexed."""
+        new_blobs = []
+        for item in batch:
+            sha256 = item["sha256"]
+            with self._lock:
+                known = self._db.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            if known or any(blob[0] == sha256 for blob in new_blobs):
+                self.deduplicated += 1
+                self.bytes_deduplicated += item["size"]
+                continue
+            relative = self._blob_path(sha256, item["created_at"], item["kind"])
+            path = self.root / relative
+            self._atomic_write(path, item["data"])
+            self._write_sidecars(path, item["data"])
+            new_blobs.append((sha256, relative.as_posix(), item["size"], item["created_at"], HOT))
+            self.blobs_written += 1
+            self.bytes_written += item["size"]
+
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?)", new_blobs)
+            cursor = self._db.executemany(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(item["filename"], item["sha256"], item["size"], item["mime"], item["kind"],
+                  item["content_type"], item["created_at"]) for item in batch]
+            )
+            indexed = cursor.rowcount
+            self._db.commit()
+            for item in batch:
+                # A newer put of the same filename stays pending until its own write lands
+                if self._is_pending(item):
+                    del self._pending[item["filename"]]
+        self.files_written += len(batch)
+        return indexed
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+
+    def _sweep(self) -> None:
+        """Run one sweep. Runs on the writer thread, so it never races a write."""
+        start = time.time()
+        migrated = self._migrate_legacy()
+        compressed = self._compress_old_blobs()
+        expired, evicted = self._enforce_retention()
+        deleted = self._delete_orphan_blobs()
+        self.sweeps += 1
+        self.last_sweep = datetime.now().isoformat()
+        if migrated or compressed or expired or evicted or deleted:
+            logger.info(f"Content sweep in {time.time() - start:.2f}s: migrated {migrated}, compressed {compressed}, "
+                        f"expired {expired}, evicted {evicted}, deleted {deleted} blob(s)")
+
+    def _migrate_legacy(self) -> int:
+        """
+        Move files from the flat content directory into the store, keeping their names and dates.
+
+        A file whose name is already taken by a newer store write is migrated
+        under a ``.legacy-<hash>`` name instead. Files that cannot be read or
+        removed are logged and skipped by later sweeps, so they never hold up
+        the rest of the directory.
+        """
+        batch, sources = [], []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or entry.path in self._legacy_skipped or not entry.is_file():
+                    continue
+                try:
+                    data = Path(entry.path).read_bytes()
+                    created_at = entry.stat().st_mtime
+                except OSError as e:
+                    logger.warning(f"Skipping legacy content file {entry.name}: {str(e)}")
+                    self._legacy_skipped.add(entry.path)
+                    continue
+                batch.append({
+                    "filename": entry.name,
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                    "size": len(data),
+                    "mime": mimetypes.guess_type(entry.name)[0] or "application/octet-stream",
+                    "kind": "legacy",
+                    "content_type": None,
+                    "created_at": created_at,
+                    "data": data,
+                })
+                sources.append(entry.path)
+                if len(batch) >= self.sweep_batch:
+                    break
+        if not batch:
+            return 0
+        names = [item["filename"] for item in batch]
+        with self._lock:
+            taken = {row[0] for row in self._db.execute(
+                f"SELECT filename FROM files WHERE filename IN ({','.join('?' * len(names))})", names
+            )}
+            taken.update(name for name in names if name in self._pending)
+        for item in batch:
+            if item["filename"] in taken:
+                stem, suffix = os.path.splitext(item["filename"])
+                item["filename"] = f"{stem}.legacy-{item['sha256'][:12]}{suffix}"
+        self._write_batch(batch, replace=False)
+        for source in sources:
+            try:
+                os.unlink(source)
+            except OSError as e:
+                # Already in the store; skipping it keeps later sweeps from migrating it again
+                logger.warning(f"Could not remove migrated legacy file {source}: {str(e)}")
+                self._legacy_skipped.add(source)
+        self.migrated += len(batch)
+        return len(batch)
+
+    def _compress_old_blobs(self) -> int:
+        """Move blobs past ``compress_after_days`` to the cold tier, keeping only their gzip copy."""
+        if self.compress_after_days <= 0:
+            return 0
+        cutoff = time.time() - self.compress_after_days * SECONDS_PER_DAY
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sha256, path FROM blobs WHERE tier = ? AND created_at < ? ORDER BY created_at LIMIT ?",
+                (HOT, cutoff, self.sweep_batch)
+            ).fetchall()
+        compressed = 0
+        for sha256, relative in rows:
+            path = self.root / relative
+            gzip_path = self._sidecar(path, "gzip")
+            if not gzip_path.exists():
+                self._atomic_write(gzip_path, gzip.compress(path.read_bytes(), compresslevel=9, mtime=0))
+            with self._lock:
+                self._db.execute("UPDATE blobs SET tier = ? WHERE sha256 = ?", (COLD, sha256))
+                self._db.commit()
+            path.unlink(missing_ok=True)
+            compressed += 1
+        self.compressed += compressed
+        return compressed
+
+    def _enforce_retention(self):
+        """Delete index entries past the retention age, then the oldest while over the size limit."""
+        expired = evicted = 0
+        with self._lock:
+            if self.retention_days > 0:
+                cutoff = time.time() - self.retention_days * SECONDS_PER_DAY
+                expired = self._db.execute("DELETE FROM files WHERE created_at < ?", (cutoff,)).rowcount
+            if self.max_total_bytes > 0:
+                total, = self._db.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM blobs WHERE sha256 IN (SELECT sha256 FROM files)"
+                ).fetchone()
+                while total > self.max_total_bytes:
+                    oldest = self._db.execute(
+                        "SELECT filename, sha256 FROM files ORDER BY created_at LIMIT ?", (self.sweep_batch,)
+                    ).fetchall()
+                    if not oldest:
+                        break
+                    for filename, sha256 in oldest:
+                        self._db.execute("DELETE FROM files WHERE filename = ?", (filename,))
+                        evicted += 1
+                        still_used = self._db.execute("SELECT 1 FROM files WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone()
+                        if not still_used:
+                            size, = self._db.execute("SELECT size FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+                            total -= size
+                            if total <= self.max_total_bytes:
+                                break
+            self._db.commit()
+        self.expired += expired
+        self.evicted += evicted
+        return expired, evicted
+
+    def _delete_orphan_blobs(self) -> int:
+        """Delete blobs (and their sidecars) no longer referenced by any file."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sha256, path FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM files)"
+            ).fetchall()
+            self._db.executemany("DELETE FROM blobs WHERE sha256 = ?", [(sha256,) for sha256, _ in rows])
+            self._db.commit()
+        for _, relative in rows:
+            path = self.root / relative
+            for candidate in [path] + [self._sidecar(path, encoding) for encoding in SIDECAR_SUFFIXES]:
+                candidate.unlink(missing_ok=True)
+        self.blobs_deleted += len(rows)
+        return len(rows)
@@ -0,0 +1,169 @@
+"""
+Conversation Store
+
+Bounded conversation memory for the marketing content generator. The number of
+active sessions is capped with LRU eviction, each session's history is kept
+within a token budget by dropping the oldest turns, and the system prompt is
+always pinned as the first message sent to the model.
+"""
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough per-message overhead of the chat format in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimate the token count of a piece of text (roughly four characters per token)."""
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+
+def estimate_message_tokens(message: Dict[str, str]) -> int:
+    """Estimate the prompt tokens a single chat message costs."""
+    return estimate_tokens(message.get("content")) + MESSAGE_OVERHEAD_TOKENS
+
+
+class _Session:
+    """History for a single conversation, stored as (user, assistant) turns."""
+
+    __slots__ = ("turns", "tokens", "dropped_tokens")
+
+    def __init__(self):
+        self.turns: Deque[Dict[str, Any]] = deque()
+        self.tokens = 0
+        self.dropped_tokens = 0
+
+
+class ConversationStore:
+    """Thread-safe, LRU-bounded and token-budgeted conversation history."""
+
+    def __init__(self,
+                 system_prompt: str,
+                 max_sessions: int = 1000,
+                 max_tokens_per_session: int = 3000):
+        """
+        Initialize the store.
+
+        Args:
+            system_prompt: Prompt pinned at the start of every conversation
+            max_sessions: Maximum number of sessions kept before evicting the least recently used
+            max_tokens_per_session: Prompt token budget per session, including the system prompt
+        """
+        self.system_message = {"role": "system", "content": system_prompt}
+        self.max_sessions = max_sessions
+        self.max_tokens_per_session = max_tokens_per_session
+
+        self._system_tokens = estimate_message_tokens(self.system_message)
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.evictions = 0
+        self.dropped_turns = 0
+        self.prompt_tokens_sent = 0
+        self.prompt_tokens_saved = 0
+
+    def build_messages(self, session_id: str, user_message: Dict[str, str]) -> List[Dict[str, str]]:
+        """
+        Build the message list to send for a new user message.
+
+        The system prompt and the new message are always included; prior turns
+        are added newest first until the session token budget is reached.
+        """
+        user_tokens = estimate_message_tokens(user_message)
+        with self._lock:
+            session = self._touch(session_id)
+            budget = self.max_tokens_per_session - self._system_tokens - user_tokens
+
+            included: List[Dict[str, Any]] = []
+            used = 0
+            for turn in reversed(session.turns):
+                if used + turn["tokens"] > budget:
+                    break
+                included.append(turn)
+                used += turn["tokens"]
+            included.reverse()
+
+            skipped = session.tokens - used
+            self.prompt_tokens_saved += session.dropped_tokens + skipped
+            self.prompt_tokens_sent += self._system_tokens + used + user_tokens
+
+            messages = [self.system_message]
+            for turn in included:
+                messages.append(turn["user"])
+                messages.append(turn["assistant"])
+            messages.append(user_message)
+            return messages
+
+    def append_turn(self,
+                    session_id: str,
+                    user_message: Dict[str, str],
+                    assistant_message: Dict[str, str]) -> None:
+        """Record a completed turn and trim the session back within its budget."""
+        tokens = estimate_message_tokens(user_message) + estimate_message_tokens(assistant_message)
+        with self._lock:
+            session = self._touch(session_id)
+            session.turns.append({"user": user_message, "assistant": assistant_message, "tokens": tokens})
+            session.tokens += tokens
+
+            history_budget = self.max_tokens_per_session - self._system_tokens
+            while session.turns and session.tokens > history_budget:
+                dropped = session.turns.popleft()
+                session.tokens -= dropped["tokens"]
+                session.dropped_tokens += dropped["tokens"]
+                self.dropped_turns += 1
+
+    def get(self, session_id: str) -> List[Dict[str, str]]:
+        """Return the stored messages for a session, starting with the system prompt."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            messages = [self.system_message]
+            if session is not None:
+                for turn in session.turns:
+                    messages.append(turn["user"])
+                    messages.append(turn["assistant"])
+            return messages
+
+    def clear(self, session_id: Optional[str] = None) -> None:
+        """Forget one session, or every session if no id is given."""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters describing memory use and prompt savings."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "max_tokens_per_session": self.max_tokens_per_session,
+                "evictions": self.evictions,
+                "dropped_turns": self.dropped_turns,
+                "prompt_tokens_sent": self.prompt_tokens_sent,
+                "prompt_tokens_saved": self.prompt_tokens_saved,
+            }
+
+    def _touch(self, session_id: str) -> _Session:
+        """Get or create a session and mark it most recently used. Caller holds the lock."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = _Session()
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                evicted_id, _ = self._sessions.popitem(last=False)
+                self.evictions += 1
+                logger.debug(f"Evicted conversation session {evicted_id}")
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
@@ -0,0 +1,173 @@
+"""
+Fallback Content
+
+Sample marketing content served when Azure OpenAI is unavailable. Templates
+are split into literal text and field segments once at import and indexed by
+normalized (content_type, length), so rendering a fallback joins only the
+segments of the template it returns rather than rebuilding every template on
+each call. Shared by the web app and the Marketing_updates fallback agent.
+
+``bench_fallback_content.py`` times rendering against the previous
+``generate_sample_content``, which built every template on each call.
+"""
+
+import string
+from typing import Dict, Optional, Tuple
+
+from generation_budget import normalize_content_type, normalize_length
+
+# Content types without their own templates get social posts
+DEFAULT_CONTENT_TYPE = "social"
+
+SAMPLE_TEMPLATES = {
+    "social": {
+        "short": "🚀 Attention {audience}! Try our innovative products. #{hashtag}",
+        "medium": "🚀 Attention {audience}! Our innovative products are transforming the industry with features you won't find anywhere else. Experience the difference today! #{hashtag} #LeadingEdge",
+        "long": "🚀 Attention {audience}! Our innovative products are transforming the industry with features you won't find anywhere else. Experience the difference today!\n\nOur cutting-edge solutions are designed specifically for {audience}, with careful attention to your unique needs. We've spent years perfecting our approach, and the results speak for themselves.\n\n#{hashtag} #LeadingEdge #CustomerSuccess #QualityMatters"
+    },
+    "email": {
+        "short": "Subject: Special Offer for {audience}\n\nHello,\n\nDon't miss our latest solutions designed for {audience}. Visit our website today!\n\nRegards,\nThe Marketing Team",
+        "medium": "Subject: Discover How Our Products Can Transform Your Experience\n\nHello {audience},\n\nAre you ready to experience our innovative solutions?\n\nOur latest products combine cutting-edge technology with intuitive design to create a seamless experience.\n\nReady to elevate your experience? Visit our website for an exclusive limited-time offer.\n\nWarm regards,\nThe Marketing Team",
+        "long": """Subject: Discover How Our Products Can Transform Your Experience
+
+Hello {audience},
+
+Are you ready to experience our innovative solutions?
+
+Our latest products combine cutting-edge technology with intuitive design to create a seamless experience. From advanced features that truly understand your needs to efficiency improvements that save you time and money, our offerings adapt to your lifestyle.
+
+Key benefits include:
+• Innovative technology that anticipates your needs
+• Seamless integration with your existing systems
+• Cost savings of up to 30%
+• Enhanced performance with real-time monitoring
+
+Join thousands of satisfied customers who have already transformed their experience.
+
+Ready to elevate your experience? Visit our website for an exclusive limited-time offer.
+
+Warm regards,
+The Marketing Team"""
+    },
+    "blog": {
+        "short": "# Solutions for {audience}\n\nOur products help {audience} solve common problems efficiently. Learn how we can help you today.",
+        "medium": "# 3 Ways Our Solutions Help {audience}\n\nIn today's fast-paced world, {audience} need efficient solutions. Here's how our products can help:\n\n1. Save time with automation\n2. Reduce costs with smart technology\n3. Improve results with data-driven insights",
+        "long": """# 5 Ways Our Solutions Are Transforming the Industry
+
+In today's fast-paced world, {audience} are seeking innovative solutions to everyday challenges. The good news? Our offerings have never been more exciting or accessible.
+
+## The Evolution of Excellence
+
+Recent studies show that over 70% of consumers are actively searching for solutions that provide meaningful improvements. This shift has driven us to rethink our approach from the ground up.
+
+## How Our Solutions Make a Difference
+
+### 1. Efficiency That Pays For Itself
+
+Our innovative products don't just improve your experience—they improve your bottom line. Our customers report saving 25% more time and resources compared to conventional solutions.
+
+### 2. Superior Materials, Superior Performance
+
+We use only the highest quality components that outperform conventional alternatives in durability and functionality. This commitment to quality ensures a longer lifespan and better performance.
+
+### 3. Intelligent Design Reduces Waste
+
+Our design philosophy emphasizes longevity, repairability, and sustainability. We proudly offer lifetime support on our products, with modular components that can be easily replaced.
+
+### 4. Enhanced User Experience
+
+Our products contain fewer complications and a more intuitive interface, leading to better user satisfaction and fewer support issues. This creates a better experience for everyone.
+
+### 5. Innovation and Practicality Join Forces
+
+Our technology works hand-in-hand with practical needs. From intelligent interfaces that learn your preferences to automated features that save time, our innovations help maximize your efficiency.
+
+## Making the Transition
+
+Transforming your experience doesn't require a complete overhaul overnight. Start by exploring our solutions that address your most pressing needs, where the impact will be greatest.
+
+Remember that every improvement contributes to a larger collective benefit. Your choice today helps create a better tomorrow."""
+    }
+}
+
+
+class CompiledTemplate:
+    """A template split once into literal text and the fields between it."""
+
+    __slots__ = ("segments",)
+
+    def __init__(self, template: str):
+        segments = []
+        for literal, field, format_spec, conversion in string.Formatter().parse(template):
+            if field is not None and (not field.isidentifier() or format_spec or conversion):
+                raise ValueError(f"Unsupported template field: {{{field}}}")
+            segments.append((literal, field))
+        # Each segment is literal text followed by a field name, or None after the last field
+        self.segments: Tuple[Tuple[str, Optional[str]], ...] = tuple(segments)
+
+    def render(self, **values: str) -> str:
+        """
+        Substitute ``values`` into the template; values are inserted verbatim.
+
+        Unused values are accepted so every template of an engine renders from the same arguments.
+        """
+        return "".join([literal + values[field] if field is not None else literal
+                        for literal, field in self.segments])
+
+
+class FallbackContentEngine:
+    """Compiled sample templates indexed by normalized (content_type, length)."""
+
+    def __init__(self, templates: Dict[str, Dict[str, str]] = SAMPLE_TEMPLATES):
+        """
+        Compile all templates.
+
+        Args:
+            templates: Template strings by content type key and length, with
+                ``{audience}`` and ``{hashtag}`` fields
+        """
+        self._templates: Dict[Tuple[str, str], CompiledTemplate] = {
+            (content_type, length): CompiledTemplate(template)
+            for content_type, by_length in templates.items()
+            for length, template in by_length.items()
+        }
+        self._content_types = frozenset(content_type for content_type, _ in self._templates)
+
+    def key(self, content_type: Optional[str], length: Optional[str]) -> Tuple[str, str]:
+        """Return the (content_type, length) template key a request renders with."""
+        content_type_key = normalize_content_type(content_type)
+        if content_type_key not in self._content_types:
+            content_type_key = DEFAULT_CONTENT_TYPE
+        return content_type_key, normalize_length(length)
+
+    def render(self,
+               content_type: Optional[str],
+               audience: str,
+               tone: Optional[str],
+               length: Optional[str],
+               hashtag: Optional[str] = None) -> str:
+        """
+        Render the sample content for a request.
+
+        Args:
+            content_type: Free-form content type (e.g. "Social Media Post")
+            audience: Target audience substituted into the content
+            tone: Tone; capitalized into the hashtag unless ``hashtag`` is given
+            length: "short", "medium" or "long" (anything else is medium)
+            hashtag: Hashtag (without "#") for social posts
+
+        Returns:
+            The rendered content.
+        """
+        if hashtag is None:
+            hashtag = (tone or "").capitalize()
+        return self._templates[self.key(content_type, length)].render(audience=audience, hashtag=hashtag)
+
+
+fallback_engine = FallbackContentEngine()
+
+
+def render_fallback_content(content_type, audience, tone, length, hashtag=None):
+    """Render sample content with the shared engine."""
+    return fallback_engine.render(content_type, audience, tone, length, hashtag)
+
@@ -0,0 +1,187 @@
+"""
+Generation Budget
+
+Maps a (content_type, length) request onto calibrated generation parameters
+instead of a fixed max_tokens. Prompt size is estimated locally before a call
+is sent, and observed completion token usage is recorded so each bucket's
+max_tokens converges on what the model actually needs.
+"""
+
+import logging
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from conversation_store import estimate_message_tokens, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+LENGTHS = ["short", "medium", "long"]
+
+# Starting max_tokens per content type, indexed like LENGTHS
+DEFAULT_MAX_TOKENS = {
+    "social": (120, 220, 400),
+    "ad": (150, 260, 450),
+    "product": (200, 400, 700),
+    "email": (300, 600, 1000),
+    "press": (450, 900, 1600),
+    "blog": (500, 1100, 2200),
+    "other": (300, 700, 1400),
+}
+
+# Stop sequences per content type; short formats stop at a run of blank lines
+DEFAULT_STOP = {
+    "social": ["\n\n\n\n"],
+    "ad": ["\n\n\n\n"],
+}
+
+CONTENT_TYPE_ALIASES = {
+    "social": ["social", "social media", "social media post", "tweet"],
+    "ad": ["ad", "ad copy", "advertisement"],
+    "product": ["product", "product description"],
+    "email": ["email", "email/newsletter", "newsletter", "email campaign"],
+    "press": ["press", "press release"],
+    "blog": ["blog", "blog post", "article"],
+}
+_ALIAS_LOOKUP = {alias: key for key, aliases in CONTENT_TYPE_ALIASES.items() for alias in aliases}
+
+# Factor max_tokens grows by after a response was truncated by it
+TRUNCATION_GROWTH = 1.5
+
+
+def normalize_content_type(content_type: Optional[str]) -> str:
+    """Map a free-form content type onto a budget bucket."""
+    return _ALIAS_LOOKUP.get((content_type or "").strip().lower(), "other")
+
+
+def normalize_length(length: Optional[str]) -> str:
+    """Map a free-form length onto short, medium or long (default medium)."""
+    length = (length or "").strip().lower()
+    return length if length in LENGTHS else "medium"
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimate the prompt tokens of a chat request."""
+    return sum(estimate_message_tokens(message) for message in messages)
+
+
+class GenerationBudget:
+    """Calibrated, self-tuning max_tokens and stop sequences per (content_type, length)."""
+
+    def __init__(self,
+                 max_tokens_ceiling: int = 4096,
+                 min_tokens: int = 64,
+                 context_window: int = 128000,
+                 headroom: float = 1.25,
+                 window_size: int = 50,
+                 min_samples: int = 10):
+        """
+        Initialize the budget.
+
+        Args:
+            max_tokens_ceiling: Upper bound on max_tokens for any request
+            min_tokens: Lower bound on max_tokens for any request
+            context_window: Model context size; max_tokens is clipped so prompt + completion fit
+            headroom: Multiplier applied to the observed 95th percentile when tuning
+            window_size: Number of recent completions kept per bucket
+            min_samples: Completions required in a bucket before it is tuned
+        """
+        self.max_tokens_ceiling = max_tokens_ceiling
+        self.min_tokens = min_tokens
+        self.context_window = context_window
+        self.headroom = headroom
+        self.window_size = window_size
+        self.min_samples = min_samples
+
+        self._limits: Dict[Tuple[str, str], int] = {}
+        for content_type, limits in DEFAULT_MAX_TOKENS.items():
+            for length, limit in zip(LENGTHS, limits):
+                self._limits[(content_type, length)] = min(limit, max_tokens_ceiling)
+        self._samples: Dict[Tuple[str, str], Deque[int]] = {}
+        self._truncations: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def plan(self, content_type: str, length: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Choose generation parameters for a request.
+
+        Returns:
+            Dict with ``max_tokens``, ``stop`` (list or None), ``prompt_tokens_estimate``
+            and the normalized ``bucket``.
+        """
+        bucket = (normalize_content_type(content_type), normalize_length(length))
+        prompt_tokens = estimate_prompt_tokens(messages)
+        with self._lock:
+            max_tokens = self._limits[bucket]
+        # Leave room for the prompt inside the model's context window
+        max_tokens = max(self.min_tokens, min(max_tokens, self.context_window - prompt_tokens))
+        return {
+            "max_tokens": max_tokens,
+            "stop": DEFAULT_STOP.get(bucket[0]),
+            "prompt_tokens_estimate": prompt_tokens,
+            "bucket": f"{bucket[0]}/{bucket[1]}",
+        }
+
+    def expand(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return a copy of ``plan`` with max_tokens raised for retrying a truncated response.
+
+        The limit grows by TRUNCATION_GROWTH, capped by the ceiling and the room
+        left in the context window; the bucket itself is re-tuned by ``record_usage``.
+        """
+        room = self.context_window - plan["prompt_tokens_estimate"]
+        max_tokens = min(math.ceil(plan["max_tokens"] * TRUNCATION_GROWTH), self.max_tokens_ceiling, room)
+        return dict(plan, max_tokens=max(plan["max_tokens"], max_tokens))
+
+    def record_usage(self,
+                     content_type: str,
+                     length: str,
+                     completion_tokens: Optional[int],
+                     finish_reason: Optional[str] = None,
+                     completion_text: Optional[str] = None) -> None:
+        """
+        Record the completion size of a finished generation and re-tune its bucket.
+
+        If ``completion_tokens`` is unknown (e.g. streamed responses) it is
+        estimated from ``completion_text``. A ``finish_reason`` of ``length``
+        means the limit truncated the output, so the bucket is raised.
+        """
+        if not completion_tokens:
+            completion_tokens = estimate_tokens(completion_text)
+        if not completion_tokens:
+            return
+        bucket = (normalize_content_type(content_type), normalize_length(length))
+        with self._lock:
+            samples = self._samples.setdefault(bucket, deque(maxlen=self.window_size))
+            samples.append(completion_tokens)
+            current = self._limits[bucket]
+
+            if finish_reason == "length":
+                self._truncations[bucket] = self._truncations.get(bucket, 0) + 1
+                tuned = math.ceil(current * TRUNCATION_GROWTH)
+            elif len(samples) >= self.min_samples:
+                ordered = sorted(samples)
+                p95 = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+                tuned = math.ceil(p95 * self.headroom)
+            else:
+                return
+
+            tuned = max(self.min_tokens, min(tuned, self.max_tokens_ceiling))
+            if tuned != current:
+                logger.debug(f"Tuned max_tokens for {bucket[0]}/{bucket[1]}: {current} -> {tuned}")
+                self._limits[bucket] = tuned
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current limits and observed usage per bucket."""
+        with self._lock:
+            buckets = {}
+            for bucket, limit in sorted(self._limits.items()):
+                samples = self._samples.get(bucket)
+                buckets[f"{bucket[0]}/{bucket[1]}"] = {
+                    "max_tokens": limit,
+                    "samples": len(samples) if samples else 0,
+                    "avg_completion_tokens": round(sum(samples) / len(samples), 1) if samples else None,
+                    "truncations": self._truncations.get(bucket, 0),
+                }
+            return buckets
@@ -0,0 +1,255 @@
+"""
+Generation Cache
+
+Caches generated marketing content keyed on the normalized generation request
+and the model deployment, so repeated requests do not hit Azure OpenAI again.
+Entries live in an in-memory LRU bounded by entry count and total bytes, expire
+after a TTL, and can optionally be written through to SQLite so they survive
+restarts.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: Optional[str]) -> str:
+    """Normalize a prompt so trivially different submissions share a cache key."""
+    return re.sub(r"\s+", " ", (prompt or "").strip()).lower()
+
+
+def make_cache_key(deployment: str,
+                   content_type: str,
+                   audience: str,
+                   tone: str,
+                   length: str,
+                   prompt: str) -> str:
+    """Build a stable cache key for a generation request."""
+    payload = {
+        "deployment": deployment,
+        "content_type": (content_type or "").strip().lower(),
+        "audience": (audience or "").strip().lower(),
+        "tone": (tone or "").strip().lower(),
+        "length": (length or "").strip().lower(),
+        "prompt": normalize_prompt(prompt),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Thread-safe LRU/TTL cache for generated content with optional SQLite persistence."""
+
+    def __init__(self,
+                 max_entries: int = 1000,
+                 max_bytes: int = 50 * 1024 * 1024,
+                 ttl_seconds: float = 24 * 60 * 60,
+                 db_path: Optional[str] = None,
+                 max_disk_entries: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries held in memory
+            max_bytes: Maximum total size of cached content held in memory
+            ttl_seconds: Time after which an entry is considered stale
+            db_path: Optional SQLite file used to persist entries across restarts
+            max_disk_entries: Maximum number of rows kept in SQLite (defaults to 10x max_entries)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries or max_entries * 10
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._puts_since_prune = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.tokens_saved = 0
+        self.seconds_saved = 0.0
+
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str) -> None:
+        """Open (and create if needed) the SQLite backing store."""
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS generation_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._db.commit()
+            self._prune_db()
+            logger.info(f"Generation cache persisted to {db_path}")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open generation cache database {db_path}: {str(e)}")
+            self._db = None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached generation.
+
+        Returns:
+            The cached entry (``content``, ``usage``, ``generation_time``,
+            ``created_at``) or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry["created_at"] > self.ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                entry = self._load_from_db(key, now)
+                if entry is not None:
+                    self._insert(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            usage = entry.get("usage") or {}
+            self.tokens_saved += usage.get("total_tokens", 0)
+            self.seconds_saved += entry.get("generation_time", 0.0)
+            return dict(entry)
+
+    def put(self,
+            key: str,
+            content: str,
+            usage: Optional[Dict[str, int]] = None,
+            generation_time: float = 0.0) -> None:
+        """Store a generated result in the cache."""
+        entry = {
+            "content": content,
+            "usage": usage or {},
+            "generation_time": generation_time,
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._insert(key, entry)
+            self._store_to_db(key, entry)
+
+    def clear(self) -> None:
+        """Remove every entry from memory and the backing store."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM generation_cache")
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to clear generation cache database: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters describing cache effectiveness."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "tokens_saved": self.tokens_saved,
+                "seconds_saved": round(self.seconds_saved, 2),
+                "persistent": self._db is not None,
+            }
+
+    def _insert(self, key: str, entry: Dict[str, Any]) -> None:
+        """Insert an entry and evict least recently used entries over the bounds. Caller holds the lock."""
+        if key in self._entries:
+            self._remove(key)
+        size = len(entry["content"].encode("utf-8"))
+        if size > self.max_bytes:
+            logger.debug(f"Not caching entry of {size} bytes (limit {self.max_bytes})")
+            return
+        entry["size"] = size
+        self._entries[key] = entry
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry from memory. Caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry["size"]
+
+    def _load_from_db(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        """Load a non-expired entry from SQLite. Caller holds the lock."""
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT value, created_at FROM generation_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read generation cache database: {str(e)}")
+            return None
+        if row is None:
+            return None
+        if now - row[1] > self.ttl_seconds:
+            self.expirations += 1
+            return None
+        entry = json.loads(row[0])
+        entry["created_at"] = row[1]
+        return entry
+
+    def _store_to_db(self, key: str, entry: Dict[str, Any]) -> None:
+        """Write an entry through to SQLite. Caller holds the lock."""
+        if self._db is None:
+            return
+        value = json.dumps({
+            "content": entry["content"],
+            "usage": entry["usage"],
+            "generation_time": entry["generation_time"],
+        }, ensure_ascii=False)
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO generation_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, entry["created_at"])
+            )
+            self._db.commit()
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 100:
+                self._prune_db()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write generation cache database: {str(e)}")
+
+    def _prune_db(self) -> None:
+        """Drop expired rows and keep at most max_disk_entries of the newest rows."""
+        self._puts_since_prune = 0
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute("DELETE FROM generation_cache WHERE created_at < ?", (cutoff,))
+        self._db.execute(
+            """DELETE FROM generation_cache WHERE key NOT IN (
+                SELECT key FROM generation_cache ORDER BY created_at DESC LIMIT ?
+            )""",
+            (self.max_disk_entries,)
+        )
+        self._db.commit()
@@ -0,0 +1,732 @@
+"""
+Generation Service
+
+Configuration, shared components and generation logic used by both the Flask
+app (``app.py``) and the ASGI app (``asgi_app.py``). Importing this module
+reads configuration and builds in-memory components only: it starts no
+threads and makes no network calls, so each app decides what runs in its own
+process.
+
+The upstream generation steps (budget planning, model routing and
+escalation, variant bookkeeping, stream accumulation, caching and metrics) are
+written once here as ``Generation``, ``VariantsGeneration`` and
+``StreamGeneration``. The apps only make the upstream call itself, sync or
+async, between those steps.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from openai import APIStatusError
+
+from circuit_breaker import CircuitBreaker
+from conversation_store import ConversationStore, estimate_tokens
+from fallback_content import render_fallback_content
+from generation_budget import GenerationBudget, estimate_prompt_tokens
+from generation_cache import GenerationCache, make_cache_key
+from metrics import MetricsRegistry
+from model_router import ModelRouter
+from rate_limiter import RateLimiter, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Get environment variables for configuration - hardcode API version to known working version
+AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT", "https://unocode4377087879.openai.azure.com/")
+AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY", "8QRutvmpeSE3H2eQRt6DpvymhfzLVPX2VqDZuVMIOWe1fNQS52bIJQQJ99BDACYeBjFXJ3w3AAAAACOGjWih")
+# Hardcode the API version to the known working version instead of using environment variable
+AZURE_OPENAI_API_VERSION = "2023-05-15"  # Hardcoded working version
+AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
+# Optional small, fast deployment for short copy; model routing is off when unset
+AZURE_OPENAI_SMALL_DEPLOYMENT = os.getenv("AZURE_OPENAI_SMALL_DEPLOYMENT", "")
+
+# Generation cache configuration
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true"
+generation_cache = GenerationCache(
+    max_entries=int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(50 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("GENERATION_CACHE_TTL_SECONDS", "86400")),
+    db_path=os.getenv("GENERATION_CACHE_DB") or None
+)
+
+# Generation budget - calibrated max_tokens per (content_type, length), tuned from observed usage
+generation_budget = GenerationBudget(
+    max_tokens_ceiling=int(os.getenv("GENERATION_MAX_TOKENS_CEILING", "4096")),
+    context_window=int(os.getenv("GENERATION_CONTEXT_WINDOW", "128000"))
+)
+
+# Model routing - short copy goes to the small deployment and escalates on a failed quality check
+model_router = ModelRouter(
+    large_deployment=AZURE_OPENAI_DEPLOYMENT,
+    small_deployment=AZURE_OPENAI_SMALL_DEPLOYMENT
+)
+
+# Client-side rate limiting - keeps upstream calls within the deployment quota and queues
+# requests (up to their deadline) instead of letting 429s fall through to sample content
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "30"))
+rate_limiter = RateLimiter(
+    requests_per_minute=float(os.getenv("AZURE_OPENAI_RPM_LIMIT", "0")),
+    tokens_per_minute=float(os.getenv("AZURE_OPENAI_TPM_LIMIT", "0")),
+    max_queue=int(os.getenv("UPSTREAM_MAX_QUEUE", "100"))
+)
+
+# Circuit breaker - while Azure is failing, skip straight to the fallback instead of waiting on timeouts
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "60"))
+circuit_breaker = CircuitBreaker(
+    name="azure_openai",
+    failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+    recovery_timeout=float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", "30")),
+    half_open_max_calls=int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+)
+
+# Request coalescing configuration - concurrent identical requests share one upstream call
+COALESCING_ENABLED = os.getenv("COALESCING_ENABLED", "true").lower() == "true"
+COALESCING_WAIT_TIMEOUT = float(os.getenv("COALESCING_WAIT_TIMEOUT", "60"))
+
+# Batch generation configuration
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# Multi-variant generation - up to this many alternatives are requested in one upstream call
+GENERATION_MAX_VARIANTS = int(os.getenv("GENERATION_MAX_VARIANTS", "5"))
+
+# Startup configuration - in fast-start mode the client is created lazily and the
+# connectivity probe runs in the background so worker boot never waits on the LLM
+FAST_START = os.getenv("FAST_START", "true").lower() == "true"
+STARTUP_PROBE_ENABLED = os.getenv("STARTUP_PROBE_ENABLED", "true").lower() == "true"
+STARTUP_PROBE_TIMEOUT = float(os.getenv("STARTUP_PROBE_TIMEOUT", "10"))
+
+# Metrics registry served at /metrics
+metrics_registry = MetricsRegistry()
+http_requests_total = metrics_registry.counter(
+    "http_requests_total", "HTTP requests by route, method and status", ["route", "method", "status"])
+http_request_duration = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route (time to response headers)", ["route", "method"])
+http_requests_in_flight = metrics_registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled")
+upstream_request_duration = metrics_registry.histogram(
+    "azure_openai_request_duration_seconds", "Azure OpenAI call latency by deployment and outcome",
+    ["deployment", "outcome"])
+upstream_admission_wait = metrics_registry.histogram(
+    "azure_openai_admission_wait_seconds", "Time spent waiting for rate limiter admission")
+upstream_tokens_total = metrics_registry.counter(
+    "azure_openai_tokens_total", "Tokens used by Azure OpenAI calls", ["deployment", "type"])
+upstream_stream_errors_total = metrics_registry.counter(
+    "azure_openai_stream_errors_total", "Streams that broke off after tokens were sent", ["deployment"])
+generations_total = metrics_registry.counter(
+    "generations_total", "Generated content by generation mode", ["mode"])
+fallback_duration = metrics_registry.histogram(
+    "fallback_generation_duration_seconds", "Sample content generator latency",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05))
+component_gauge = metrics_registry.gauge(
+    "component_stat", "Point-in-time statistics of caches, queues and breakers", ["component", "stat"])
+
+# Template mapping
+TEMPLATES = {
+    "social": "Create a {tone} social media post for {audience} about {topic}. Highlight the key features and benefits.",
+    "email": "Write a {tone} email newsletter for {audience} about {topic}. Include an engaging subject line and call to action.",
+    "blog": "Create a {tone} blog post titled '{title}' for {audience} discussing {topic}. Include an introduction, key points, and conclusion.",
+    "press": "Write a {tone} press release announcing {topic} for {audience}. Include quotes, key facts, and contact information.",
+    "ad": "Create a {tone} advertisement for {audience} promoting {product/service}. Highlight the unique selling points and include a call to action.",
+    "product": "Write a {tone} product description for {product_name} targeting {audience}. Emphasize the features, benefits, and use cases."
+}
+
+# Marketing content options
+CONTENT_TYPES = [
+    {"id": "social", "name": "Social Media Post"},
+    {"id": "email", "name": "Email Campaign"},
+    {"id": "blog", "name": "Blog Post"},
+    {"id": "press", "name": "Press Release"},
+    {"id": "ad", "name": "Advertisement"},
+    {"id": "product", "name": "Product Description"}
+]
+
+TONES = [
+    {"id": "professional", "name": "Professional"},
+    {"id": "conversational", "name": "Conversational"},
+    {"id": "enthusiastic", "name": "Enthusiastic"},
+    {"id": "formal", "name": "Formal"},
+    {"id": "informal", "name": "Informal"},
+    {"id": "humorous", "name": "Humorous"},
+    {"id": "authoritative", "name": "Authoritative"},
+    {"id": "inspirational", "name": "Inspirational"},
+    {"id": "educational", "name": "Educational"}
+]
+
+SYSTEM_PROMPT = "You are a marketing expert specialized in creating compelling and effective marketing content. You are excellent at adapting your writing style to different audiences and tones."
+
+# Conversation history store - bounded by session count (LRU) and a per-session token budget
+conversation_history = ConversationStore(
+    system_prompt=SYSTEM_PROMPT,
+    max_sessions=int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000")),
+    max_tokens_per_session=int(os.getenv("CONVERSATION_MAX_TOKENS", "3000"))
+)
+
+# One-token request the connectivity probe sends
+PROBE_MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+class ConnectivityProbe:
+    """State of the startup connectivity probe reported by /status and /health."""
+
+    def __init__(self, enabled: bool):
+        self._lock = threading.Lock()
+        self._state = {
+            'status': 'disabled' if not enabled else 'pending',
+            'started_at': None,
+            'finished_at': None,
+            'latency': None,
+            'error': None
+        }
+        self._started = None
+
+    def state(self) -> Dict[str, Any]:
+        """Return a copy of the probe state."""
+        with self._lock:
+            return dict(self._state)
+
+    def begin(self) -> None:
+        """Mark the probe as running."""
+        self._started = time.time()
+        with self._lock:
+            self._state.update(status='running', started_at=datetime.now().isoformat(),
+                               finished_at=None, latency=None, error=None)
+
+    def finish(self, error: Optional[BaseException] = None, timed_out: bool = False) -> bool:
+        """Record the probe's outcome and return True if it succeeded."""
+        if error is None:
+            result = {'status': 'ok', 'error': None}
+        else:
+            result = {'status': 'timeout' if timed_out else 'failed', 'error': str(error)}
+        with self._lock:
+            self._state.update(result, finished_at=datetime.now().isoformat(),
+                               latency=round(time.time() - (self._started or time.time()), 3))
+        return error is None
+
+
+def build_enhanced_prompt(content_type, audience, tone, length, prompt):
+    """Build the user message sent to the model for a generation request."""
+    return f"""Content Type: {content_type}
+Target Audience: {audience}
+Tone: {tone}
+Length: {length}
+
+Instructions: {prompt}
+
+Create a {tone} {content_type} for {audience}. The content should be {length} in length and follow marketing best practices. Ensure the content is engaging, on-brand, and includes a clear call-to-action.
+"""
+
+def read_generation_form(form):
+    """Read the /generate form fields with their defaults."""
+    return (
+        form.get('content_type', ''),
+        form.get('prompt', ''),
+        form.get('audience', 'general audience'),
+        form.get('tone', 'professional'),
+        form.get('length', 'medium'),
+        form.get('save', 'false') == 'true'
+    )
+
+def usage_to_dict(usage):
+    """Convert an OpenAI usage object to a plain dict."""
+    if usage is None:
+        return {}
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+        'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+        'total_tokens': getattr(usage, 'total_tokens', 0) or 0
+    }
+
+def cache_metadata():
+    """Return the cache counters included in response metadata."""
+    stats = generation_cache.stats()
+    return {'hits': stats['hits'], 'misses': stats['misses'], 'hit_rate': stats['hit_rate']}
+
+def request_key(content_type, audience, tone, length, prompt):
+    """Return the normalized identity of a generation request, including its routed deployment."""
+    deployment = model_router.route(content_type, length)
+    return make_cache_key(deployment, content_type, audience, tone, length, prompt)
+
+def generation_cache_key(form, content_type, audience, tone, length, prompt):
+    """Return the cache key for a request, or None if caching is disabled for it."""
+    if not GENERATION_CACHE_ENABLED or str(form.get('cache', 'true')).lower() == 'false':
+        return None
+    return request_key(content_type, audience, tone, length, prompt)
+
+def format_sse(event, data):
+    """Format a Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def generate_sample_content(content_type, audience, tone, length, prompt):
+    """Generate sample marketing content if the Azure client fails."""
+    generations_total.inc(mode='sample')
+    with fallback_duration.time():
+        return render_fallback_content(content_type, audience, tone, length)
+
+def sample_events(metadata, reason, content_type, audience, tone, length, prompt):
+    """Return the SSE events that stream sample content in place of a failed generation."""
+    logger.info("Falling back to sample content generation for stream")
+    generated_content = generate_sample_content(
+        content_type=content_type,
+        audience=audience,
+        tone=tone,
+        length=length,
+        prompt=prompt
+    )
+    return [
+        format_sse('delta', {'content': generated_content}),
+        format_sse('done', {
+            'status': 'success',
+            'content': generated_content,
+            'metadata': dict(metadata,
+                             timestamp=datetime.now().isoformat(),
+                             generation_mode='sample',
+                             fallback_reason=reason)
+        })
+    ]
+
+def cached_events(metadata, generated_content):
+    """Return the SSE events that stream a cached generation."""
+    return [
+        format_sse('delta', {'content': generated_content}),
+        format_sse('done', {
+            'status': 'success',
+            'content': generated_content,
+            'metadata': dict(metadata,
+                             timestamp=datetime.now().isoformat(),
+                             generation_time="0.00s",
+                             generation_mode='cache',
+                             cache=cache_metadata())
+        })
+    ]
+
+# Upstream call accounting - the apps make the (sync or async) call between these steps
+
+def upstream_request(messages, deployment, kwargs):
+    """Return the deployment, completion parameters and estimated token cost of a chat completion call."""
+    params = {'max_tokens': 4096, 'temperature': 0.7}
+    params.update(kwargs)
+    estimated_tokens = estimate_prompt_tokens(messages) + params['max_tokens'] * params.get('n', 1)
+    return deployment or AZURE_OPENAI_DEPLOYMENT, params, estimated_tokens
+
+def record_upstream_failure(error):
+    """Count an upstream error against the circuit breaker unless it was caused by the request itself."""
+    if isinstance(error, APIStatusError) and error.status_code < 500:
+        circuit_breaker.release()
+    else:
+        circuit_breaker.record_failure(error)
+
+def record_rate_limited(error, deployment, call_start):
+    """Account for a 429: it says nothing about upstream health, and pauses admissions for Retry-After."""
+    upstream_request_duration.observe(time.perf_counter() - call_start, deployment=deployment, outcome='rate_limited')
+    circuit_breaker.release()
+    rate_limiter.throttle(parse_retry_after(getattr(error.response, 'headers', None)))
+
+def record_call_error(error, deployment, call_start):
+    """Account for a failed upstream call."""
+    upstream_request_duration.observe(time.perf_counter() - call_start, deployment=deployment, outcome='error')
+    record_upstream_failure(error)
+
+def record_call_success(response, deployment, call_start, estimated_tokens):
+    """Account for a successful upstream call and reconcile its token estimate with the usage reported."""
+    upstream_request_duration.observe(time.perf_counter() - call_start, deployment=deployment, outcome='success')
+    circuit_breaker.record_success()
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        upstream_tokens_total.inc(getattr(usage, 'prompt_tokens', 0) or 0, deployment=deployment, type='prompt')
+        upstream_tokens_total.inc(getattr(usage, 'completion_tokens', 0) or 0, deployment=deployment, type='completion')
+    rate_limiter.reconcile(estimated_tokens, getattr(usage, 'total_tokens', None))
+
+def budget_params(plan):
+    """Convert a generation budget plan into chat completion parameters."""
+    params = {'max_tokens': plan['max_tokens']}
+    if plan['stop']:
+        params['stop'] = plan['stop']
+    return params
+
+def budget_metadata(plan, finish_reason=None):
+    """Return the budget details included in response metadata."""
+    return {
+        'bucket': plan['bucket'],
+        'max_tokens': plan['max_tokens'],
+        'prompt_tokens_estimate': plan['prompt_tokens_estimate'],
+        'finish_reason': finish_reason
+    }
+
+def initial_routing(deployment):
+    """Return the routing metadata of a generation that starts on ``deployment``."""
+    return {'deployment': deployment, 'initial_deployment': deployment,
+            'escalated': False, 'escalation_reason': None, 'latencies': {}}
+
+
+class Generation:
+    """
+    One upstream generation: its token budget, its routing and escalation
+    between deployments, and the caching and accounting of its result.
+
+    The caller makes the upstream calls::
+
+        generation = Generation(messages, content_type, length, cache_key)
+        while True:
+            call_start = time.time()
+            response = call_azure_openai(messages, **generation.call_params())
+            if not generation.record_response(response, time.time() - call_start):
+                return generation.result()
+    """
+
+    def __init__(self, messages, content_type, length, cache_key=None):
+        self.start_time = time.time()
+        self.content_type = content_type
+        self.length = length
+        self.cache_key = cache_key
+        self.plan = generation_budget.plan(content_type, length, messages)
+        self.routing = initial_routing(model_router.route(content_type, length))
+        self.response = None
+
+    def call_params(self):
+        """Return the keyword arguments of the next upstream call."""
+        return dict(budget_params(self.plan), deployment=self.routing['deployment'])
+
+    def record_response(self, response, call_latency):
+        """Check a response's quality and return True if it should be regenerated on the large deployment."""
+        deployment = self.routing['deployment']
+        self.routing['latencies'][deployment] = round(call_latency, 3)
+        self.response = response
+        choice = response.choices[0]
+        passed, reason = model_router.check_quality(choice.message.content, self.length,
+                                                    getattr(choice, 'finish_reason', None))
+        escalate = not passed and model_router.should_escalate(deployment)
+        model_router.record(deployment, call_latency, escalated_from=escalate)
+        if escalate:
+            logger.info(f"Escalating from {deployment} to {model_router.large_deployment}: {reason}")
+            self.routing.update(deployment=model_router.large_deployment, escalated=True, escalation_reason=reason)
+            if getattr(choice, 'finish_reason', None) == 'length':
+                # The same limit would truncate the retry as well
+                self.plan = generation_budget.expand(self.plan)
+        return escalate
+
+    def result(self):
+        """Record and cache the final response and return the generation result."""
+        choice = self.response.choices[0]
+        generated_content = choice.message.content
+        finish_reason = getattr(choice, 'finish_reason', None)
+        usage = usage_to_dict(getattr(self.response, 'usage', None))
+        generation_budget.record_usage(self.content_type, self.length, usage.get('completion_tokens'),
+                                       finish_reason, completion_text=generated_content)
+        elapsed_time = time.time() - self.start_time
+        if self.cache_key:
+            generation_cache.put(self.cache_key, generated_content, usage, elapsed_time)
+        generations_total.inc(mode='azure_openai')
+        return {
+            'content': generated_content,
+            'usage': usage,
+            'generation_time': elapsed_time,
+            'budget': budget_metadata(self.plan, finish_reason),
+            'routing': self.routing
+        }
+
+
+def parse_variants(form):
+    """
+    Return the number of variants a request asks for (1 if not given).
+
+    Raises:
+        ValueError: If ``variants`` is not an integer between 1 and GENERATION_MAX_VARIANTS
+    """
+    value = form.get('variants') or 1
+    try:
+        variants = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"variants must be an integer, got {value!r}")
+    if not 1 <= variants <= GENERATION_MAX_VARIANTS:
+        raise ValueError(f"variants must be between 1 and {GENERATION_MAX_VARIANTS}")
+    return variants
+
+def variant_cache_key(cache_key, index):
+    """Return the cache key of a request's ``index``-th variant; variant 0 is the single-generation entry."""
+    return cache_key if index == 0 else f"{cache_key}:variant:{index}"
+
+def cached_variants(cache_key, count):
+    """Return the cached variants of a request and the indices that still have to be generated."""
+    variants, missing = [], []
+    for index in range(count):
+        cached = generation_cache.get(variant_cache_key(cache_key, index)) if cache_key else None
+        if cached is None:
+            missing.append(index)
+            continue
+        variants.append({
+            'index': index,
+            'content': cached['content'],
+            'finish_reason': None,
+            'completion_tokens': cached['usage'].get('completion_tokens'),
+            'cached': True
+        })
+    if variants:
+        generations_total.inc(len(variants), mode='cache')
+    return variants, missing
+
+def split_completion_tokens(texts, completion_tokens):
+    """Apportion a response's completion tokens across its choices by their estimated size."""
+    estimates = [max(estimate_tokens(text), 1) for text in texts]
+    if not completion_tokens:
+        return estimates
+    total = sum(estimates)
+    shares = [completion_tokens * estimate // total for estimate in estimates]
+    shares[-1] += completion_tokens - sum(shares)
+    return shares
+
+def record_variants(response, indices, content_type, length, cache_key, generation_time):
+    """
+    Turn a multi-choice response into variants, caching each one.
+
+    Each variant is cached with the usage it would have had as a single
+    generation (the shared prompt plus its share of completion tokens), so a
+    later cache hit on it accounts for the tokens it saved.
+
+    Returns:
+        Tuple of (variants, usage) where usage is the response's total usage.
+    """
+    usage = usage_to_dict(getattr(response, 'usage', None))
+    choices = sorted(response.choices, key=lambda choice: getattr(choice, 'index', 0))
+    texts = [choice.message.content or '' for choice in choices]
+    prompt_tokens = usage.get('prompt_tokens', 0)
+    variants = []
+    for index, choice, text, completion_tokens in zip(indices, choices, texts,
+                                                      split_completion_tokens(texts, usage.get('completion_tokens'))):
+        finish_reason = getattr(choice, 'finish_reason', None)
+        generation_budget.record_usage(content_type, length, completion_tokens, finish_reason, completion_text=text)
+        if cache_key:
+            generation_cache.put(variant_cache_key(cache_key, index), text, {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }, generation_time)
+        variants.append({
+            'index': index,
+            'content': text,
+            'finish_reason': finish_reason,
+            'completion_tokens': completion_tokens,
+            'cached': False
+        })
+    generations_total.inc(len(variants), mode='azure_openai')
+    return variants, usage
+
+
+class VariantsGeneration:
+    """
+    Several alternatives of one request, generated in a single upstream call.
+
+    Only the variants missing from the cache are requested, with the ``n``
+    parameter, so a repeated request is served without an upstream call.
+    Variants are not escalated to a larger deployment. The caller makes the
+    call if ``missing`` is not empty and passes the response to
+    ``record_response``.
+    """
+
+    def __init__(self, messages, content_type, length, count, cache_key=None):
+        self.start_time = time.time()
+        self.content_type = content_type
+        self.length = length
+        self.cache_key = cache_key
+        self.variants, self.missing = cached_variants(cache_key, count)
+        self.plan = generation_budget.plan(content_type, length, messages)
+        self.routing = initial_routing(model_router.route(content_type, length))
+        self.usage = {}
+
+    def call_params(self):
+        """Return the keyword arguments of the upstream call for the missing variants."""
+        return dict(budget_params(self.plan), deployment=self.routing['deployment'], n=len(self.missing))
+
+    def record_response(self, response, call_latency):
+        """Record and cache the generated variants."""
+        deployment = self.routing['deployment']
+        self.routing['latencies'][deployment] = round(call_latency, 3)
+        model_router.record(deployment, call_latency)
+        generated, self.usage = record_variants(response, self.missing, self.content_type, self.length,
+                                                self.cache_key, time.time() - self.start_time)
+        self.variants.extend(generated)
+
+    def result(self):
+        """Return the result dict with ``variants`` ordered by index."""
+        self.variants.sort(key=lambda variant: variant['index'])
+        return {
+            'variants': self.variants,
+            'usage': self.usage,
+            'generation_time': time.time() - self.start_time,
+            'budget': budget_metadata(self.plan),
+            'routing': self.routing
+        }
+
+
+class StreamGeneration:
+    """
+    A streamed upstream generation.
+
+    Streamed tokens are already with the client, so streams are routed but
+    never escalated. The caller opens the stream with ``call_params()``, feeds
+    each chunk to ``add_chunk`` and calls ``finish`` once it ends.
+    """
+
+    def __init__(self, messages, content_type, length):
+        self.start_time = time.time()
+        self.content_type = content_type
+        self.length = length
+        self.plan = generation_budget.plan(content_type, length, messages)
+        self.deployment = model_router.route(content_type, length)
+        self.parts = []
+        self.finish_reason = None
+
+    @property
+    def content(self):
+        return ''.join(self.parts)
+
+    def call_params(self):
+        """Return the keyword arguments of the streaming upstream call."""
+        return dict(budget_params(self.plan), deployment=self.deployment, stream=True)
+
+    def add_chunk(self, chunk):
+        """Take a streamed chunk and return its text delta, or None if it carries no text."""
+        # Azure sends prompt filter results in chunks without choices
+        if not chunk.choices:
+            return None
+        self.finish_reason = getattr(chunk.choices[0], 'finish_reason', None) or self.finish_reason
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            return None
+        if not self.parts:
+            logger.info(f"First token received in {time.time() - self.start_time:.2f} seconds")
+        self.parts.append(delta)
+        return delta
+
+    def finish(self, mode, cache_key=None):
+        """Record and cache the streamed content and return its response metadata."""
+        generated_content = self.content
+        generation_budget.record_usage(self.content_type, self.length, None, self.finish_reason,
+                                       completion_text=generated_content)
+        elapsed_time = time.time() - self.start_time
+        logger.info(f"Content streamed in {elapsed_time:.2f} seconds")
+        model_router.record(self.deployment, elapsed_time)
+        generations_total.inc(mode=mode)
+        if cache_key:
+            generation_cache.put(cache_key, generated_content, generation_time=elapsed_time)
+        return {
+            'generation_time': f"{elapsed_time:.2f}s",
+            'generation_mode': mode,
+            'budget': budget_metadata(self.plan, self.finish_reason),
+            'routing': {'deployment': self.deployment, 'escalated': False}
+        }
+
+    def record_error(self, error):
+        """
+        Account for a stream that broke off after tokens were sent.
+
+        The call itself already succeeded and was recorded as such, so this is
+        counted as a stream error rather than a circuit breaker failure.
+        """
+        logger.warning(f"Stream from {self.deployment} broke off after {len(self.content)} characters: {str(error)}")
+        upstream_stream_errors_total.inc(deployment=self.deployment)
+
+
+def parse_batch_request(payload):
+    """
+    Return the items and concurrency of a /generate/batch body.
+
+    The body is ``{"items": [...], "max_concurrency": n}`` or a bare list of
+    items, each with the same fields as the /generate form.
+
+    Raises:
+        ValueError: With the message for a 400 response if the body is invalid
+    """
+    if isinstance(payload, list):
+        items, max_concurrency = payload, BATCH_MAX_CONCURRENCY
+    elif isinstance(payload, dict):
+        items = payload.get('items')
+        max_concurrency = payload.get('max_concurrency', BATCH_MAX_CONCURRENCY)
+    else:
+        items, max_concurrency = None, BATCH_MAX_CONCURRENCY
+
+    if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+        raise ValueError('Request body must contain a non-empty list of generation items')
+    if len(items) > BATCH_MAX_ITEMS:
+        raise ValueError(f'Batch size {len(items)} exceeds the limit of {BATCH_MAX_ITEMS} items')
+    try:
+        max_concurrency = max(1, min(int(max_concurrency), BATCH_MAX_CONCURRENCY, len(items)))
+    except (TypeError, ValueError):
+        raise ValueError('max_concurrency must be an integer')
+    return items, max_concurrency
+
+def read_batch_item(spec):
+    """Read a batch item's fields with the /generate defaults."""
+    return (
+        str(spec.get('content_type', '')),
+        str(spec.get('prompt', '')),
+        str(spec.get('audience', 'general audience')),
+        str(spec.get('tone', 'professional')),
+        str(spec.get('length', 'medium')),
+        str(spec.get('save', 'false')).lower() == 'true'
+    )
+
+def batch_messages(content_type, audience, tone, length, prompt):
+    """Return the messages of a batch item; batch items are independent, so they do not share session history."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": build_enhanced_prompt(content_type, audience, tone, length, prompt)}
+    ]
+
+def batch_response(results, max_concurrency, elapsed_time):
+    """Return the /generate/batch response payload."""
+    modes = [result.get('metadata', {}).get('generation_mode') for result in results]
+    return {
+        'status': 'success',
+        'results': results,
+        'metadata': {
+            'count': len(results),
+            'succeeded': sum(1 for result in results if result['status'] == 'success'),
+            'fallbacks': modes.count('sample'),
+            'cache_hits': modes.count('cache'),
+            'max_concurrency': max_concurrency,
+            'timestamp': datetime.now().isoformat(),
+            'generation_time': f"{elapsed_time:.2f}s",
+            'cache': cache_metadata()
+        }
+    }
+
+def collect_generation_metrics(request_coalescer):
+    """Refresh component gauges from the cache, conversation store, limiter, coalescer and breaker."""
+    cache_stats = generation_cache.stats()
+    for stat in ('hits', 'misses', 'hit_rate', 'entries', 'bytes', 'evictions', 'tokens_saved'):
+        component_gauge.set(cache_stats[stat], component='generation_cache', stat=stat)
+    conversation_stats = conversation_history.stats()
+    for stat in ('sessions', 'evictions', 'prompt_tokens_sent', 'prompt_tokens_saved'):
+        component_gauge.set(conversation_stats[stat], component='conversations', stat=stat)
+    limiter_stats = rate_limiter.stats()
+    for stat in ('queue_depth', 'admitted', 'rejected', 'timeouts', 'throttled'):
+        component_gauge.set(limiter_stats[stat], component='rate_limiter', stat=stat)
+    coalescing_stats = request_coalescer.stats()
+    for stat in ('in_flight', 'leaders', 'coalesced', 'timeouts'):
+        component_gauge.set(coalescing_stats[stat], component='coalescing', stat=stat)
+    breaker_stats = circuit_breaker.stats()
+    component_gauge.set({'closed': 0, 'half_open': 1, 'open': 2}[breaker_stats['state']],
+                        component='circuit_breaker', stat='state')
+    for stat in ('rejected', 'failures', 'times_opened'):
+        component_gauge.set(breaker_stats[stat], component='circuit_breaker', stat=stat)
+
+def generation_status(request_coalescer):
+    """Return the shared components' stats included in /status."""
+    return {
+        'generation_cache': generation_cache.stats(),
+        'coalescing': request_coalescer.stats(),
+        'generation_budget': generation_budget.stats(),
+        'model_routing': model_router.stats(),
+        'rate_limiter': rate_limiter.stats(),
+        'circuit_breaker': circuit_breaker.stats(),
+        'conversations': conversation_history.stats()
+    }
@@ -0,0 +1,242 @@
+"""
+Job Manager
+
+Runs long generations as background jobs so HTTP requests return immediately.
+A bounded worker pool executes jobs, clients poll a job for its status, partial
+output and final result, running jobs can be cancelled cooperatively, and
+finished jobs are dropped once their TTL expires.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when its job has been cancelled."""
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when too many jobs are queued or running to accept another."""
+
+
+class Job:
+    """State of one background job, shared between its worker and pollers."""
+
+    def __init__(self, job_id: str, kind: str):
+        self.id = job_id
+        self.kind = kind
+        self._status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future = None
+
+        self._lock = threading.Lock()
+        self._parts: List[str] = []
+        self._cancel = threading.Event()
+
+    @property
+    def status(self) -> str:
+        with self._lock:
+            return self._status
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        """Raise JobCancelled if the job has been cancelled; job functions call this between steps."""
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def append_output(self, text: str) -> None:
+        """Add a piece of partial output visible to pollers."""
+        with self._lock:
+            self._parts.append(text)
+
+    @property
+    def partial_output(self) -> str:
+        with self._lock:
+            return "".join(self._parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the job as a JSON-serializable dict."""
+        def iso(timestamp):
+            return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "job_status": self._status,
+                "created_at": iso(self.created_at),
+                "started_at": iso(self.started_at),
+                "finished_at": iso(self.finished_at),
+                "partial_output": "".join(self._parts),
+                "result": self.result,
+                "error": self.error,
+            }
+
+    def _finish(self, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+
+
+class JobManager:
+    """Bounded worker pool and registry of background jobs with TTL cleanup."""
+
+    def __init__(self,
+                 max_workers: int = 4,
+                 max_jobs: int = 100,
+                 ttl_seconds: float = 3600,
+                 cleanup_interval: float = 60):
+        """
+        Initialize the manager and start its cleanup thread.
+
+        Args:
+            max_workers: Jobs executed concurrently
+            max_jobs: Queued plus running jobs accepted before new ones are rejected
+            ttl_seconds: Seconds a finished job is kept for polling
+            cleanup_interval: Seconds between cleanup passes
+        """
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.cleanup_interval = cleanup_interval
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self.submitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.completed = {SUCCEEDED: 0, FAILED: 0, CANCELLED: 0}
+
+        self._reaper = threading.Thread(target=self._reap, name="job-cleanup", daemon=True)
+        self._reaper.start()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args: Any) -> Job:
+        """
+        Queue ``fn(job, *args)`` for execution.
+
+        Returns:
+            The new job; its result is whatever ``fn`` returns.
+
+        Raises:
+            JobQueueFull: If ``max_jobs`` jobs are already queued or running
+        """
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.status not in FINISHED_STATES)
+            if active >= self.max_jobs:
+                self.rejected += 1
+                raise JobQueueFull(f"Too many active jobs ({active})")
+            job = Job(uuid.uuid4().hex, kind)
+            self._jobs[job.id] = job
+            self.submitted += 1
+        job.future = self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a job; queued jobs never start and running jobs stop at their next check."""
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            self._record(job, CANCELLED, error="Cancelled before start")
+        return job
+
+    def cleanup(self) -> int:
+        """Drop finished jobs older than the TTL and return how many were removed."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+            self.expired += len(expired)
+        if expired:
+            logger.debug(f"Removed {len(expired)} expired job(s)")
+        return len(expired)
+
+    def shutdown(self) -> None:
+        """Cancel outstanding jobs and stop the worker pool and cleanup thread."""
+        self._stop.set()
+        with self._lock:
+            job_ids = list(self._jobs)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return job counts by state and lifetime counters."""
+        with self._lock:
+            by_status = {state: 0 for state in (QUEUED, RUNNING) + FINISHED_STATES}
+            for job in self._jobs.values():
+                by_status[job.status] += 1
+            return {
+                "max_workers": self.max_workers,
+                "max_jobs": self.max_jobs,
+                "ttl_seconds": self.ttl_seconds,
+                "jobs": len(self._jobs),
+                "by_status": by_status,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "completed": dict(self.completed),
+            }
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple) -> None:
+        if job.cancelled:
+            self._record(job, CANCELLED, error="Cancelled before start")
+            return
+        with job._lock:
+            job._status = RUNNING
+            job.started_at = time.time()
+        try:
+            result = fn(job, *args)
+        except JobCancelled as e:
+            self._record(job, CANCELLED, error=str(e))
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            self._record(job, FAILED, error=str(e))
+        else:
+            self._record(job, SUCCEEDED, result=result)
+
+    def _record(self, job: Job, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        job._finish(status, result, error)
+        with self._lock:
+            self.completed[status] += 1
+
+    def _reap(self) -> None:
+        while not self._stop.wait(self.cleanup_interval):
+            try:
+                self.cleanup()
+            except Exception as e:
+                logger.error(f"Error cleaning up jobs: {str(e)}")
@@ -0,0 +1,125 @@
+"""
+Logging Configuration
+
+Sets up application logging so that disk I/O stays off the request path. In
+async mode, handlers on the request threads only push records onto a queue and
+a background listener thread writes them to a size-rotated log file and the
+console. Noisy levels can be sampled before they are ever queued.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class LevelSamplingFilter(logging.Filter):
+    """Keep only a fraction of records at selected levels (e.g. 10% of DEBUG)."""
+
+    def __init__(self, sample_rates: Dict[int, float]):
+        super().__init__()
+        self.sample_rates = {level: rate for level, rate in sample_rates.items() if rate < 1.0}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.sample_rates.get(record.levelno)
+        return rate is None or random.random() < rate
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking the caller."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NonBlockingQueueHandler.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """QueueListener whose ``stop`` can be called again, e.g. by the app and then at exit."""
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            super().stop()
+
+
+def setup_logging(log_dir: Path,
+                  level: int = logging.DEBUG,
+                  async_mode: bool = True,
+                  max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5,
+                  sample_rates: Optional[Dict[int, float]] = None,
+                  queue_size: int = 10000) -> Optional[logging.handlers.QueueListener]:
+    """
+    Configure root logging with a rotating file handler and a console handler.
+
+    Args:
+        log_dir: Directory for ``app_YYYYMMDD.log`` files
+        level: Root log level
+        async_mode: Write through a queue and background listener thread
+        max_bytes: Size at which the log file is rotated
+        backup_count: Number of rotated files kept
+        sample_rates: Fraction of records kept per level, e.g. ``{logging.DEBUG: 0.1}``
+        queue_size: Maximum queued records; further records are dropped rather than blocking
+
+    Returns:
+        The running QueueListener in async mode, otherwise None.
+    """
+    log_dir.mkdir(exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_dir / f"app_{datetime.now().strftime('%Y%m%d')}.log",
+        maxBytes=max_bytes,
+        backupCount=backup_count,
+        encoding='utf-8'
+    )
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    sampling_filter = LevelSamplingFilter(sample_rates or {})
+    listener = None
+    if async_mode:
+        log_queue = queue.Queue(maxsize=queue_size)
+        queue_handler = _NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(sampling_filter)
+        # The listener's handlers apply LOG_FORMAT; the queued message must stay unformatted
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        handlers = [queue_handler]
+        listener = _QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        listener.start()
+        atexit.register(listener.stop)
+    else:
+        for handler in (file_handler, console_handler):
+            handler.addFilter(sampling_filter)
+        handlers = [file_handler, console_handler]
+
+    logging.basicConfig(level=level, handlers=handlers, force=True)
+    return listener
+
+
+def setup_logging_from_env(log_dir: Path) -> Optional[logging.handlers.QueueListener]:
+    """Configure logging from LOG_LEVEL, LOG_ASYNC, LOG_MAX_BYTES, LOG_BACKUP_COUNT and LOG_SAMPLE_*."""
+    return setup_logging(
+        log_dir,
+        level=getattr(logging, os.getenv("LOG_LEVEL", "DEBUG").upper(), logging.DEBUG),
+        async_mode=os.getenv("LOG_ASYNC", "true").lower() == "true",
+        max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        sample_rates={
+            logging.DEBUG: float(os.getenv("LOG_SAMPLE_DEBUG", "1.0")),
+            logging.INFO: float(os.getenv("LOG_SAMPLE_INFO", "1.0"))
+        }
+    )
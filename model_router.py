@@ -0,0 +1,121 @@
+"""
+Model Router
+
+Picks an Azure OpenAI deployment per generation request. Short, simple copy
+(social posts, ads, short product blurbs) goes to a small, fast deployment and
+long-form content goes to the large one. Output from the small deployment is
+run through a cheap quality check and escalated to the large deployment if it
+fails. Per-deployment latency is tracked so routing decisions can be reviewed.
+"""
+
+import logging
+import re
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from generation_budget import normalize_content_type, normalize_length
+
+logger = logging.getLogger(__name__)
+
+# (content_type, length) buckets served by the small deployment; "*" matches any length
+SMALL_MODEL_BUCKETS = {
+    ("social", "*"),
+    ("ad", "*"),
+    ("product", "short"),
+    ("product", "medium"),
+    ("email", "short"),
+}
+
+# Minimum characters expected from a usable completion, per length
+MIN_CONTENT_CHARS = {"short": 40, "medium": 150, "long": 400}
+
+REFUSAL_PATTERN = re.compile(
+    r"^\s*(i'm sorry|i am sorry|i apologize|i can't|i cannot|as an ai)\b", re.IGNORECASE
+)
+
+
+class ModelRouter:
+    """Route requests between a small and a large deployment with quality-based escalation."""
+
+    def __init__(self, large_deployment: str, small_deployment: Optional[str] = None):
+        """
+        Initialize the router.
+
+        Args:
+            large_deployment: Deployment used for long-form content and escalations
+            small_deployment: Fast deployment for short copy; routing is disabled when not set
+        """
+        self.large_deployment = large_deployment
+        self.small_deployment = small_deployment or None
+        self._lock = threading.Lock()
+        self._deployments: Dict[str, Dict[str, Any]] = {}
+        self.escalations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.small_deployment) and self.small_deployment != self.large_deployment
+
+    def route(self, content_type: str, length: str) -> str:
+        """Return the deployment that should serve a request first."""
+        if not self.enabled:
+            return self.large_deployment
+        content_type_key = normalize_content_type(content_type)
+        length_key = normalize_length(length)
+        if (content_type_key, "*") in SMALL_MODEL_BUCKETS or (content_type_key, length_key) in SMALL_MODEL_BUCKETS:
+            return self.small_deployment
+        return self.large_deployment
+
+    def check_quality(self,
+                      content: Optional[str],
+                      length: str,
+                      finish_reason: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Cheap quality check for a completion.
+
+        Returns:
+            Tuple of (passed, reason) where reason explains a failure.
+        """
+        text = (content or "").strip()
+        if not text:
+            return False, "empty response"
+        if finish_reason == "length":
+            return False, "response truncated"
+        if finish_reason == "content_filter":
+            return False, "response filtered"
+        if REFUSAL_PATTERN.match(text):
+            return False, "model refused"
+        min_chars = MIN_CONTENT_CHARS[normalize_length(length)]
+        if len(text) < min_chars:
+            return False, f"response shorter than {min_chars} characters"
+        return True, None
+
+    def should_escalate(self, deployment: str) -> bool:
+        """Whether a failed quality check on this deployment can be escalated."""
+        return self.enabled and deployment != self.large_deployment
+
+    def record(self, deployment: str, latency: float, escalated_from: bool = False) -> None:
+        """Record the latency of a call to a deployment and whether it was escalated away from."""
+        with self._lock:
+            stats = self._deployments.setdefault(deployment, {
+                "calls": 0, "total_latency": 0.0, "avg_latency": None, "escalated_from": 0
+            })
+            stats["calls"] += 1
+            stats["total_latency"] += latency
+            stats["avg_latency"] = round(stats["total_latency"] / stats["calls"], 3)
+            if escalated_from:
+                stats["escalated_from"] += 1
+                self.escalations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return routing configuration and per-deployment latency."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "large_deployment": self.large_deployment,
+                "small_deployment": self.small_deployment,
+                "escalations": self.escalations,
+                "deployments": {
+                    name: {key: value for key, value in stats.items() if key != "total_latency"}
+                    for name, stats in self._deployments.items()
+                },
+            }
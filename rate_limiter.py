@@ -0,0 +1,263 @@
+"""
+Rate Limiter
+
+Client-side admission control for Azure OpenAI calls. A pair of token buckets
+sized in requests per minute and tokens per minute keeps traffic inside the
+deployment quota, a bounded FIFO queue holds callers waiting for capacity, and
+Retry-After hints from 429 responses pause all admissions until they pass.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_AFTER = 1.0
+
+# How often async waiters re-check the queue; they cannot wait on the condition
+ASYNC_POLL_INTERVAL = 0.05
+
+# Longest single wait of a caller that can be cancelled, so cancellation is noticed promptly
+CANCEL_POLL_INTERVAL = 0.1
+
+
+class RateLimitTimeout(TimeoutError):
+    """Raised when a request's deadline expires before it is admitted."""
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when the admission queue is full."""
+
+
+def parse_retry_after(headers: Any, default: float = DEFAULT_RETRY_AFTER) -> float:
+    """Read the retry delay in seconds from 429 response headers."""
+    if not headers:
+        return default
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000.0)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return default
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate; unlimited when the rate is 0."""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._rate = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute <= 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be consumed."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self._rate
+
+    def consume(self, amount: float) -> None:
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Return (positive) or charge (negative) tokens after the real cost is known."""
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Shared requests/tokens-per-minute limiter with a bounded FIFO admission queue."""
+
+    def __init__(self,
+                 requests_per_minute: float = 0,
+                 tokens_per_minute: float = 0,
+                 max_queue: int = 100):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Request quota (0 for unlimited)
+            tokens_per_minute: Token quota (0 for unlimited)
+            max_queue: Maximum callers waiting for admission before new ones are rejected
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queue = max_queue
+
+        self._cond = threading.Condition()
+        self._queue: Deque[object] = deque()
+        self._blocked_until = 0.0
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+
+    def acquire(self,
+                tokens: int,
+                deadline: float,
+                check_cancelled: Optional[Callable[[], None]] = None) -> float:
+        """
+        Wait for capacity for one request costing ``tokens``.
+
+        Args:
+            tokens: Estimated tokens (prompt plus max completion) of the request
+            deadline: ``time.monotonic()`` value after which the caller gives up
+            check_cancelled: Called while waiting; raises to give up the wait (e.g. ``Job.check_cancelled``)
+
+        Returns:
+            Seconds spent waiting.
+
+        Raises:
+            AdmissionRejected: If the admission queue is full
+            RateLimitTimeout: If the deadline passes before admission
+            Exception: Whatever ``check_cancelled`` raised
+        """
+        start = time.monotonic()
+        ticket = self._enqueue()
+        with self._cond:
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._try_admit(ticket, tokens, start, now)
+                    if wait is not None and wait <= 0:
+                        return now - start
+                    remaining = self._remaining(deadline, start, now)
+                    if check_cancelled is not None:
+                        check_cancelled()
+                        remaining = min(remaining, CANCEL_POLL_INTERVAL)
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    async def acquire_async(self, tokens: int, deadline: float) -> float:
+        """
+        Asyncio counterpart of ``acquire`` sharing the same buckets and queue.
+
+        Waiting is done with ``asyncio.sleep`` so the event loop is never blocked.
+
+        Returns:
+            Seconds spent waiting.
+
+        Raises:
+            AdmissionRejected: If the admission queue is full
+            RateLimitTimeout: If the deadline passes before admission
+        """
+        start = time.monotonic()
+        ticket = self._enqueue()
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    wait = self._try_admit(ticket, tokens, start, now)
+                    if wait is not None and wait <= 0:
+                        return now - start
+                    remaining = self._remaining(deadline, start, now)
+                # Callers behind the head of the queue cannot be notified, so they poll
+                await asyncio.sleep(min(ASYNC_POLL_INTERVAL if wait is None else wait, remaining))
+        finally:
+            with self._cond:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def _enqueue(self) -> object:
+        """Add a waiter to the admission queue and return its ticket."""
+        ticket = object()
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected(f"Admission queue is full ({self.max_queue} waiting)")
+            self._queue.append(ticket)
+        return ticket
+
+    def _try_admit(self, ticket: object, tokens: int, start: float, now: float) -> Optional[float]:
+        """
+        Admit ``ticket`` if it heads the queue and capacity is available. Caller holds the lock.
+
+        Returns:
+            None if the ticket is not at the head of the queue, otherwise the
+            seconds until it can be admitted (0 once it has been admitted).
+        """
+        if self._queue[0] is not ticket:
+            return None
+        wait = max(self._blocked_until - now,
+                   self.requests.wait_time(1, now),
+                   self.tokens.wait_time(tokens, now))
+        if wait <= 0:
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self.admitted += 1
+            self.total_wait += now - start
+            return 0.0
+        return wait
+
+    def _remaining(self, deadline: float, start: float, now: float) -> float:
+        """Seconds left before ``deadline``, raising once it has passed. Caller holds the lock."""
+        remaining = deadline - now
+        if remaining <= 0:
+            self.timeouts += 1
+            raise RateLimitTimeout(f"Request not admitted within its deadline ({now - start:.2f}s waited)")
+        return remaining
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Correct the token bucket once a response reports its real token usage."""
+        if not actual_tokens:
+            return
+        with self._cond:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def throttle(self, retry_after: float) -> None:
+        """Pause all admissions for ``retry_after`` seconds after an upstream 429."""
+        with self._cond:
+            self.throttled += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            logger.warning(f"Upstream rate limited; pausing admissions for {retry_after:.2f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return limiter configuration, queue depth and counters."""
+        with self._cond:
+            now = time.monotonic()
+            return {
+                "requests_per_minute": self.requests.per_minute,
+                "tokens_per_minute": self.tokens.per_minute,
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "paused_for": round(max(0.0, self._blocked_until - now), 2),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "throttled": self.throttled,
+                "avg_wait": round(self.total_wait / self.admitted, 3) if self.admitted else 0.0,
+            }
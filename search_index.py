@@ -0,0 +1,252 @@
+"""
+Search Index
+
+Full-text search over saved, exported and shared content, backed by SQLite
+FTS5. Documents are added incrementally as content is persisted, through a
+background writer so indexing stays off the request path. Identical bodies are
+indexed once (keyed by content hash) and searches rank with BM25, filter on
+content type, tone, audience and date, and return highlighted snippets.
+"""
+
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_TOKENS = 24
+MAX_RESULTS = 100
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query matching all words, the last one as a prefix."""
+    tokens = TOKEN_PATTERN.findall(query or "")
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """SQLite FTS5 index of content with metadata filters and a background writer."""
+
+    def __init__(self, db_path: str, queue_size: int = 10000, batch_size: int = 100):
+        """
+        Open (or create) the index and start its writer thread.
+
+        Args:
+            db_path: SQLite file holding the index
+            queue_size: Documents waiting to be indexed before new ones are dropped
+            batch_size: Documents committed in one transaction
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=queue_size)
+        self._db = None
+
+        self.indexed = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.searches = 0
+
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id INTEGER PRIMARY KEY, sha256 TEXT NOT NULL UNIQUE, filename TEXT NOT NULL, kind TEXT, "
+                "content_type TEXT COLLATE NOCASE, tone TEXT COLLATE NOCASE, audience TEXT COLLATE NOCASE, "
+                "created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(body, tokenize='porter unicode61')")
+            for column in ("content_type", "tone", "audience", "created_at"):
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS documents_{column} ON documents ({column})")
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Search index unavailable ({db_path}): {str(e)}")
+            self._db = None
+            return
+
+        self._writer = threading.Thread(target=self._write_loop, name="search-indexer", daemon=True)
+        self._writer.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def add(self,
+            sha256: str,
+            filename: str,
+            body: str,
+            kind: Optional[str] = None,
+            content_type: Optional[str] = None,
+            tone: Optional[str] = None,
+            audience: Optional[str] = None,
+            created_at: Optional[float] = None) -> None:
+        """Queue a document for indexing; a body already indexed only refreshes its metadata."""
+        if not self.enabled:
+            return
+        try:
+            self._queue.put_nowait({
+                "sha256": sha256,
+                "filename": filename,
+                "body": body,
+                "kind": kind,
+                "content_type": content_type,
+                "tone": tone,
+                "audience": audience,
+                "created_at": created_at or time.time(),
+            })
+        except queue.Full:
+            self.dropped += 1
+
+    def search(self,
+               query: str = "",
+               content_type: Optional[str] = None,
+               tone: Optional[str] = None,
+               audience: Optional[str] = None,
+               date_from: Optional[float] = None,
+               date_to: Optional[float] = None,
+               limit: int = 20,
+               offset: int = 0) -> Dict[str, Any]:
+        """
+        Search indexed content.
+
+        Args:
+            query: Free text; every word must match, the last as a prefix. Empty lists newest first.
+            content_type: Exact (case-insensitive) content type filter
+            tone: Exact (case-insensitive) tone filter
+            audience: Exact (case-insensitive) audience filter
+            date_from: Only documents created at or after this timestamp
+            date_to: Only documents created before this timestamp
+            limit: Maximum results (capped at MAX_RESULTS)
+            offset: Results to skip, for paging
+
+        Returns:
+            Dict with ``results`` (ranked, with snippets) and ``total`` matches.
+        """
+        if not self.enabled:
+            return {"results": [], "total": 0}
+        filters, params = [], []
+        for column, value in (("content_type", content_type), ("tone", tone), ("audience", audience)):
+            if value:
+                filters.append(f"d.{column} = ?")
+                params.append(value)
+        if date_from is not None:
+            filters.append("d.created_at >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            filters.append("d.created_at < ?")
+            params.append(date_to)
+        limit = max(1, min(int(limit), MAX_RESULTS))
+        offset = max(0, int(offset))
+
+        match = build_match_query(query)
+        if match:
+            where = " AND ".join(["documents_fts MATCH ?"] + filters)
+            params = [match] + params
+            select = (
+                "SELECT d.filename, d.kind, d.content_type, d.tone, d.audience, d.created_at, "
+                f"snippet(documents_fts, 0, '<mark>', '</mark>', '…', {SNIPPET_TOKENS}), bm25(documents_fts) "
+                f"FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid WHERE {where} "
+                "ORDER BY bm25(documents_fts) LIMIT ? OFFSET ?"
+            )
+            count = f"SELECT COUNT(*) FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid WHERE {where}"
+        else:
+            where = " AND ".join(filters) or "1"
+            select = (
+                "SELECT d.filename, d.kind, d.content_type, d.tone, d.audience, d.created_at, "
+                f"substr(f.body, 1, {SNIPPET_TOKENS * 8}), NULL "
+                f"FROM documents d JOIN documents_fts f ON f.rowid = d.id WHERE {where} "
+                "ORDER BY d.created_at DESC LIMIT ? OFFSET ?"
+            )
+            count = f"SELECT COUNT(*) FROM documents d WHERE {where}"
+
+        with self._lock:
+            self.searches += 1
+            rows = self._db.execute(select, params + [limit, offset]).fetchall()
+            total, = self._db.execute(count, params).fetchone()
+        keys = ("filename", "kind", "content_type", "tone", "audience", "created_at", "snippet", "score")
+        results = []
+        for row in rows:
+            result = dict(zip(keys, row))
+            if result["score"] is not None:
+                # bm25() is lower-is-better; report higher-is-better
+                result["score"] = round(-result["score"], 4)
+            results.append(result)
+        return {"results": results, "total": total}
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued documents have been indexed; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size and counters."""
+        documents = 0
+        if self.enabled:
+            with self._lock:
+                documents, = self._db.execute("SELECT COUNT(*) FROM documents").fetchone()
+        return {
+            "enabled": self.enabled,
+            "documents": documents,
+            "pending": self._queue.qsize(),
+            "indexed": self.indexed,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "searches": self.searches,
+        }
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"Error indexing {len(batch)} document(s): {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for doc in batch:
+                row = self._db.execute("SELECT id FROM documents WHERE sha256 = ?", (doc["sha256"],)).fetchone()
+                if row is not None:
+                    # Same text saved again (e.g. exported in another format): point at the newest file
+                    self._db.execute(
+                        "UPDATE documents SET filename = ?, kind = ?, created_at = ?, "
+                        "content_type = COALESCE(?, content_type), tone = COALESCE(?, tone), "
+                        "audience = COALESCE(?, audience) WHERE id = ?",
+                        (doc["filename"], doc["kind"], doc["created_at"], doc["content_type"],
+                         doc["tone"], doc["audience"], row[0])
+                    )
+                    self.duplicates += 1
+                    continue
+                cursor = self._db.execute(
+                    "INSERT INTO documents (sha256, filename, kind, content_type, tone, audience, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (doc["sha256"], doc["filename"], doc["kind"], doc["content_type"],
+                     doc["tone"], doc["audience"], doc["created_at"])
+                )
+                self._db.execute("INSERT INTO documents_fts (rowid, body) VALUES (?, ?)", (cursor.lastrowid, doc["body"]))
+                self.indexed += 1
+            self._db.commit()
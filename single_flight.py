@@ -0,0 +1,191 @@
+"""
+Single Flight
+
+Request coalescing for concurrent identical work. The first caller for a key
+runs the function; callers arriving while it is in flight wait for that result
+instead of starting their own upstream call. ``AsyncSingleFlight`` does the
+same for coroutines running on one event loop.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CoalescingTimeout(TimeoutError):
+    """Raised when a waiter gives up on an in-flight call before it completes."""
+
+
+class _LeaderCancelled(Exception):
+    """Set on a shared future when its leader was cancelled, so a waiter runs the call instead."""
+
+
+class _Call:
+    """State of one in-flight call shared by its leader and waiters."""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key onto a single execution."""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Run ``fn`` once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the work being requested
+            fn: Function producing the result; only the leader calls it
+            timeout: Maximum seconds a waiter blocks for the leader's result
+
+        Returns:
+            Tuple of (result, shared) where ``shared`` is True if the result
+            came from another caller's execution.
+
+        Raises:
+            CoalescingTimeout: If a waiter's timeout expires first
+            Exception: Whatever ``fn`` raised, re-raised in every caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise CoalescingTimeout(f"Timed out after {timeout}s waiting for in-flight request")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            if call.waiters:
+                logger.debug(f"Shared in-flight result with {call.waiters} waiting request(s)")
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict[str, int]:
+        """Return coalescing counters."""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+            }
+
+
+class AsyncSingleFlight:
+    """Coalesce concurrent coroutine calls that share a key onto a single execution."""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    async def do(self,
+                 key: str,
+                 fn: Callable[[], Awaitable[Any]],
+                 timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Await ``fn()`` once for all concurrent callers with the same key.
+
+        If the leader is cancelled (e.g. its client disconnected), its waiters
+        are not: the first one to resume calls ``fn`` itself and the others
+        wait for it.
+
+        Args:
+            key: Identity of the work being requested
+            fn: Coroutine function producing the result; only the leader calls it
+            timeout: Maximum seconds a waiter waits for the leader's result
+
+        Returns:
+            Tuple of (result, shared) where ``shared`` is True if the result
+            came from another caller's execution.
+
+        Raises:
+            CoalescingTimeout: If a waiter's timeout expires first
+            Exception: Whatever ``fn`` raised, re-raised in every caller
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        joined = False
+        while key in self._calls:
+            if not joined:
+                self.coalesced += 1
+                joined = True
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                # Shield the shared future so a waiter timing out does not cancel the leader
+                return await asyncio.wait_for(asyncio.shield(self._calls[key]), remaining), True
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise CoalescingTimeout(f"Timed out after {timeout}s waiting for in-flight request")
+            except _LeaderCancelled:
+                # The leader's request went away; the first waiter to resume takes over the call
+                logger.debug(f"In-flight leader for {key} was cancelled; taking over")
+
+        future = loop.create_future()
+        self._calls[key] = future
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Waiters must not be cancelled with the leader's request
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved so a leader without waiters does not log it again
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            self._calls.pop(key, None)
+        return result, False
+
+    def stats(self) -> Dict[str, int]:
+        """Return coalescing counters."""
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+        }
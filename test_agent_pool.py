@@ -0,0 +1,204 @@
+"""
+Tests for the agent pool
+
+Covers pool keys, agent reuse within and across processes, thread leasing,
+rotation and retirement, reaping, and upgrading a registry created before
+thread sizes were tracked.
+
+Usage:
+    python -m pytest test_agent_pool.py
+"""
+
+import asyncio
+import itertools
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agent_pool import AgentPool, pool_key
+
+
+class ResourceNotFoundError(Exception):
+    """Stands in for azure.core's error of the same name, which the pool matches by name."""
+
+
+class AgentsClient:
+    """An in-memory agents client with the calls the pool makes."""
+
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.agents = {}
+        self.threads = set()
+        self.calls = []
+
+    async def create_agent(self):
+        self.calls.append("create_agent")
+        agent = SimpleNamespace(id=f"agent-{next(self.ids)}")
+        self.agents[agent.id] = agent
+        return agent
+
+    async def get_agent(self, agent_id):
+        self.calls.append("get_agent")
+        if agent_id not in self.agents:
+            raise ResourceNotFoundError(agent_id)
+        return self.agents[agent_id]
+
+    async def delete_agent(self, agent_id):
+        if agent_id not in self.agents:
+            raise ResourceNotFoundError(agent_id)
+        del self.agents[agent_id]
+
+    async def create_thread(self):
+        self.calls.append("create_thread")
+        thread = SimpleNamespace(id=f"thread-{next(self.ids)}")
+        self.threads.add(thread.id)
+        return thread
+
+    async def delete_thread(self, thread_id):
+        if thread_id not in self.threads:
+            raise ResourceNotFoundError(thread_id)
+        self.threads.remove(thread_id)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "pool.db")
+
+
+def make_pool(client, db_path, **kwargs):
+    return AgentPool(client, db_path=db_path, reap_interval=0, **kwargs)
+
+
+def test_pool_key_ignores_tool_order_and_instruction_whitespace():
+    key = pool_key("project", "gpt-4o", "Write copy.", ["code", "search"])
+    assert key == pool_key("project", "gpt-4o", "  Write copy.\n", ["search", "code"])
+    assert key != pool_key("project", "gpt-4o", "Write ads.", ["code", "search"])
+    assert key != pool_key("project", "gpt-4o-mini", "Write copy.", ["code", "search"])
+    assert key != pool_key("other", "gpt-4o", "Write copy.", ["code", "search"])
+
+
+def test_agent_is_created_once_per_key(db_path):
+    client = AgentsClient()
+    pool = make_pool(client, db_path)
+
+    async def main():
+        return await asyncio.gather(*[pool.get_agent("k", "gpt-4o", client.create_agent) for _ in range(5)])
+
+    agents = asyncio.run(main())
+    assert len({agent.id for agent in agents}) == 1
+    assert client.calls == ["create_agent"]
+    assert pool.stats()["agents_created"] == 1
+
+
+def test_agent_is_reused_by_a_later_process(db_path):
+    client = AgentsClient()
+    first = asyncio.run(make_pool(client, db_path).get_agent("k", "gpt-4o", client.create_agent))
+    pool = make_pool(client, db_path)
+    second = asyncio.run(pool.get_agent("k", "gpt-4o", client.create_agent))
+    assert second is first
+    assert client.calls == ["create_agent", "get_agent"]
+    assert pool.stats()["agents_reused"] == 1
+
+
+def test_deleted_agent_is_replaced(db_path):
+    client = AgentsClient()
+    first = asyncio.run(make_pool(client, db_path).get_agent("k", "gpt-4o", client.create_agent))
+    del client.agents[first.id]
+    second = asyncio.run(make_pool(client, db_path).get_agent("k", "gpt-4o", client.create_agent))
+    assert second.id != first.id
+    assert client.calls == ["create_agent", "get_agent", "create_agent"]
+
+
+def test_leased_thread_is_not_handed_out_twice(db_path):
+    client = AgentsClient()
+    pool = make_pool(client, db_path)
+
+    async def main():
+        first = await pool.lease_thread("k")
+        second = await pool.lease_thread("k")
+        pool.release_thread(first)
+        third = await pool.lease_thread("k")
+        fresh = await pool.lease_thread("k", fresh=True)
+        return first, second, third, fresh
+
+    first, second, third, fresh = asyncio.run(main())
+    assert first != second
+    assert third == first
+    assert fresh not in (first, second)
+    stats = pool.stats()
+    assert (stats["threads_created"], stats["threads_reused"], stats["leased_threads"]) == (3, 1, 3)
+
+
+def test_expired_lease_lapses(db_path):
+    client = AgentsClient()
+    pool = make_pool(client, db_path, lease_seconds=-1)
+
+    async def main():
+        return await pool.lease_thread("k"), await pool.lease_thread("k")
+
+    first, second = asyncio.run(main())
+    assert first == second
+
+
+def test_full_thread_is_rotated(db_path):
+    client = AgentsClient()
+    pool = make_pool(client, db_path, max_thread_messages=4)
+    thread_id = asyncio.run(pool.lease_thread("k"))
+    assert pool.record_messages(thread_id, 2, chars=100) is False
+    assert pool.record_messages(thread_id, 2, chars=50) is True
+    assert pool.thread_size(thread_id) == (4, 150)
+    pool.release_thread(thread_id)
+    assert asyncio.run(pool.lease_thread("k")) != thread_id
+    pool.retire_thread(thread_id)
+    assert pool.stats()["threads_rotated"] == 1
+
+
+def test_reap_deletes_retired_and_idle_resources(db_path):
+    client = AgentsClient()
+    pool = make_pool(client, db_path, agent_idle_seconds=3600)
+
+    async def main():
+        await pool.get_agent("k", "gpt-4o", client.create_agent)
+        retired = await pool.lease_thread("k")
+        leased = await pool.lease_thread("k")
+        pool.retire_thread(retired)
+        pool.release_thread(retired)
+        first = await pool.reap()
+        pool._execute("UPDATE agents SET last_used = ?", (time.time() - 7200,))
+        second = await pool.reap()
+        return retired, leased, first, second
+
+    retired, leased, first, second = asyncio.run(main())
+    assert first == {"threads": 1, "agents": 0}
+    assert second == {"threads": 0, "agents": 1}
+    assert client.threads == {leased}
+    assert client.agents == {}
+
+
+def test_reap_treats_missing_resources_as_deleted(db_path):
+    client = AgentsClient()
+    pool = make_pool(client, db_path)
+    thread_id = asyncio.run(pool.lease_thread("k"))
+    pool.retire_thread(thread_id)
+    pool.release_thread(thread_id)
+    client.threads.clear()
+    assert asyncio.run(pool.reap()) == {"threads": 1, "agents": 0}
+    assert pool.stats()["threads"] == 0
+
+
+def test_registry_without_chars_column_is_upgraded(db_path):
+    db = sqlite3.connect(db_path)
+    db.execute("CREATE TABLE threads (thread_id TEXT PRIMARY KEY, key TEXT NOT NULL, "
+               "messages INTEGER NOT NULL DEFAULT 0, leased_until REAL NOT NULL DEFAULT 0, "
+               "retired INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL)")
+    db.execute("INSERT INTO threads (thread_id, key, messages, last_used) VALUES ('thread-old', 'k', 3, ?)",
+               (time.time(),))
+    db.commit()
+    db.close()
+
+    pool = make_pool(AgentsClient(), db_path)
+    assert asyncio.run(pool.lease_thread("k")) == "thread-old"
+    assert pool.record_messages("thread-old", 2, chars=80) is False
+    assert pool.thread_size("thread-old") == (5, 80)
@@ -0,0 +1,94 @@
+"""
+Tests for the upstream circuit breaker
+
+Covers opening after consecutive failures, half-open probing after the
+recovery timeout, and closing or reopening on the probe's outcome.
+
+Usage:
+    python -m pytest test_circuit_breaker.py
+"""
+
+import time
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def rejected(breaker):
+    """Whether ``before_call`` rejects a call."""
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        return True
+    return False
+
+
+def open_breaker(recovery_timeout=0.05):
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=recovery_timeout)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure(RuntimeError("upstream down"))
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure(RuntimeError("upstream down"))
+    assert breaker.state == OPEN
+    stats = breaker.stats()
+    assert stats["times_opened"] == 1
+    assert stats["last_error"] == "upstream down"
+
+
+def test_open_circuit_rejects_calls():
+    breaker = open_breaker(recovery_timeout=60)
+    assert rejected(breaker)
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_half_open_admits_one_probe():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert not rejected(breaker)
+    assert rejected(breaker)
+
+
+def test_successful_probe_closes_the_circuit():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert not rejected(breaker)
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_released_probe_frees_its_slot():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert not rejected(breaker)
+
+
+def test_reset_closes_the_circuit():
+    breaker = open_breaker(recovery_timeout=60)
+    breaker.reset()
+    assert breaker.state == CLOSED
+    assert not rejected(breaker)
+
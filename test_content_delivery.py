@@ -0,0 +1,148 @@
+"""
+Tests for content downloads
+
+Covers ETag and If-Modified-Since revalidation (304), byte range parsing and
+partial responses (206/416), and precompressed sidecar selection.
+
+Usage:
+    python -m pytest test_content_delivery.py
+"""
+
+import gzip
+import tempfile
+from email.utils import formatdate
+from pathlib import Path
+
+from content_delivery import accepted_encodings, build_content_response, etag_matches, parse_range
+
+BODY = b"0123456789"
+SHA256 = "abc123"
+ETAG = f'"{SHA256}"'
+CREATED_AT = 1700000000.0
+
+
+class MemoryStore:
+    """The parts of ContentStore used by build_content_response, serving records held in memory."""
+
+    def __init__(self, sidecars=None):
+        self.sidecars = sidecars or {}
+
+    def read_record(self, record, offset=0, length=None):
+        data = record["data"]
+        return data[offset:] if length is None else data[offset:offset + length]
+
+    def sidecar_path(self, record, encoding):
+        return self.sidecars.get(encoding)
+
+
+def record(**extra):
+    return dict({"sha256": SHA256, "created_at": CREATED_AT, "mime": "text/plain", "size": len(BODY),
+                 "data": BODY}, **extra)
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-3", 10) == (0, 3)
+    assert parse_range("bytes=5-", 10) == (5, 9)
+    assert parse_range("bytes=-4", 10) == (6, 9)
+    assert parse_range("bytes=-40", 10) == (0, 9)
+    assert parse_range("bytes=8-100", 10) == (8, 9)
+    assert parse_range("Bytes=0-3", 10) == (0, 3)
+
+
+def test_parse_range_unsatisfiable():
+    assert parse_range("bytes=10-", 10) == (10, 10)
+    assert parse_range("bytes=10-12", 10) == (10, 10)
+    assert parse_range("bytes=-0", 10) == (10, 10)
+    assert parse_range("bytes=-5", 0) == (0, 0)
+
+
+def test_malformed_range_is_ignored():
+    assert parse_range("bytes=abc", 10) is None
+    assert parse_range("bytes=5-2", 10) is None
+    assert parse_range("bytes=15-12", 10) is None
+    assert parse_range("bytes=-", 10) is None
+    assert parse_range("bytes=1.5-3", 10) is None
+    assert parse_range("bytes=0-1,4-5", 10) is None
+    assert parse_range("items=0-1", 10) is None
+
+
+def test_etag_matches():
+    assert etag_matches(ETAG, ETAG)
+    assert etag_matches(f'"other", W/{ETAG}', ETAG)
+    assert etag_matches("*", ETAG)
+    assert not etag_matches('"other"', ETAG)
+
+
+def test_accepted_encodings_skip_zero_quality():
+    assert accepted_encodings("gzip, br;q=0, deflate;q=0.5") == ["gzip", "deflate"]
+    assert accepted_encodings(None) == []
+
+
+def test_full_response_carries_validators():
+    status, headers, body = build_content_response(record(), {}, MemoryStore())
+    assert (status, body) == (200, BODY)
+    assert headers["ETag"] == ETAG
+    assert headers["Last-Modified"] == formatdate(CREATED_AT, usegmt=True)
+    assert headers["Accept-Ranges"] == "bytes"
+
+
+def test_matching_etag_is_not_modified():
+    status, _, body = build_content_response(record(), {"If-None-Match": ETAG}, MemoryStore())
+    assert (status, body) == (304, b"")
+    status, _, _ = build_content_response(record(), {"If-None-Match": '"stale"'}, MemoryStore())
+    assert status == 200
+
+
+def test_if_modified_since():
+    headers = {"If-Modified-Since": formatdate(CREATED_AT, usegmt=True)}
+    assert build_content_response(record(), headers, MemoryStore())[0] == 304
+    headers = {"If-Modified-Since": formatdate(CREATED_AT - 60, usegmt=True)}
+    assert build_content_response(record(), headers, MemoryStore())[0] == 200
+    # If-None-Match takes precedence when both are sent
+    headers = {"If-None-Match": '"stale"', "If-Modified-Since": formatdate(CREATED_AT, usegmt=True)}
+    assert build_content_response(record(), headers, MemoryStore())[0] == 200
+
+
+def test_range_request_returns_partial_content():
+    status, headers, body = build_content_response(record(), {"Range": "bytes=2-5"}, MemoryStore())
+    assert (status, body) == (206, b"2345")
+    assert headers["Content-Range"] == "bytes 2-5/10"
+
+
+def test_unsatisfiable_range():
+    status, headers, body = build_content_response(record(), {"Range": "bytes=20-"}, MemoryStore())
+    assert (status, body) == (416, b"")
+    assert headers["Content-Range"] == "bytes */10"
+
+
+def test_malformed_range_serves_the_full_body():
+    for value in ("bytes=abc", "bytes=5-2", "bytes"):
+        status, headers, body = build_content_response(record(), {"Range": value}, MemoryStore())
+        assert (status, body) == (200, BODY)
+        assert "Content-Range" not in headers
+
+
+def test_stale_if_range_serves_the_full_body():
+    headers = {"Range": "bytes=2-5", "If-Range": ETAG}
+    assert build_content_response(record(), headers, MemoryStore())[0] == 206
+    headers = {"Range": "bytes=2-5", "If-Range": '"stale"'}
+    status, _, body = build_content_response(record(), headers, MemoryStore())
+    assert (status, body) == (200, BODY)
+
+
+def test_precompressed_sidecar_is_served_when_accepted():
+    with tempfile.TemporaryDirectory() as tmp:
+        sidecar = Path(tmp) / "content.txt.gz"
+        sidecar.write_bytes(gzip.compress(BODY))
+        store = MemoryStore({"gzip": sidecar})
+        status, headers, body = build_content_response(record(path="content.txt"), {"Accept-Encoding": "gzip"}, store)
+        assert status == 200
+        assert headers["Content-Encoding"] == "gzip"
+        assert headers["ETag"] == f'"{SHA256}-gzip"'
+        assert gzip.decompress(body) == BODY
+        # Ranges always refer to the identity body
+        headers = {"Accept-Encoding": "gzip", "Range": "bytes=0-1"}
+        status, headers, body = build_content_response(record(path="content.txt"), headers, store)
+        assert (status, body) == (206, b"01")
+        assert "Content-Encoding" not in headers
+
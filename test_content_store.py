@@ -0,0 +1,272 @@
+"""
+Tests for the content store
+
+Covers background writes with in-memory reads while pending, deduplication
+of identical bodies, precompressed sidecars, retrying then dropping writes
+that keep failing, the date/kind sharded layout, the cold tier, retention,
+and migration of legacy flat files.
+
+Usage:
+    python -m pytest test_content_store.py
+"""
+
+import gzip
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from content_store import COLD, HOT, SECONDS_PER_DAY, SIDECAR_MIN_BYTES, ContentStore
+
+
+@pytest.fixture
+def store():
+    content_store = ContentStore(tempfile.mkdtemp(), retry_delay=0)
+    yield content_store
+    content_store.close()
+
+
+def test_put_is_served_from_memory_then_from_disk(store, monkeypatch):
+    write_batch = store._write_batch
+    release = threading.Event()
+
+    def held_write_batch(batch, replace=True):
+        release.wait(5)
+        return write_batch(batch, replace)
+
+    monkeypatch.setattr(store, "_write_batch", held_write_batch)
+    record = store.put("post.md", "Launch day")
+    assert record["download_url"] == "/content/post.md"
+    assert record["mime"] == "text/markdown"
+    assert store.lookup("post.md")["data"] == b"Launch day"
+    assert store.stats()["pending_writes"] == 1
+
+    release.set()
+    assert store.flush(5)
+    stored = store.lookup("post.md")
+    assert "data" not in stored
+    assert stored["path"].read_bytes() == b"Launch day"
+    assert store.read("post.md") == b"Launch day"
+    assert store.stats()["pending_writes"] == 0
+
+
+def test_identical_bodies_share_a_blob(store):
+    store.put("a.txt", "same body")
+    store.put("b.txt", "same body")
+    store.put("c.txt", "other body")
+    assert store.flush(5)
+    stats = store.stats()
+    assert stats["files"] == 3
+    assert stats["blobs"] == 2
+    assert stats["deduplicated"] == 1
+    assert store.lookup("a.txt")["path"] == store.lookup("b.txt")["path"]
+
+
+def test_unknown_filename(store):
+    assert store.lookup("missing.txt") is None
+    assert store.read("missing.txt") is None
+    assert store.write_error("missing.txt") is None
+
+
+def test_large_bodies_get_a_gzip_sidecar(store):
+    body = b"marketing " * SIDECAR_MIN_BYTES
+    store.put("long.txt", body)
+    assert store.flush(5)
+    record = store.lookup("long.txt")
+    assert gzip.decompress(store.sidecar_path(record, "gzip").read_bytes()) == body
+    store.put("short.txt", "tiny")
+    assert store.flush(5)
+    assert store.sidecar_path(store.lookup("short.txt"), "gzip") is None
+
+
+def test_failed_write_is_retried(store, monkeypatch):
+    write = store._atomic_write
+    failures = []
+
+    def flaky_write(path, data):
+        if not failures:
+            failures.append(path)
+            raise OSError("disk full")
+        write(path, data)
+
+    monkeypatch.setattr(store, "_atomic_write", flaky_write)
+    store.put("post.md", "Launch day")
+    assert store.flush(5)
+    assert store.read("post.md") == b"Launch day"
+    stats = store.stats()
+    assert stats["write_errors"] == 1
+    assert stats["write_retried"] == 1
+    assert stats["writes_failed"] == 0
+
+
+def test_write_failing_every_retry_is_dropped(store, monkeypatch):
+    def failing_write(path, data):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_atomic_write", failing_write)
+    store.put("post.md", "Launch day")
+    assert store.flush(5)
+    assert store.lookup("post.md") is None
+    assert store.write_error("post.md") == "disk full"
+    stats = store.stats()
+    assert stats["pending_writes"] == 0
+    assert stats["write_errors"] == store.write_retries + 1
+    assert stats["writes_failed"] == 1
+
+    monkeypatch.undo()
+    store.put("post.md", "Launch day, again")
+    assert store.write_error("post.md") is None
+    assert store.flush(5)
+    assert store.read("post.md") == b"Launch day, again"
+
+
+def test_store_files_live_under_the_root():
+    root = tempfile.mkdtemp()
+    store = ContentStore(root)
+    try:
+        store.put("post.md", "Launch day")
+        assert store.flush(5)
+        assert os.listdir(root) == [".store"]
+        assert store.lookup("post.md")["path"].is_relative_to(store.store_dir)
+    finally:
+        store.close()
+
+
+def age(store, filename, days):
+    """Backdate a stored file and its blob by ``days``."""
+    created_at = time.time() - days * SECONDS_PER_DAY
+    with store._lock:
+        sha256, = store._db.execute("SELECT sha256 FROM files WHERE filename = ?", (filename,)).fetchone()
+        store._db.execute("UPDATE files SET created_at = ? WHERE filename = ?", (created_at, filename))
+        store._db.execute("UPDATE blobs SET created_at = ? WHERE sha256 = ?", (created_at, sha256))
+        store._db.commit()
+
+
+def test_blobs_are_sharded_by_date_and_kind(store):
+    store.put("post.md", "Launch day", kind="export")
+    assert store.flush(5)
+    path = store.lookup("post.md")["path"]
+    day = datetime.now().strftime("%Y/%m/%d")
+    assert path.relative_to(store.store_dir).as_posix().startswith(f"blobs/{day}/export/")
+
+
+def test_old_blobs_move_to_the_cold_tier(store):
+    store.compress_after_days = 7
+    body = b"marketing " * SIDECAR_MIN_BYTES
+    store.put("old.txt", body)
+    store.put("new.txt", "fresh")
+    assert store.flush(5)
+    age(store, "old.txt", 10)
+    assert store.sweep(wait=True, timeout=5)
+    old = store.lookup("old.txt")
+    assert old["tier"] == COLD
+    assert not old["path"].exists()
+    assert store.read("old.txt") == body
+    assert store.read_record(old, 5, 10) == body[5:15]
+    assert store.lookup("new.txt")["tier"] == HOT
+    assert store.stats()["cold_blobs"] == 1
+
+
+def test_retention_expires_old_files_and_deletes_their_blobs(store):
+    store.retention_days = 30
+    store.put("old.txt", "old body")
+    store.put("new.txt", "new body")
+    assert store.flush(5)
+    old_path = store.lookup("old.txt")["path"]
+    age(store, "old.txt", 31)
+    assert store.sweep(wait=True, timeout=5)
+    assert store.lookup("old.txt") is None
+    assert not old_path.exists()
+    assert store.read("new.txt") == b"new body"
+    stats = store.stats()
+    assert (stats["expired"], stats["blobs_deleted"]) == (1, 1)
+
+
+def test_size_limit_evicts_the_oldest_files(store):
+    store.max_total_bytes = 26
+    for i in range(3):
+        store.put(f"{i}.txt", f"body number {i}")  # 13 bytes each
+        assert store.flush(5)
+        age(store, f"{i}.txt", 3 - i)
+    assert store.sweep(wait=True, timeout=5)
+    assert store.lookup("0.txt") is None
+    assert store.lookup("1.txt") is not None
+    assert store.lookup("2.txt") is not None
+    assert store.stats()["stored_bytes"] <= 26
+
+
+def test_shared_blob_outlives_an_expired_file(store):
+    store.retention_days = 30
+    store.put("old.txt", "same body")
+    assert store.flush(5)
+    age(store, "old.txt", 31)
+    store.put("new.txt", "same body")
+    assert store.sweep(wait=True, timeout=5)
+    assert store.lookup("old.txt") is None
+    assert store.read("new.txt") == b"same body"
+
+
+def test_legacy_flat_files_are_migrated(store):
+    legacy = store.root / "post.md"
+    legacy.write_text("Legacy post")
+    os.utime(legacy, (1700000000, 1700000000))
+    assert store.sweep(wait=True, timeout=5)
+    assert not legacy.exists()
+    record = store.lookup("post.md")
+    assert record["kind"] == "legacy"
+    assert record["created_at"] == 1700000000
+    assert store.read("post.md") == b"Legacy post"
+    assert store.stats()["migrated"] == 1
+
+
+def test_legacy_file_does_not_replace_a_newer_store_write(store):
+    store.put("post.md", "New post")
+    assert store.flush(5)
+    (store.root / "post.md").write_text("Legacy post")
+    assert store.sweep(wait=True, timeout=5)
+    assert store.read("post.md") == b"New post"
+    renamed = [name for name, in store._db.execute("SELECT filename FROM files WHERE kind = 'legacy'")]
+    assert len(renamed) == 1 and renamed[0].startswith("post.legacy-") and renamed[0].endswith(".md")
+    assert store.read(renamed[0]) == b"Legacy post"
+
+
+def test_unreadable_legacy_file_is_skipped(store, monkeypatch):
+    (store.root / "stuck.md").write_text("Stuck")
+    (store.root / "post.md").write_text("Legacy post")
+    read_bytes = Path.read_bytes
+
+    def failing_read_bytes(path):
+        if path.name == "stuck.md":
+            raise PermissionError("denied")
+        return read_bytes(path)
+
+    monkeypatch.setattr(Path, "read_bytes", failing_read_bytes)
+    assert store.sweep(wait=True, timeout=5)
+    assert store.sweep(wait=True, timeout=5)
+    assert store.read("post.md") == b"Legacy post"
+    assert store.lookup("stuck.md") is None
+    stats = store.stats()
+    assert (stats["migrated"], stats["legacy_skipped"]) == (1, 1)
+
+
+def test_index_without_tier_column_is_upgraded():
+    root = tempfile.mkdtemp()
+    store_dir = os.path.join(root, ".store")
+    os.makedirs(store_dir)
+    db = sqlite3.connect(os.path.join(store_dir, "index.db"))
+    db.execute("CREATE TABLE blobs (sha256 TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, "
+               "created_at REAL NOT NULL)")
+    db.commit()
+    db.close()
+    store = ContentStore(root)
+    try:
+        store.put("post.md", "Launch day")
+        assert store.flush(5)
+        assert store.lookup("post.md")["tier"] == HOT
+    finally:
+        store.close()
@@ -0,0 +1,73 @@
+"""
+Tests for the conversation store
+
+Covers token-budget trimming of stored turns and prompts, and LRU eviction of
+sessions.
+
+Usage:
+    python -m pytest test_conversation_store.py
+"""
+
+from conversation_store import MESSAGE_OVERHEAD_TOKENS, ConversationStore, estimate_tokens
+
+
+def message(role, tokens, text=""):
+    """A message starting with ``text`` whose estimated size is exactly ``tokens`` tokens."""
+    return {"role": role, "content": text.ljust((tokens - MESSAGE_OVERHEAD_TOKENS) * 4, "x")}
+
+
+def test_estimate_tokens_rounds_up():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens(None) == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_turns_within_budget_are_kept():
+    store = ConversationStore("s" * 36, max_tokens_per_session=100)  # system prompt: 13 tokens
+    store.append_turn("a", message("user", 10), message("assistant", 20))
+    store.append_turn("a", message("user", 10), message("assistant", 20))
+    assert len(store.get("a")) == 5
+    assert store.stats()["dropped_turns"] == 0
+
+
+def test_oldest_turns_are_dropped_past_the_budget():
+    store = ConversationStore("s" * 36, max_tokens_per_session=100)
+    turns = [(message("user", 10, f"turn {i}"), message("assistant", 40, f"reply {i}")) for i in range(3)]
+    for user, assistant in turns:
+        store.append_turn("a", user, assistant)
+    messages = store.get("a")
+    assert messages[0] == store.system_message
+    assert messages[1:] == [turns[2][0], turns[2][1]]
+    assert store.stats()["dropped_turns"] == 2
+
+
+def test_prompt_includes_newest_turns_that_fit():
+    store = ConversationStore("s" * 36, max_tokens_per_session=100)
+    first = (message("user", 10, "first"), message("assistant", 20, "first"))
+    second = (message("user", 10, "second"), message("assistant", 20, "second"))
+    store.append_turn("a", *first)
+    store.append_turn("a", *second)
+    new_message = message("user", 30)
+    messages = store.build_messages("a", new_message)
+    assert messages == [store.system_message, second[0], second[1], new_message]
+    assert store.stats()["prompt_tokens_saved"] == 30
+
+
+def test_system_prompt_and_new_message_are_always_sent():
+    store = ConversationStore("s" * 36, max_tokens_per_session=20)
+    new_message = message("user", 50)
+    assert store.build_messages("a", new_message) == [store.system_message, new_message]
+
+
+def test_least_recently_used_session_is_evicted():
+    store = ConversationStore("system", max_sessions=2)
+    store.append_turn("a", message("user", 5), message("assistant", 5))
+    store.append_turn("b", message("user", 5), message("assistant", 5))
+    store.build_messages("a", message("user", 5))
+    store.append_turn("c", message("user", 5), message("assistant", 5))
+    assert len(store) == 2
+    assert len(store.get("b")) == 1
+    assert len(store.get("a")) == 3
+    assert store.stats()["evictions"] == 1
+
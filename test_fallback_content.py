@@ -0,0 +1,160 @@
+"""
+Tests for fallback sample content
+
+Checks that the compiled templates render exactly what the previous
+implementation built, for every content type, length and tone the web app
+offers, plus unknown and missing values.
+
+Usage:
+    python -m pytest test_fallback_content.py
+"""
+
+from fallback_content import CompiledTemplate, FallbackContentEngine, render_fallback_content
+
+CONTENT_TYPES = ["Social Media Post", "social", "Tweet", "Email/Newsletter", "email campaign", "Newsletter",
+                 "Blog Post", "article", "Press Release", "Ad Copy", ""]
+LENGTHS = ["short", "medium", "long", "Long", "extended", "", None]
+TONES = ["friendly", "Professional", "playful tone", ""]
+AUDIENCES = ["small business owners", "Developers {who} code", "Ünïcode & <html>"]
+
+
+def baseline_sample_content(content_type, audience, tone, length, prompt):
+    """``generate_sample_content`` as it was before templates were compiled, kept verbatim."""
+    # Base content templates by type and length
+    content_templates = {
+        "social": {
+            "short": f"🚀 Attention {audience}! Try our innovative products. #{tone.capitalize()}",
+            "medium": f"🚀 Attention {audience}! Our innovative products are transforming the industry with features you won't find anywhere else. Experience the difference today! #{tone.capitalize()} #LeadingEdge",
+            "long": f"🚀 Attention {audience}! Our innovative products are transforming the industry with features you won't find anywhere else. Experience the difference today!\n\nOur cutting-edge solutions are designed specifically for {audience}, with careful attention to your unique needs. We've spent years perfecting our approach, and the results speak for themselves.\n\n#{tone.capitalize()} #LeadingEdge #CustomerSuccess #QualityMatters"
+        },
+        "email": {
+            "short": f"Subject: Special Offer for {audience}\n\nHello,\n\nDon't miss our latest solutions designed for {audience}. Visit our website today!\n\nRegards,\nThe Marketing Team",
+            "medium": f"Subject: Discover How Our Products Can Transform Your Experience\n\nHello {audience},\n\nAre you ready to experience our innovative solutions?\n\nOur latest products combine cutting-edge technology with intuitive design to create a seamless experience.\n\nReady to elevate your experience? Visit our website for an exclusive limited-time offer.\n\nWarm regards,\nThe Marketing Team",
+            "long": f"""Subject: Discover How Our Products Can Transform Your Experience
+
+Hello {audience},
+
+Are you ready to experience our innovative solutions?
+
+Our latest products combine cutting-edge technology with intuitive design to create a seamless experience. From advanced features that truly understand your needs to efficiency improvements that save you time and money, our offerings adapt to your lifestyle.
+
+Key benefits include:
+• Innovative technology that anticipates your needs
+• Seamless integration with your existing systems
+• Cost savings of up to 30%
+• Enhanced performance with real-time monitoring
+
+Join thousands of satisfied customers who have already transformed their experience.
+
+Ready to elevate your experience? Visit our website for an exclusive limited-time offer.
+
+Warm regards,
+The Marketing Team"""
+        },
+        "blog": {
+            "short": f"# Solutions for {audience}\n\nOur products help {audience} solve common problems efficiently. Learn how we can help you today.",
+            "medium": f"# 3 Ways Our Solutions Help {audience}\n\nIn today's fast-paced world, {audience} need efficient solutions. Here's how our products can help:\n\n1. Save time with automation\n2. Reduce costs with smart technology\n3. Improve results with data-driven insights",
+            "long": f"""# 5 Ways Our Solutions Are Transforming the Industry
+
+In today's fast-paced world, {audience} are seeking innovative solutions to everyday challenges. The good news? Our offerings have never been more exciting or accessible.
+
+## The Evolution of Excellence
+
+Recent studies show that over 70% of consumers are actively searching for solutions that provide meaningful improvements. This shift has driven us to rethink our approach from the ground up.
+
+## How Our Solutions Make a Difference
+
+### 1. Efficiency That Pays For Itself
+
+Our innovative products don't just improve your experience—they improve your bottom line. Our customers report saving 25% more time and resources compared to conventional solutions.
+
+### 2. Superior Materials, Superior Performance
+
+We use only the highest quality components that outperform conventional alternatives in durability and functionality. This commitment to quality ensures a longer lifespan and better performance.
+
+### 3. Intelligent Design Reduces Waste
+
+Our design philosophy emphasizes longevity, repairability, and sustainability. We proudly offer lifetime support on our products, with modular components that can be easily replaced.
+
+### 4. Enhanced User Experience
+
+Our products contain fewer complications and a more intuitive interface, leading to better user satisfaction and fewer support issues. This creates a better experience for everyone.
+
+### 5. Innovation and Practicality Join Forces
+
+Our technology works hand-in-hand with practical needs. From intelligent interfaces that learn your preferences to automated features that save time, our innovations help maximize your efficiency.
+
+## Making the Transition
+
+Transforming your experience doesn't require a complete overhaul overnight. Start by exploring our solutions that address your most pressing needs, where the impact will be greatest.
+
+Remember that every improvement contributes to a larger collective benefit. Your choice today helps create a better tomorrow."""
+        }
+    }
+
+    # Get the appropriate template based on content type and length
+    content_type_key = "social"  # default
+    if content_type.lower() in ["social media", "social media post", "tweet", "social"]:
+        content_type_key = "social"
+    elif content_type.lower() in ["email", "email/newsletter", "newsletter", "email campaign"]:
+        content_type_key = "email"
+    elif content_type.lower() in ["blog post", "article", "blog"]:
+        content_type_key = "blog"
+
+    # Get the appropriate length (default to medium if not found)
+    length = length.lower() if length else "medium"
+    if length not in ["short", "medium", "long"]:
+        length = "medium"
+
+    # Return the content based on type and length
+    if content_type_key in content_templates and length in content_templates[content_type_key]:
+        return content_templates[content_type_key][length]
+
+    # Fallback for other content types
+    return f"""Here's a sample {content_type} for {audience} with a {tone} tone, {length} length.
+
+{prompt}
+
+This would be custom-generated marketing content that highlights the benefits of our product while appealing directly to {audience} using language and references that resonate with them."""
+
+
+def test_output_matches_previous_implementation():
+    for content_type in CONTENT_TYPES:
+        for length in LENGTHS:
+            for tone in TONES:
+                for audience in AUDIENCES:
+                    expected = baseline_sample_content(content_type, audience, tone, length, "prompt")
+                    assert render_fallback_content(content_type, audience, tone, length) == expected, \
+                        (content_type, length, tone, audience)
+
+
+def test_hashtag_overrides_tone():
+    content = render_fallback_content("Social Media Post", "teams", "friendly", "short", hashtag="Innovation")
+    assert content == baseline_sample_content("Social Media Post", "teams", "innovation", "short", "prompt")
+
+
+def test_values_are_inserted_verbatim():
+    template = CompiledTemplate("Hello {audience}, #{hashtag}")
+    assert template.segments == (("Hello ", "audience"), (", #", "hashtag"))
+    assert template.render(audience="{hashtag}", hashtag="{0.__class__}", unused="x") == "Hello {hashtag}, #{0.__class__}"
+
+
+def test_escaped_braces_are_literal_text():
+    template = CompiledTemplate("{{audience}} is {audience}}}")
+    assert template.render(audience="you") == "{audience} is you}"
+
+
+def test_unsupported_fields_are_rejected():
+    for template in ("{0}", "{audience!r}", "{audience:>10}", "{audience.upper}", "{audience[0]}"):
+        try:
+            CompiledTemplate(template)
+            assert False, f"expected ValueError for {template}"
+        except ValueError:
+            pass
+
+
+def test_engine_falls_back_to_default_content_type():
+    engine = FallbackContentEngine({"social": {"medium": "social {audience}"}, "email": {"medium": "email {audience}"}})
+    assert engine.key("Press Release", None) == ("social", "medium")
+    assert engine.render("Email", "you", "friendly", "medium") == "email you"
+
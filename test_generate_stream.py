@@ -0,0 +1,167 @@
+"""
+Tests for the /generate/stream Server-Sent Events endpoint
+
+Drives the Flask and ASGI apps with an in-memory stand-in for the Azure OpenAI
+client and checks the delta/done events, the sample content fallback, broken
+streams and client disconnects.
+
+Usage:
+    python -m pytest test_generate_stream.py
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import app
+import asgi_app
+
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=None)])
+
+
+class UpstreamStream:
+    """A streamed completion yielding ``tokens``, optionally failing after ``fail_after`` of them."""
+
+    def __init__(self, tokens, fail_after=None):
+        self.tokens = tokens
+        self.fail_after = fail_after
+        self.closed = False
+
+    def __iter__(self):
+        yield SimpleNamespace(choices=[])
+        for index, token in enumerate(self.tokens):
+            if index == self.fail_after:
+                raise RuntimeError("connection reset")
+            yield chunk(token)
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncUpstreamStream(UpstreamStream):
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for item in UpstreamStream.__iter__(self):
+            await asyncio.sleep(0)
+            yield item
+
+    async def close(self):
+        self.closed = True
+
+
+class UpstreamClient:
+    """Stands in for AzureOpenAI, returning ``stream_factory()`` for every streamed completion."""
+
+    def __init__(self, stream_factory=None, error=None):
+        self.chat = SimpleNamespace(completions=self)
+        self.stream_factory = stream_factory
+        self.error = error
+        self.streams = []
+        self.calls = []
+
+    def with_options(self, **options):
+        return self
+
+    def create(self, **params):
+        self.calls.append(params)
+        if self.error is not None:
+            raise self.error
+        stream = self.stream_factory()
+        self.streams.append(stream)
+        return stream
+
+
+class AsyncUpstreamClient(UpstreamClient):
+
+    async def create(self, **params):
+        return UpstreamClient.create(self, **params)
+
+
+def parse_events(body):
+    """Return the (event, data) pairs of an SSE response body."""
+    events = []
+    for message in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def post_stream(prompt, **fields):
+    form = dict({"content_type": "Blog Post", "prompt": prompt, "length": "short", "cache": "false"}, **fields)
+    response = app.app.test_client().post("/generate/stream", data=form)
+    assert response.mimetype == "text/event-stream"
+    return parse_events(response.get_data(as_text=True))
+
+
+def setup_function(function):
+    app.circuit_breaker.reset()
+    app.generation_cache.clear()
+
+
+def test_stream_sends_deltas_then_done():
+    app.client = UpstreamClient(lambda: UpstreamStream(["Hello", " world"]))
+    events = post_stream("deltas then done")
+    assert events[:2] == [("delta", {"content": "Hello"}), ("delta", {"content": " world"})]
+    event, data = events[2]
+    assert event == "done"
+    assert data["content"] == "Hello world"
+    assert data["metadata"]["generation_mode"] == "azure_openai_stream"
+    assert app.client.calls[0]["stream"] is True
+    assert app.client.streams[0].closed
+
+
+def test_streamed_generation_is_cached():
+    app.client = UpstreamClient(lambda: UpstreamStream(["Cached", " once"]))
+    post_stream("cache me", cache="true")
+    events = post_stream("cache me", cache="true")
+    assert len(app.client.calls) == 1
+    assert events[0] == ("delta", {"content": "Cached once"})
+    assert events[1][1]["metadata"]["generation_mode"] == "cache"
+
+
+def test_failure_before_first_token_falls_back_to_sample_content():
+    app.client = UpstreamClient(error=RuntimeError("upstream down"))
+    events = post_stream("fallback")
+    assert [event for event, _ in events] == ["delta", "done"]
+    assert events[1][1]["metadata"]["generation_mode"] == "sample"
+    assert events[1][1]["metadata"]["fallback_reason"] == "upstream down"
+    assert events[0][1]["content"] == events[1][1]["content"]
+
+
+def test_broken_stream_keeps_partial_content_and_spares_the_breaker():
+    failures = app.circuit_breaker.stats()["failures"]
+    app.client = UpstreamClient(lambda: UpstreamStream(["Partial", " text", " lost"], fail_after=2))
+    events = post_stream("broken stream")
+    assert [event for event, _ in events] == ["delta", "delta", "error"]
+    assert events[2][1]["content"] == "Partial text"
+    assert app.client.streams[0].closed
+    assert app.circuit_breaker.stats()["failures"] == failures
+
+
+def test_client_disconnect_closes_the_upstream_stream():
+    app.client = UpstreamClient(lambda: UpstreamStream(["one", " two", " three"]))
+    response = app.app.test_client().post("/generate/stream", buffered=False, data={
+        "content_type": "Blog Post", "prompt": "disconnect", "cache": "false"})
+    next(iter(response.response))
+    response.close()
+    assert app.client.streams[0].closed
+
+
+def test_asgi_stream_matches_flask_events():
+    asgi_app.circuit_breaker.reset()
+    asgi_app.async_client = AsyncUpstreamClient(lambda: AsyncUpstreamStream(["Hello", " async"]))
+
+    async def post():
+        response = await asgi_app.app.test_client().post("/generate/stream", form={
+            "content_type": "Blog Post", "prompt": "asgi stream", "cache": "false"})
+        return (await response.get_data()).decode()
+
+    events = parse_events(asyncio.run(post()))
+    assert [event for event, _ in events] == ["delta", "delta", "done"]
+    assert events[2][1]["content"] == "Hello async"
+    assert asgi_app.async_client.streams[0].closed
@@ -0,0 +1,81 @@
+"""
+Tests for the generation budget
+
+Covers content type and length normalization, per-bucket max_tokens and
+stop sequences, context window clipping, tuning from observed usage and
+raising limits after truncation.
+
+Usage:
+    python -m pytest test_generation_budget.py
+"""
+
+from generation_budget import GenerationBudget, estimate_prompt_tokens, normalize_content_type, normalize_length
+
+
+def messages(prompt_tokens):
+    """A one-message prompt estimated at ``prompt_tokens`` tokens."""
+    return [{"role": "user", "content": "x" * ((prompt_tokens - 4) * 4)}]
+
+
+def test_normalization():
+    assert normalize_content_type(" Social Media Post ") == "social"
+    assert normalize_content_type("Email/Newsletter") == "email"
+    assert normalize_content_type("Press Release") == "press"
+    assert normalize_content_type("Haiku") == "other"
+    assert normalize_content_type(None) == "other"
+    assert normalize_length("LONG") == "long"
+    assert normalize_length("extended") == "medium"
+    assert normalize_length(None) == "medium"
+
+
+def test_estimate_prompt_tokens():
+    assert estimate_prompt_tokens(messages(10) + messages(20)) == 30
+
+
+def test_plan_uses_bucket_defaults():
+    budget = GenerationBudget()
+    plan = budget.plan("Tweet", "short", messages(50))
+    assert plan == {"max_tokens": 120, "stop": ["\n\n\n\n"], "prompt_tokens_estimate": 50, "bucket": "social/short"}
+    plan = budget.plan("Blog Post", "long", messages(50))
+    assert (plan["max_tokens"], plan["stop"], plan["bucket"]) == (2200, None, "blog/long")
+
+
+def test_plan_respects_ceiling_and_context_window():
+    assert GenerationBudget(max_tokens_ceiling=1000).plan("blog", "long", messages(10))["max_tokens"] == 1000
+    budget = GenerationBudget(context_window=1000)
+    assert budget.plan("blog", "long", messages(400))["max_tokens"] == 600
+    assert budget.plan("blog", "long", messages(990))["max_tokens"] == budget.min_tokens
+
+
+def test_usage_tunes_bucket_to_observed_p95():
+    budget = GenerationBudget(min_samples=10, headroom=1.25)
+    for tokens in range(10, 110, 10):
+        assert budget.plan("email", "long", messages(10))["max_tokens"] == 1000
+        budget.record_usage("email", "long", tokens)
+    # p95 of 10..100 is 100, plus 25% headroom
+    assert budget.plan("Newsletter", "long", messages(10))["max_tokens"] == 125
+    assert budget.stats()["email/long"]["samples"] == 10
+
+
+def test_truncation_raises_the_limit():
+    budget = GenerationBudget()
+    budget.record_usage("social", "short", 120, finish_reason="length")
+    assert budget.plan("social", "short", messages(10))["max_tokens"] == 180
+    assert budget.stats()["social/short"]["truncations"] == 1
+
+
+def test_usage_estimated_from_text_when_tokens_are_unknown():
+    budget = GenerationBudget(min_samples=1, headroom=1.0)
+    budget.record_usage("ad", "short", None, completion_text="x" * 400)
+    assert budget.plan("ad", "short", messages(10))["max_tokens"] == 100
+
+
+def test_expand_grows_within_ceiling_and_context():
+    budget = GenerationBudget(max_tokens_ceiling=1000, context_window=2000)
+    plan = budget.plan("social", "short", messages(10))
+    assert budget.expand(plan)["max_tokens"] == 180
+    assert budget.expand(dict(plan, max_tokens=900))["max_tokens"] == 1000
+    assert budget.expand(dict(plan, max_tokens=900, prompt_tokens_estimate=1050))["max_tokens"] == 950
+    # Never shrinks, and the bucket itself is unchanged
+    assert budget.expand(dict(plan, max_tokens=900, prompt_tokens_estimate=1990))["max_tokens"] == 900
+    assert budget.plan("social", "short", messages(10))["max_tokens"] == 120
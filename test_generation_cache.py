@@ -0,0 +1,84 @@
+"""
+Tests for the generation cache
+
+Covers cache key normalization, TTL expiry, LRU eviction by entry count and
+size, and persistence across cache instances.
+
+Usage:
+    python -m pytest test_generation_cache.py
+"""
+
+import os
+import tempfile
+import time
+
+from generation_cache import GenerationCache, make_cache_key
+
+
+def test_cache_key_ignores_case_and_whitespace():
+    key = make_cache_key("gpt-4o", "Blog Post", "Developers", "Friendly", "short", "Launch  our\nnew API ")
+    assert key == make_cache_key("gpt-4o", "blog post ", " developers", "friendly", "SHORT", "launch our new api")
+
+
+def test_cache_key_depends_on_every_field():
+    base = ("gpt-4o", "Blog Post", "Developers", "Friendly", "short", "Launch our new API")
+    keys = {make_cache_key(*base)}
+    for index, value in enumerate(("gpt-4o-mini", "Email", "Students", "Formal", "long", "Launch our old API")):
+        changed = list(base)
+        changed[index] = value
+        keys.add(make_cache_key(*changed))
+    assert len(keys) == 7
+
+
+def test_hit_and_miss_counters():
+    cache = GenerationCache(max_entries=10)
+    assert cache.get("a") is None
+    cache.put("a", "content", usage={"total_tokens": 42}, generation_time=1.5)
+    entry = cache.get("a")
+    assert entry["content"] == "content"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["tokens_saved"]) == (1, 1, 42)
+
+
+def test_expired_entries_are_not_returned():
+    cache = GenerationCache(ttl_seconds=0.05)
+    cache.put("a", "content")
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = GenerationCache(max_entries=2)
+    cache.put("a", "first")
+    cache.put("b", "second")
+    cache.get("a")
+    cache.put("c", "third")
+    assert cache.get("b") is None
+    assert cache.get("a")["content"] == "first"
+    assert cache.get("c")["content"] == "third"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_and_skips_oversized_entries():
+    cache = GenerationCache(max_entries=10, max_bytes=10)
+    cache.put("a", "12345")
+    cache.put("b", "67890")
+    cache.put("c", "abc")
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+    cache.put("big", "x" * 11)
+    assert cache.get("big") is None
+
+
+def test_entries_persist_across_instances():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cache.db")
+        GenerationCache(db_path=db_path).put("a", "persisted", usage={"total_tokens": 7})
+        entry = GenerationCache(db_path=db_path).get("a")
+        assert entry["content"] == "persisted"
+        assert entry["usage"] == {"total_tokens": 7}
+        assert GenerationCache(db_path=db_path, ttl_seconds=0).get("a") is None
+
@@ -0,0 +1,161 @@
+"""
+Tests for the shared generation service
+
+Covers importing the shared modules without side effects, the generation
+steps both apps drive (single, variants and streamed), batch request parsing,
+SSE formatting and the connectivity probe state.
+
+Usage:
+    python -m pytest test_generation_service.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import generation_service
+from generation_budget import GenerationBudget
+from generation_cache import GenerationCache
+from single_flight import SingleFlight
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+MESSAGES = [{"role": "user", "content": "Write about our launch"}]
+
+
+@pytest.fixture(autouse=True)
+def fresh_components(monkeypatch):
+    monkeypatch.setattr(generation_service, "generation_cache", GenerationCache())
+    monkeypatch.setattr(generation_service, "generation_budget", GenerationBudget())
+
+
+def completion(*texts, usage=(50, 20)):
+    choices = [SimpleNamespace(message=SimpleNamespace(content=text), finish_reason="stop", index=index)
+               for index, text in enumerate(texts)]
+    return SimpleNamespace(choices=choices,
+                           usage=SimpleNamespace(prompt_tokens=usage[0], completion_tokens=usage[1],
+                                                 total_tokens=sum(usage)))
+
+
+def chunk(text, finish_reason=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=finish_reason)])
+
+
+def test_importing_the_service_and_asgi_app_has_no_side_effects(tmp_path):
+    script = (
+        "import sys, threading, generation_service, content_library\n"
+        "assert threading.active_count() == 1, threading.enumerate()\n"
+        "import asgi_app\n"
+        "assert 'app' not in sys.modules\n"
+        "assert asgi_app.connectivity_probe.state()['status'] == 'pending'\n"
+    )
+    env = dict(os.environ, PYTHONPATH=ROOT, STARTUP_PROBE_ENABLED="true", CONTENT_DIR=str(tmp_path / "content"))
+    subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, check=True, capture_output=True)
+
+
+def test_generation_result_is_cached():
+    generation = generation_service.Generation(MESSAGES, "Blog Post", "short", cache_key="key")
+    params = generation.call_params()
+    assert params["deployment"] == generation_service.AZURE_OPENAI_DEPLOYMENT
+    assert params["max_tokens"] == 500
+    assert not generation.record_response(completion("A" * 60), 0.2)
+    result = generation.result()
+    assert result["content"] == "A" * 60
+    assert result["usage"] == {"prompt_tokens": 50, "completion_tokens": 20, "total_tokens": 70}
+    assert result["budget"]["bucket"] == "blog/short"
+    assert generation_service.generation_cache.get("key")["content"] == "A" * 60
+
+
+def test_variants_reuse_cached_alternatives():
+    first = generation_service.VariantsGeneration(MESSAGES, "Email", "short", 2, cache_key="key")
+    assert first.missing == [0, 1]
+    assert first.call_params()["n"] == 2
+    first.record_response(completion("one", "two"), 0.1)
+    assert [variant["content"] for variant in first.result()["variants"]] == ["one", "two"]
+
+    second = generation_service.VariantsGeneration(MESSAGES, "Email", "short", 3, cache_key="key")
+    assert second.missing == [2]
+    assert second.call_params()["n"] == 1
+    second.record_response(completion("three"), 0.1)
+    variants = second.result()["variants"]
+    assert [(variant["index"], variant["content"], variant["cached"]) for variant in variants] == [
+        (0, "one", True), (1, "two", True), (2, "three", False)]
+
+
+def test_split_completion_tokens_sums_to_the_total():
+    shares = generation_service.split_completion_tokens(["a" * 40, "b" * 120], 41)
+    assert sum(shares) == 41
+    assert shares[0] < shares[1]
+
+
+def test_stream_generation_collects_deltas():
+    generation = generation_service.StreamGeneration(MESSAGES, "Tweet", "short")
+    assert generation.call_params()["stream"] is True
+    assert generation.add_chunk(SimpleNamespace(choices=[])) is None
+    assert generation.add_chunk(chunk("Hello")) == "Hello"
+    assert generation.add_chunk(chunk(None)) is None
+    assert generation.add_chunk(chunk(" world", finish_reason="stop")) == " world"
+    metadata = generation.finish("azure_openai_stream", cache_key="key")
+    assert generation.content == "Hello world"
+    assert metadata["budget"]["finish_reason"] == "stop"
+    assert generation_service.generation_cache.get("key")["content"] == "Hello world"
+
+
+def test_parse_batch_request():
+    items, concurrency = generation_service.parse_batch_request({"items": [{}, {}, {}], "max_concurrency": 2})
+    assert (len(items), concurrency) == (3, 2)
+    assert generation_service.parse_batch_request([{}])[1] == 1
+    for payload in (None, {}, {"items": []}, {"items": ["x"]}, {"items": [{}], "max_concurrency": "many"},
+                    [{}] * (generation_service.BATCH_MAX_ITEMS + 1)):
+        with pytest.raises(ValueError):
+            generation_service.parse_batch_request(payload)
+
+
+def test_read_batch_item_defaults():
+    assert generation_service.read_batch_item({"prompt": "Hi", "save": True}) == (
+        "", "Hi", "general audience", "professional", "medium", True)
+
+
+def test_parse_variants():
+    assert generation_service.parse_variants({}) == 1
+    assert generation_service.parse_variants({"variants": "3"}) == 3
+    for value in ("0", "many", str(generation_service.GENERATION_MAX_VARIANTS + 1)):
+        with pytest.raises(ValueError):
+            generation_service.parse_variants({"variants": value})
+
+
+def test_cache_key_honours_cache_false():
+    assert generation_service.generation_cache_key({"cache": "false"}, "Blog", "a", "b", "short", "p") is None
+    key = generation_service.generation_cache_key({}, "Blog", "a", "b", "short", "p")
+    assert key == generation_service.generation_cache_key({}, "blog", "A", "B", "SHORT", " P ")
+
+
+def test_format_sse():
+    event = generation_service.format_sse("delta", {"content": "Grüße\n"})
+    assert event.startswith("event: delta\ndata: ")
+    assert event.endswith("\n\n")
+    assert json.loads(event.split("data: ", 1)[1]) == {"content": "Grüße\n"}
+
+
+def test_connectivity_probe_state():
+    assert generation_service.ConnectivityProbe(False).state()["status"] == "disabled"
+    probe = generation_service.ConnectivityProbe(True)
+    assert probe.state()["status"] == "pending"
+    probe.begin()
+    assert probe.state()["status"] == "running"
+    assert not probe.finish(TimeoutError("slow"), timed_out=True)
+    state = probe.state()
+    assert (state["status"], state["error"]) == ("timeout", "slow")
+    probe.begin()
+    assert probe.finish()
+    assert probe.state()["status"] == "ok"
+
+
+def test_generation_status_reports_every_component():
+    status = generation_service.generation_status(SingleFlight())
+    assert set(status) == {"generation_cache", "coalescing", "generation_budget", "model_routing",
+                           "rate_limiter", "circuit_breaker", "conversations"}
@@ -0,0 +1,173 @@
+"""
+Tests for background generation jobs
+
+Covers job completion and failure, cancelling queued and running jobs,
+rejection when the queue is full, and TTL cleanup of finished jobs.
+
+Usage:
+    python -m pytest test_job_manager.py
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import app
+from job_manager import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobManager, JobQueueFull
+from rate_limiter import RateLimiter
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for condition"
+        time.sleep(0.01)
+
+
+def test_job_result_and_partial_output():
+    manager = JobManager(max_workers=1)
+    try:
+        def generate(job, prompt):
+            job.append_output("Hello ")
+            job.append_output(prompt)
+            return {"content": "Hello " + prompt}
+
+        job = manager.submit("generate", generate, "world")
+        wait_for(lambda: job.status == SUCCEEDED)
+        data = job.to_dict()
+        assert data["result"] == {"content": "Hello world"}
+        assert data["partial_output"] == "Hello world"
+        assert data["finished_at"] is not None
+        assert manager.get(job.id) is job
+    finally:
+        manager.shutdown()
+
+
+def test_failed_job_records_its_error():
+    manager = JobManager(max_workers=1)
+    try:
+        def fail(job):
+            raise RuntimeError("upstream failed")
+
+        job = manager.submit("generate", fail)
+        wait_for(lambda: job.status == FAILED)
+        assert job.error == "upstream failed"
+    finally:
+        manager.shutdown()
+
+
+def test_cancel_running_job_stops_at_next_check():
+    manager = JobManager(max_workers=1)
+    started = threading.Event()
+    try:
+        def generate(job):
+            started.set()
+            while True:
+                job.check_cancelled()
+                job.append_output(".")
+                time.sleep(0.01)
+
+        job = manager.submit("generate", generate)
+        started.wait(5)
+        assert job.status == RUNNING
+        manager.cancel(job.id)
+        wait_for(lambda: job.status == CANCELLED)
+        assert job.partial_output
+    finally:
+        manager.shutdown()
+
+
+def test_cancel_queued_job_never_starts():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    ran = []
+    try:
+        blocker = manager.submit("generate", lambda job: release.wait(5))
+        queued = manager.submit("generate", lambda job: ran.append(job.id))
+        manager.cancel(queued.id)
+        assert queued.status == CANCELLED
+        release.set()
+        wait_for(lambda: blocker.status == SUCCEEDED)
+        assert ran == []
+        assert manager.stats()["completed"][CANCELLED] == 1
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_submit_rejected_when_queue_is_full():
+    manager = JobManager(max_workers=1, max_jobs=2)
+    release = threading.Event()
+    try:
+        manager.submit("generate", lambda job: release.wait(5))
+        manager.submit("generate", lambda job: release.wait(5))
+        try:
+            manager.submit("generate", lambda job: None)
+            assert False, "expected JobQueueFull"
+        except JobQueueFull:
+            pass
+        assert manager.stats()["rejected"] == 1
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_finished_jobs_expire_after_ttl():
+    manager = JobManager(max_workers=1, ttl_seconds=0.1, cleanup_interval=60)
+    release = threading.Event()
+    try:
+        finished = manager.submit("generate", lambda job: "done")
+        running = manager.submit("generate", lambda job: release.wait(5))
+        wait_for(lambda: finished.status == SUCCEEDED)
+        assert manager.cleanup() == 0
+        time.sleep(0.15)
+        assert manager.cleanup() == 1
+        assert manager.get(finished.id) is None
+        assert manager.get(running.id) is running
+        assert manager.stats()["expired"] == 1
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_status_is_read_under_the_job_lock():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    try:
+        blocker = manager.submit("generate", lambda job: release.wait(5))
+        queued = manager.submit("generate", lambda job: None)
+        wait_for(lambda: blocker.status == RUNNING)
+        with queued._lock:
+            reader = threading.Thread(target=lambda: queued.status)
+            reader.start()
+            reader.join(0.1)
+            assert reader.is_alive()
+        reader.join(1)
+        assert queued.status == QUEUED
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_generation_job_waiting_for_admission_can_be_cancelled(monkeypatch):
+    limiter = RateLimiter(requests_per_minute=1)
+    limiter.acquire(1, time.monotonic() + 1)
+    monkeypatch.setattr(app, "rate_limiter", limiter)
+    monkeypatch.setattr(app, "UPSTREAM_QUEUE_TIMEOUT", 30)
+    upstream = SimpleNamespace(chat=None)
+    upstream.with_options = lambda **options: upstream
+    monkeypatch.setattr(app, "client", upstream)
+    client = app.app.test_client()
+
+    response = client.post("/generate?async=1", data={"content_type": "Blog Post", "prompt": "queued job",
+                                                      "cache": "false"})
+    assert response.status_code == 202
+    job_url = response.get_json()["status_url"]
+    wait_for(lambda: limiter.stats()["queue_depth"] == 1)
+    assert client.get(job_url).get_json()["job_status"] == RUNNING
+
+    start = time.monotonic()
+    assert client.post(job_url + "/cancel").status_code == 200
+    wait_for(lambda: client.get(job_url).get_json()["job_status"] == CANCELLED, timeout=2)
+    assert time.monotonic() - start < 1
+    assert limiter.stats()["queue_depth"] == 0
@@ -0,0 +1,78 @@
+"""
+Tests for the logging configuration
+
+Covers level sampling, dropping records instead of blocking when the queue is
+full, and log files written through the async listener or synchronously.
+
+Usage:
+    python -m pytest test_logging_config.py
+"""
+
+import logging
+import queue
+
+import pytest
+
+import logging_config
+from logging_config import LevelSamplingFilter, setup_logging, setup_logging_from_env
+
+
+@pytest.fixture(autouse=True)
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    for handler in root.handlers:
+        handler.close()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def record(level, message="message"):
+    return logging.LogRecord("test", level, __file__, 1, message, None, None)
+
+
+def log_lines(log_dir):
+    log_file, = log_dir.glob("app_*.log")
+    return log_file.read_text(encoding="utf-8").splitlines()
+
+
+def test_sampling_filter_only_samples_configured_levels():
+    sampler = LevelSamplingFilter({logging.DEBUG: 0.0, logging.INFO: 1.0})
+    assert not sampler.filter(record(logging.DEBUG))
+    assert sampler.filter(record(logging.INFO))
+    assert sampler.filter(record(logging.ERROR))
+
+
+def test_full_queue_drops_records_without_blocking():
+    handler = logging_config._NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    dropped = handler.dropped
+    handler.emit(record(logging.INFO, "kept"))
+    handler.emit(record(logging.INFO, "dropped"))
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == dropped + 1
+
+
+def test_async_logging_writes_through_the_listener(tmp_path):
+    listener = setup_logging(tmp_path / "logs", level=logging.INFO, sample_rates={logging.DEBUG: 0.0})
+    assert listener is not None
+    logger = logging.getLogger("test.async")
+    logger.info("written %s", "once")
+    logger.debug("sampled out")
+    listener.stop()
+    lines = log_lines(tmp_path / "logs")
+    assert len(lines) == 1
+    assert lines[0].endswith(" - test.async - INFO - written once")
+
+
+def test_sync_logging_writes_directly(tmp_path):
+    assert setup_logging(tmp_path, level=logging.DEBUG, async_mode=False) is None
+    logging.getLogger("test.sync").debug("direct")
+    assert log_lines(tmp_path)[-1].endswith(" - test.sync - DEBUG - direct")
+
+
+def test_setup_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOG_ASYNC", "false")
+    monkeypatch.setenv("LOG_LEVEL", "warning")
+    assert setup_logging_from_env(tmp_path) is None
+    assert logging.getLogger().level == logging.WARNING
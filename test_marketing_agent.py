@@ -0,0 +1,156 @@
+"""
+Tests for thread handling in the Azure AI Agent Service marketing agent
+
+Covers fetching only the newest agent reply, compacting long threads onto a
+fresh thread that receives a summary in the background, and generate_many.
+
+Needs the Azure AI Projects SDK (``pip install azure-ai-projects azure-identity``);
+the tests are skipped without it.
+
+Usage:
+    python -m pytest test_marketing_agent.py
+"""
+
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("azure.ai.projects")
+pytest.importorskip("azure.identity")
+
+import Marketing_agent
+from Marketing_agent import SUMMARY_PROMPT, MarketingAgent
+
+
+def message(message_id, role, text):
+    return SimpleNamespace(id=message_id, role=role, content=[SimpleNamespace(text=SimpleNamespace(value=text))])
+
+
+class AgentsClient:
+    """In-memory agents operations; each run replies to the thread's last message."""
+
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.threads = {}
+        self.list_calls = []
+        self.reply = True
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create_agent(self, **kwargs):
+        return SimpleNamespace(id="agent-1")
+
+    async def get_agent(self, agent_id):
+        return SimpleNamespace(id=agent_id)
+
+    async def create_thread(self):
+        thread = SimpleNamespace(id=f"thread-{next(self.ids)}")
+        self.threads[thread.id] = []
+        return thread
+
+    async def delete_thread(self, thread_id):
+        self.threads.pop(thread_id, None)
+
+    async def create_message(self, thread_id, role, content):
+        created = message(f"msg-{next(self.ids)}", role, content)
+        self.threads[thread_id].append(created)
+        return created
+
+    async def create_and_process_run(self, thread_id, agent_id):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            self.in_flight -= 1
+        if "broken" in self.threads[thread_id][-1].content[0].text.value:
+            return SimpleNamespace(status="failed", last_error="model error")
+        if self.reply:
+            request = self.threads[thread_id][-1].content[0].text.value
+            reply = "summary" if request == SUMMARY_PROMPT else f"reply to {request[:20]}"
+            self.threads[thread_id].append(message(f"msg-{next(self.ids)}", "assistant", reply))
+        return SimpleNamespace(status="completed", last_error=None)
+
+    async def list_messages(self, thread_id, order, limit):
+        self.list_calls.append((order, limit))
+        return SimpleNamespace(data=list(reversed(self.threads[thread_id]))[:limit])
+
+
+@pytest.fixture
+def agents_client(monkeypatch, tmp_path):
+    client = AgentsClient()
+    project = SimpleNamespace(agents=client)
+    monkeypatch.setenv("AGENT_POOL_DB", str(tmp_path / "pool.db"))
+    monkeypatch.setenv("AGENT_POOL_REAP_INTERVAL", "0")
+    monkeypatch.setattr(Marketing_agent, "DefaultAzureCredential", lambda: None)
+    monkeypatch.setattr(Marketing_agent, "AIProjectClient",
+                        SimpleNamespace(from_connection_string=lambda credential, conn_str: project))
+    monkeypatch.setattr(MarketingAgent, "_create_toolset",
+                        lambda self: SimpleNamespace(tool_definitions=[], tool_resources={}))
+    return client
+
+
+def test_only_the_newest_message_is_fetched(agents_client):
+    async def main():
+        agent = MarketingAgent("connection")
+        content = await agent.generate_content("Launch our new API")
+        await agent.close()
+        return content
+
+    assert asyncio.run(main()).startswith("reply to Please create")
+    assert agents_client.list_calls == [("desc", 1)]
+
+
+def test_no_reply_since_the_request_gives_no_content(agents_client):
+    agents_client.reply = False
+
+    async def main():
+        agent = MarketingAgent("connection")
+        content = await agent.generate_content("Launch our new API")
+        await agent.close()
+        return content
+
+    assert asyncio.run(main()) == "No content was generated."
+
+
+def test_long_thread_is_compacted_onto_a_summarized_thread(agents_client, monkeypatch):
+    monkeypatch.setattr(Marketing_agent, "THREAD_COMPACT_CHARS", 100)
+
+    async def main():
+        agent = MarketingAgent("connection")
+        await agent.generate_content("Launch our new API")
+        first_thread = list(agents_client.threads)[0]
+        compacted_to = agent.thread_id
+        content = await agent.generate_content("Announce the beta")
+        stats = agent.pool.stats()
+        await agent.close()
+        return agent, first_thread, compacted_to, content, stats
+
+    agent, first_thread, compacted_to, content, stats = asyncio.run(main())
+    assert compacted_to != first_thread
+    assert content.startswith("reply to Please create")
+    carried = agents_client.threads[compacted_to][0].content[0].text.value
+    assert carried.startswith("Summary of our earlier conversation") and carried.endswith("summary")
+    assert agents_client.threads[first_thread][-1].content[0].text.value == "summary"
+    assert stats["threads_rotated"] >= 1
+    assert agent.compactions == {}
+    assert first_thread not in agent.thread_cursors
+
+
+def test_generate_many_runs_concurrently_and_keeps_input_order(agents_client):
+    async def main():
+        agent = MarketingAgent("connection")
+        results = await agent.generate_many([{"prompt": prompt} for prompt in ("one", "two", "broken", "four")],
+                                            max_concurrency=2)
+        await agent.close()
+        return results, agent.pool.stats()
+
+    results, stats = asyncio.run(main())
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["error"] for result in results] == \
+        [None, None, "Run failed with status: failed. Error: model error", None]
+    assert all(result["content"].startswith("reply to Please create") for i, result in enumerate(results) if i != 2)
+    assert agents_client.max_in_flight == 2
+    assert stats["leased_threads"] == 0
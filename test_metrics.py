@@ -0,0 +1,97 @@
+"""
+Tests for the metrics registry
+
+Covers counters, gauges and histograms, label validation, collectors and the
+Prometheus text rendering, plus the apps' /metrics endpoint.
+
+Usage:
+    python -m pytest test_metrics.py
+"""
+
+from metrics import CONTENT_TYPE, MetricsRegistry
+
+
+def test_counter_and_gauge_rendering():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["route", "status"])
+    in_flight = registry.gauge("in_flight", "In-flight requests")
+    requests.inc(route="/generate", status="200")
+    requests.inc(2, route="/generate", status="200")
+    requests.inc(route='/a"b', status="500")
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    assert requests.value(route="/generate", status="200") == 3
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b",status="500"} 1',
+        'requests_total{route="/generate",status="200"} 3',
+        "# HELP in_flight In-flight requests",
+        "# TYPE in_flight gauge",
+        "in_flight 1",
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value, route="/")
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{route="/",le="0.1"} 1',
+        'latency_seconds_bucket{route="/",le="1"} 3',
+        'latency_seconds_bucket{route="/",le="+Inf"} 4',
+        'latency_seconds_sum{route="/"} 6.05',
+        'latency_seconds_count{route="/"} 4',
+    ]
+
+
+def test_histogram_time_observes_the_block():
+    registry = MetricsRegistry()
+    duration = registry.histogram("duration_seconds", "Duration")
+    with duration.time():
+        pass
+    assert "duration_seconds_count 1" in registry.render()
+
+
+def test_labels_must_match():
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "Calls", ["deployment"])
+    for labels in ({}, {"deployment": "a", "extra": "b"}, {"model": "a"}):
+        try:
+            counter.inc(**labels)
+            assert False, f"expected ValueError for {labels}"
+        except ValueError:
+            pass
+
+
+def test_duplicate_names_are_rejected():
+    registry = MetricsRegistry()
+    registry.counter("calls_total", "Calls")
+    try:
+        registry.gauge("calls_total", "Calls")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_collectors_run_before_render():
+    registry = MetricsRegistry()
+    entries = registry.gauge("cache_entries", "Entries")
+    registry.add_collector(lambda: entries.set(7))
+    assert "cache_entries 7" in registry.render()
+
+
+def test_metrics_endpoint():
+    import app
+
+    client = app.app.test_client()
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == CONTENT_TYPE
+    body = response.get_data(as_text=True)
+    assert "# TYPE http_requests_total counter" in body
+    assert 'route="/health"' in body
+    assert 'component_stat{component="generation_cache",stat="entries"}' in body
@@ -0,0 +1,86 @@
+"""
+Tests for model routing
+
+Covers picking the small or large deployment per content type and length,
+the completion quality check, escalation of a failed small-model response,
+and per-deployment latency stats.
+
+Usage:
+    python -m pytest test_model_router.py
+"""
+
+from types import SimpleNamespace
+
+import generation_service
+from generation_budget import GenerationBudget
+from model_router import ModelRouter
+
+
+def response(content, finish_reason="stop"):
+    choice = SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)
+    return SimpleNamespace(choices=[choice], usage=None)
+
+
+def test_routes_short_copy_to_the_small_deployment():
+    router = ModelRouter("large", "small")
+    assert router.route("Social Media Post", "long") == "small"
+    assert router.route("Ad Copy", "medium") == "small"
+    assert router.route("Email", "short") == "small"
+    assert router.route("Email", "long") == "large"
+    assert router.route("Blog Post", "short") == "large"
+    assert router.route("Haiku", "short") == "large"
+
+
+def test_routing_disabled_without_a_distinct_small_deployment():
+    assert not ModelRouter("large").enabled
+    assert ModelRouter("large", "").route("social", "short") == "large"
+    assert ModelRouter("large", "large").route("social", "short") == "large"
+    assert not ModelRouter("large", "large").should_escalate("large")
+
+
+def test_quality_check():
+    router = ModelRouter("large", "small")
+    assert router.check_quality("A" * 40, "short") == (True, None)
+    assert router.check_quality("  ", "short") == (False, "empty response")
+    assert router.check_quality("A" * 40, "short", "length") == (False, "response truncated")
+    assert router.check_quality("A" * 40, "short", "content_filter") == (False, "response filtered")
+    assert router.check_quality("I'm sorry, I can't help with that request today.", "short") == (False, "model refused")
+    assert router.check_quality("A" * 100, "medium") == (False, "response shorter than 150 characters")
+
+
+def test_latency_stats():
+    router = ModelRouter("large", "small")
+    router.record("small", 0.2, escalated_from=True)
+    router.record("small", 0.4)
+    router.record("large", 1.0)
+    stats = router.stats()
+    assert stats["escalations"] == 1
+    assert stats["deployments"]["small"] == {"calls": 2, "avg_latency": 0.3, "escalated_from": 1}
+    assert stats["deployments"]["large"]["calls"] == 1
+
+
+def test_failed_small_response_is_regenerated_on_the_large_deployment(monkeypatch):
+    monkeypatch.setattr(generation_service, "model_router", ModelRouter("large", "small"))
+    monkeypatch.setattr(generation_service, "generation_budget", GenerationBudget())
+    messages = [{"role": "user", "content": "Write a tweet"}]
+    generation = generation_service.Generation(messages, "Tweet", "short")
+    assert generation.call_params() == {"max_tokens": 120, "stop": ["\n\n\n\n"], "deployment": "small"}
+
+    assert generation.record_response(response("Too short", finish_reason="length"), 0.1)
+    # A truncated response is retried with a larger limit
+    assert generation.call_params() == {"max_tokens": 180, "stop": ["\n\n\n\n"], "deployment": "large"}
+
+    assert not generation.record_response(response("A" * 60), 0.5)
+    result = generation.result()
+    assert result["content"] == "A" * 60
+    assert result["routing"]["initial_deployment"] == "small"
+    assert result["routing"]["deployment"] == "large"
+    assert result["routing"]["escalation_reason"] == "response truncated"
+    assert result["routing"]["latencies"] == {"small": 0.1, "large": 0.5}
+
+
+def test_large_deployment_responses_are_not_escalated(monkeypatch):
+    monkeypatch.setattr(generation_service, "model_router", ModelRouter("large", "small"))
+    generation = generation_service.Generation([{"role": "user", "content": "Write a blog"}], "Blog Post", "long")
+    assert generation.call_params()["deployment"] == "large"
+    assert not generation.record_response(response(""), 0.1)
@@ -0,0 +1,128 @@
+"""
+Tests for the upstream rate limiter
+
+Covers token bucket refill, admission deadlines, queue rejection, Retry-After
+pauses and Retry-After header parsing.
+
+Usage:
+    python -m pytest test_rate_limiter.py
+"""
+
+import asyncio
+import time
+
+from rate_limiter import AdmissionRejected, RateLimiter, RateLimitTimeout, TokenBucket, parse_retry_after
+
+
+def test_bucket_refills_at_its_per_minute_rate():
+    bucket = TokenBucket(60)
+    now = time.monotonic()
+    assert bucket.wait_time(60, now) == 0
+    bucket.consume(60)
+    assert bucket.wait_time(30, now) == 30.0
+    assert bucket.wait_time(30, now + 10) == 20.0
+    assert bucket.wait_time(30, now + 30) == 0
+
+
+def test_bucket_never_exceeds_capacity():
+    bucket = TokenBucket(60)
+    now = time.monotonic()
+    bucket.wait_time(1, now + 3600)
+    assert bucket.level == bucket.capacity
+    bucket.adjust(100)
+    assert bucket.level == bucket.capacity
+
+
+def test_oversized_requests_wait_for_a_full_bucket_only():
+    bucket = TokenBucket(60)
+    now = time.monotonic()
+    assert bucket.wait_time(1000, now) == 0
+    bucket.consume(1000)
+    assert bucket.level == 0
+    assert bucket.wait_time(1000, now) == 60.0
+
+
+def test_zero_rate_is_unlimited():
+    bucket = TokenBucket(0)
+    bucket.consume(10 ** 9)
+    assert bucket.wait_time(10 ** 9, time.monotonic()) == 0.0
+
+
+def test_acquire_times_out_at_the_deadline():
+    limiter = RateLimiter(requests_per_minute=1)
+    assert limiter.acquire(1, time.monotonic() + 1) < 0.1
+    start = time.monotonic()
+    try:
+        limiter.acquire(1, start + 0.1)
+        assert False, "expected RateLimitTimeout"
+    except RateLimitTimeout:
+        pass
+    assert 0.1 <= time.monotonic() - start < 1
+    stats = limiter.stats()
+    assert (stats["admitted"], stats["timeouts"], stats["queue_depth"]) == (1, 1, 0)
+
+
+def test_cancelled_wait_gives_up_promptly():
+    limiter = RateLimiter(requests_per_minute=1)
+    limiter.acquire(1, time.monotonic() + 1)
+    cancel_at = time.monotonic() + 0.2
+
+    def check_cancelled():
+        if time.monotonic() >= cancel_at:
+            raise InterruptedError("cancelled")
+
+    try:
+        limiter.acquire(1, time.monotonic() + 30, check_cancelled)
+        assert False, "expected InterruptedError"
+    except InterruptedError:
+        pass
+    assert time.monotonic() - cancel_at < 0.5
+    assert limiter.stats()["queue_depth"] == 0
+
+
+def test_full_queue_rejects_immediately():
+    limiter = RateLimiter(requests_per_minute=60, max_queue=0)
+    try:
+        limiter.acquire(1, time.monotonic() + 1)
+        assert False, "expected AdmissionRejected"
+    except AdmissionRejected:
+        pass
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_throttle_pauses_admissions():
+    limiter = RateLimiter()
+    limiter.throttle(0.2)
+    waited = limiter.acquire(1, time.monotonic() + 2)
+    assert 0.15 <= waited < 1
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_reconcile_returns_unused_tokens():
+    limiter = RateLimiter(tokens_per_minute=1000)
+    limiter.acquire(800, time.monotonic() + 1)
+    limiter.reconcile(800, 100)
+    assert limiter.acquire(800, time.monotonic() + 0.1) < 0.1
+
+
+def test_async_acquire_times_out_at_the_deadline():
+    limiter = RateLimiter(requests_per_minute=1)
+
+    async def main():
+        await limiter.acquire_async(1, time.monotonic() + 1)
+        await limiter.acquire_async(1, time.monotonic() + 0.1)
+
+    try:
+        asyncio.run(main())
+        assert False, "expected RateLimitTimeout"
+    except RateLimitTimeout:
+        pass
+    assert limiter.stats()["queue_depth"] == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after-ms": "1500"}) == 1.5
+    assert parse_retry_after({"retry-after": "3"}) == 3.0
+    assert parse_retry_after({"retry-after": "soon"}, default=2.0) == 2.0
+    assert parse_retry_after(None, default=2.0) == 2.0
+
@@ -0,0 +1,86 @@
+"""
+Tests for the content search index
+
+Covers full-text and prefix matching, metadata and date filters, paging, and
+de-duplication of re-saved content.
+
+Usage:
+    python -m pytest test_search_index.py
+"""
+
+import os
+import tempfile
+
+from search_index import SearchIndex, build_match_query
+
+DAY = 24 * 60 * 60
+START = 1700000000.0
+
+DOCUMENTS = [
+    ("a1", "launch.txt", "Launching our new analytics dashboard for developers", "Blog Post", "Friendly", "Developers", START),
+    ("b2", "offer.txt", "Special offer on analytics for small business owners", "Email", "Persuasive", "Small Business", START + DAY),
+    ("c3", "tips.txt", "Five productivity tips for remote teams", "Blog Post", "Professional", "Managers", START + 2 * DAY),
+]
+
+
+def build_index(tmp):
+    index = SearchIndex(os.path.join(tmp, "search.db"))
+    for sha256, filename, body, content_type, tone, audience, created_at in DOCUMENTS:
+        index.add(sha256, filename, body, kind="generated", content_type=content_type, tone=tone,
+                  audience=audience, created_at=created_at)
+    assert index.flush(timeout=5)
+    return index
+
+
+def filenames(response):
+    return [result["filename"] for result in response["results"]]
+
+
+def test_build_match_query():
+    assert build_match_query("new dash") == '"new" "dash"*'
+    assert build_match_query('"; DROP') == '"DROP"*'
+    assert build_match_query("  ") == ""
+
+
+def test_full_text_and_prefix_search():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = build_index(tmp)
+        assert sorted(filenames(index.search("analytics"))) == ["launch.txt", "offer.txt"]
+        assert filenames(index.search("analytics dash")) == ["launch.txt"]
+        assert filenames(index.search("launch")) == ["launch.txt"]
+        response = index.search("productivity")
+        assert response["total"] == 1
+        assert "<mark>productivity</mark>" in response["results"][0]["snippet"].lower()
+
+
+def test_metadata_filters_are_case_insensitive():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = build_index(tmp)
+        assert filenames(index.search("analytics", content_type="email")) == ["offer.txt"]
+        assert filenames(index.search(content_type="blog post")) == ["tips.txt", "launch.txt"]
+        assert filenames(index.search(tone="PROFESSIONAL")) == ["tips.txt"]
+        assert filenames(index.search(audience="developers")) == ["launch.txt"]
+        assert index.search("analytics", audience="Managers")["total"] == 0
+
+
+def test_date_filters_and_paging():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = build_index(tmp)
+        assert filenames(index.search(date_from=START + DAY)) == ["tips.txt", "offer.txt"]
+        assert filenames(index.search(date_to=START + DAY)) == ["launch.txt"]
+        page = index.search(limit=2, offset=2)
+        assert (filenames(page), page["total"]) == (["launch.txt"], 3)
+
+
+def test_resaved_content_is_deduplicated():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = build_index(tmp)
+        index.add("a1", "launch.md", DOCUMENTS[0][2], kind="export", created_at=START + 3 * DAY)
+        assert index.flush(timeout=5)
+        response = index.search("dashboard")
+        assert filenames(response) == ["launch.md"]
+        # Metadata that is not given again is kept
+        assert response["results"][0]["content_type"] == "Blog Post"
+        stats = index.stats()
+        assert (stats["documents"], stats["indexed"], stats["duplicates"]) == (3, 3, 1)
+
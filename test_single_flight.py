@@ -0,0 +1,176 @@
+"""
+Tests for request coalescing
+
+Covers sharing one execution between concurrent callers, error propagation,
+waiter timeouts, and the asyncio variant.
+
+Usage:
+    python -m pytest test_single_flight.py
+"""
+
+import asyncio
+import threading
+import time
+
+from single_flight import AsyncSingleFlight, CoalescingTimeout, SingleFlight
+
+
+def run_concurrently(flight, key, fn, callers, timeout=None):
+    """Call ``flight.do`` from several threads and collect each outcome."""
+    outcomes = []
+    lock = threading.Lock()
+
+    def call():
+        try:
+            outcome = flight.do(key, fn, timeout=timeout)
+        except Exception as e:
+            outcome = e
+        with lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def produce():
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    outcomes = run_concurrently(flight, "key", produce, callers=5)
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in outcomes) == [False, True, True, True, True]
+    assert all(result == "result" for result, _ in outcomes)
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4, "timeouts": 0}
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == (1, False)
+    assert flight.do("key", lambda: 2) == (2, False)
+    assert flight.stats()["leaders"] == 2
+
+
+def test_leader_error_is_raised_in_every_caller():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("upstream failed")
+
+    outcomes = run_concurrently(flight, "key", fail, callers=3)
+    assert len(outcomes) == 3
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_waiter_times_out_without_cancelling_the_leader():
+    flight = SingleFlight()
+    started = threading.Event()
+    results = []
+
+    def produce():
+        started.set()
+        time.sleep(0.3)
+        return "result"
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", produce)))
+    leader.start()
+    started.wait()
+    try:
+        flight.do("key", produce, timeout=0.05)
+        assert False, "expected CoalescingTimeout"
+    except CoalescingTimeout:
+        pass
+    leader.join()
+    assert results == [("result", False)]
+    assert flight.stats()["timeouts"] == 1
+
+
+def test_async_callers_share_one_execution():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", produce) for _ in range(4)))
+
+    outcomes = asyncio.run(main())
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in outcomes) == [False, True, True, True]
+
+
+def test_async_waiters_take_over_from_a_cancelled_leader():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return f"result {len(calls)}"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("key", produce))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flight.do("key", produce)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        try:
+            await leader
+            assert False, "expected CancelledError"
+        except asyncio.CancelledError:
+            pass
+        return await asyncio.gather(*waiters)
+
+    outcomes = asyncio.run(main())
+    assert len(calls) == 2
+    assert sorted(outcomes) == [("result 2", False), ("result 2", True), ("result 2", True)]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_async_leader_error_is_raised_in_waiters():
+    flight = AsyncSingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream failed")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    outcomes = asyncio.run(main())
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+
+
+def test_async_waiter_times_out():
+    flight = AsyncSingleFlight()
+
+    async def produce():
+        await asyncio.sleep(0.3)
+        return "result"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("key", produce))
+        await asyncio.sleep(0)
+        try:
+            await flight.do("key", produce, timeout=0.05)
+            assert False, "expected CoalescingTimeout"
+        except CoalescingTimeout:
+            pass
+        return await leader
+
+    assert asyncio.run(main()) == ("result", False)
+    assert flight.stats()["timeouts"] == 1
+